@@ -0,0 +1,102 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import dataset  # noqa: E402
+from utils import (  # noqa: E402
+    FLIGHT_STATUS_SCHEDULED,
+    ORDER_STATUS_ACTIVE,
+    FLIGHT_STATUS_COMPLETED,
+    WATERMARK_FLIGHTS_LANDED,
+    db_cursor,
+    set_watermark,
+    unit_of_work,
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+# מריץ פונקציית כתיבה בתוך יחידת עבודה ומבטל את כל השינויים שלה בסוף
+def rolled_back(func):
+    def run(*args):
+        try:
+            with unit_of_work():
+                func(*args)
+                raise _Rollback()
+        except _Rollback:
+            pass
+    return run
+
+
+# מזיז את סימן המים לשעה האחרונה ורושם אירועי השלמה לטיסות שהושלמו בשעתיים האחרונות,
+# כדי שהתחזוקה תעבוד על חלון קטן כמו בריצה רגילה
+def maintenance_window(func):
+    def run():
+        now = datetime.now().replace(microsecond=0)
+        with db_cursor() as cursor:
+            set_watermark(cursor, WATERMARK_FLIGHTS_LANDED, now - timedelta(hours=1))
+            cursor.execute(
+                """
+                INSERT INTO flight_completion (Air_Craft_ID, Dep_Date, Dep_Hour)
+                SELECT Air_Craft_ID, Dep_Date, Dep_Hour
+                FROM flight
+                WHERE Status = %s AND Arr_TS > %s AND Arr_TS <= %s
+                """,
+                (FLIGHT_STATUS_COMPLETED, now - timedelta(hours=2), now),
+            )
+        func()
+    return run
+
+
+# בוחר מהמסד טיסה עתידית, הזמנה פעילה, לקוח עם היסטוריה רגילה וצוות מוכשר עבור התרחישים
+def load_context():
+    with db_cursor(dictionary=True) as cursor:
+        cursor.execute(
+            """
+            SELECT f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour, r.Origin, r.Destination
+            FROM flight f
+            JOIN route r ON r.Route_ID = f.Route_ID
+            WHERE f.Status = %s AND f.Dep_TS > NOW() + INTERVAL 7 DAY
+            ORDER BY f.Dep_TS
+            LIMIT 1
+            """,
+            (FLIGHT_STATUS_SCHEDULED,),
+        )
+        flight = cursor.fetchone()
+        cursor.execute(
+            """
+            SELECT t.Order_ID, fo.Email
+            FROM tickets t
+            JOIN flight_order fo ON fo.Order_ID = t.Order_ID
+            WHERE t.Air_Craft_ID = %s AND t.Dep_Date = %s AND t.Dep_Hour = %s AND fo.Order_status = %s
+            LIMIT 1
+            """,
+            (flight["Air_Craft_ID"], flight["Dep_Date"], flight["Dep_Hour"], ORDER_STATUS_ACTIVE),
+        )
+        order = cursor.fetchone()
+        cursor.execute("SELECT Email FROM flight_order WHERE Email NOT LIKE %s LIMIT 1", (dataset.SYNTHETIC_EMAIL_LIKE,))
+        history = cursor.fetchone()
+        cursor.execute("SELECT ID FROM pilot WHERE Long_Dist_Training = 1 ORDER BY ID LIMIT 2")
+        pilots = [row["ID"] for row in cursor.fetchall()]
+        cursor.execute("SELECT ID FROM flight_attendent WHERE Long_Dist_Training = 1 ORDER BY ID LIMIT 3")
+        attendants = [row["ID"] for row in cursor.fetchall()]
+    dep_time = (datetime.min + flight["Dep_Hour"]).time() if isinstance(flight["Dep_Hour"], timedelta) else flight["Dep_Hour"]
+    return {
+        "aircraft": flight["Air_Craft_ID"],
+        "dep_date": flight["Dep_Date"],
+        "dep_hour": flight["Dep_Hour"],
+        "dep_time": dep_time,
+        "origin": flight["Origin"],
+        "dest": flight["Destination"],
+        "order_id": order["Order_ID"],
+        "order_email": order["Email"],
+        "email": order["Email"],
+        "history_email": history["Email"],
+        "pilots": pilots,
+        "attendants": attendants,
+    }
+
@@ -0,0 +1,218 @@
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_cache import invalidate_tables  # noqa: E402
+from utils import (  # noqa: E402
+    FLIGHT_STATUS_COMPLETED,
+    FLIGHT_STATUS_SCHEDULED,
+    ORDER_STATUS_ACTIVE,
+    ORDER_STATUS_COMPLETED,
+    db_cursor,
+    load_reference_rows,
+    rebuild_aircraft_locations,
+    rebuild_crew_locations,
+    rebuild_flight_inventory,
+    rebuild_report_rollups,
+    update_flights_fully_booked,
+)
+
+SYNTHETIC_PREFIX = "SYN"
+SYNTHETIC_DOMAIN = "flytau.test"
+SYNTHETIC_EMAIL_LIKE = f"%@{SYNTHETIC_DOMAIN}"
+SYNTHETIC_PASSWORD = "bench"
+ECONOMY_LAYOUT = (30, 6)
+# צוות קבוע לכל מטוס סינתטי (כולם Large): טייסים ודיילים
+CREW_PER_AIRCRAFT = {"Pilot": 3, "Flight_Attendant": 6}
+INSERT_CHUNK = 1000
+
+
+# מכניס שורות במנות כדי שכל executemany יישלח כ-INSERT מרובה שורות בגודל סביר
+def insert_chunks(cursor, sql, rows):
+    for i in range(0, len(rows), INSERT_CHUNK):
+        cursor.executemany(sql, rows[i:i + INSERT_CHUNK])
+
+
+def customer_email(n):
+    return f"bench{n:06d}@{SYNTHETIC_DOMAIN}"
+
+
+# מסלולים סינתטיים בין ערים SYN...: כל עיר מקבלת מסלולים יוצאים, ולכל מסלול יש גם מסלול חזור
+def synthetic_routes(count, rng):
+    cities = [f"{SYNTHETIC_PREFIX} City {i:03d}" for i in range(max(2, int(count ** 0.5) + 1))]
+    pairs = set()
+    while len(pairs) < count:
+        origin, dest = rng.sample(cities, 2)
+        duration = round(rng.uniform(1.0, 14.0), 2)
+        for pair in ((origin, dest), (dest, origin)):
+            if pair not in pairs and len(pairs) < count:
+                pairs.add(pair)
+                yield pair[0], pair[1], duration
+
+
+# עובד סינתטי וטבלת התפקיד שלו (pilot / flight_attendent)
+def crew_rows(role, n, employees, trained):
+    emp_id = f"{SYNTHETIC_PREFIX}{role[0]}{n:06d}"
+    employees.append((emp_id, "עובד בדיקה", "0500000000", "2020-01-01", role))
+    trained.setdefault(role, []).append((emp_id, 1))
+    return emp_id
+
+
+# יוצר לוח טיסות סינתטי גדול על מטוסים חדשים (SYN...) עם מסלולים, צוות, לקוחות, הזמנות וכרטיסים,
+# לבדיקות ביצועים. מיועד למסד ניסוי שנטען מ-schema.sql, לא למסד של הייצור
+def build(aircraft_count=200, flights_per_aircraft=250, orders_per_flight=3, seed=1,
+          routes_count=0, customers=2000, spare_crew=20):
+    rng = random.Random(seed)
+    if routes_count:
+        with db_cursor(transaction=True) as cursor:
+            insert_chunks(cursor, "INSERT INTO route (Origin, Destination, Duration) VALUES (%s, %s, %s)",
+                          list(synthetic_routes(routes_count, rng)))
+        invalidate_tables("route")
+    routes, _, _ = load_reference_rows()
+    if routes_count:
+        routes = [r for r in routes if r[1].startswith(SYNTHETIC_PREFIX)]
+    by_origin = {}
+    for route_id, origin, _, duration in routes:
+        by_origin.setdefault(origin, []).append((route_id, float(duration)))
+    dests = {route_id: dest for route_id, _, dest, _ in routes}
+
+    now = datetime.now().replace(second=0, microsecond=0)
+    start = now - timedelta(days=flights_per_aircraft // 2)
+    rows, cols = ECONOMY_LAYOUT
+
+    emails = [customer_email(n) for n in range(1, customers + 1)]
+    customer_rows = [(email, f"Bench Customer {n}") for n, email in enumerate(emails, 1)]
+    registered = [(email, f"P{n:08d}", "1990-01-01", "2024-01-01", SYNTHETIC_PASSWORD)
+                  for n, email in enumerate(emails, 1) if n % 2]
+    phones = [(email, f"05{n:08d}") for n, email in enumerate(emails, 1)]
+
+    employees, trained, flight_crew = [], {}, []
+    aircraft, layouts, flights, orders, tickets = [], [], [], [], []
+    with db_cursor() as cursor:
+        cursor.execute("SELECT COALESCE(MAX(Order_ID), 0) FROM flight_order")
+        order_id = cursor.fetchone()[0]
+
+    crew_n = 0
+    for n in range(1, aircraft_count + 1):
+        aircraft_id = f"{SYNTHETIC_PREFIX}{n:05d}"
+        aircraft.append((aircraft_id, "2020-01-01", rng.choice(("Boeing", "Airbus")), "Large"))
+        layouts.append((aircraft_id, "Economy", rows, cols))
+        crew = []
+        for role, count in CREW_PER_AIRCRAFT.items():
+            for _ in range(count):
+                crew_n += 1
+                crew.append((crew_rows(role, crew_n, employees, trained), role))
+
+        location = rng.choice(list(by_origin))
+        dep = start + timedelta(hours=rng.randint(0, 48))
+        for _ in range(flights_per_aircraft):
+            route_id, duration = rng.choice(by_origin.get(location) or rng.choice(list(by_origin.values())))
+            arr = (dep + timedelta(hours=duration)).replace(second=0)
+            status = FLIGHT_STATUS_COMPLETED if arr <= now else FLIGHT_STATUS_SCHEDULED
+            flights.append((aircraft_id, dep.date(), dep.time(), route_id, arr.date(), arr.time(),
+                            200.00, None, status))
+            flight_crew.extend((emp_id, aircraft_id, dep.date(), dep.time(), role) for emp_id, role in crew)
+            seats = rng.sample(range(rows * cols), orders_per_flight)
+            for seat in seats:
+                order_id += 1
+                order_status = ORDER_STATUS_COMPLETED if status == FLIGHT_STATUS_COMPLETED else ORDER_STATUS_ACTIVE
+                orders.append((order_id, rng.choice(emails), (dep - timedelta(days=7)).date(), order_status, 200.00))
+                tickets.append((order_id, aircraft_id, dep.date(), dep.time(),
+                                seat // cols + 1, seat % cols + 1, 200.00))
+            location = dests[route_id]
+            dep = arr + timedelta(hours=rng.randint(2, 30))
+
+    # צוות פנוי שלא משובץ לאף טיסה, כדי שלשאילתות הצוות הזמין תהיה תוצאה
+    for role, count in (("Pilot", spare_crew), ("Flight_Attendant", 2 * spare_crew)):
+        for _ in range(count):
+            crew_n += 1
+            crew_rows(role, crew_n, employees, trained)
+
+    with db_cursor(transaction=True) as cursor:
+        insert_chunks(cursor, "INSERT INTO customer (Email, Full_Name_Eng) VALUES (%s, %s)", customer_rows)
+        insert_chunks(cursor, "INSERT INTO registered_customer (Email, Passport_Num, Birth_Date, Joining_Date, "
+                              "Password) VALUES (%s, %s, %s, %s, %s)", registered)
+        insert_chunks(cursor, "INSERT INTO phone_numbers (Cust_Email, Phone_num) VALUES (%s, %s)", phones)
+        insert_chunks(cursor, "INSERT INTO employee (ID, Full_Name_Heb, Phone_num, Start_Work_Date, Role) "
+                              "VALUES (%s, %s, %s, %s, %s)", employees)
+        insert_chunks(cursor, "INSERT INTO pilot (ID, Long_Dist_Training) VALUES (%s, %s)",
+                      trained.get("Pilot", []))
+        insert_chunks(cursor, "INSERT INTO flight_attendent (ID, Long_Dist_Training) VALUES (%s, %s)",
+                      trained.get("Flight_Attendant", []))
+        insert_chunks(cursor, "INSERT INTO air_craft (Air_Craft_ID, Purchase_Date, Manufacturer, Size) "
+                              "VALUES (%s, %s, %s, %s)", aircraft)
+        insert_chunks(cursor, "INSERT INTO aircraft_class (Air_Craft_ID, Class, Row_Num, Col_Num) "
+                              "VALUES (%s, %s, %s, %s)", layouts)
+        insert_chunks(cursor, "INSERT INTO flight (Air_Craft_ID, Dep_Date, Dep_Hour, Route_ID, Arrival_Date, "
+                              "Arrival_Time, Economy_Price, Business_Price, Status) "
+                              "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)", flights)
+        insert_chunks(cursor, "INSERT INTO flight_crew (ID, Air_Craft_ID, Dep_Date, Dep_Hour, Role) "
+                              "VALUES (%s, %s, %s, %s, %s)", flight_crew)
+        insert_chunks(cursor, "INSERT INTO flight_order (Order_ID, Email, Order_Date, Order_status, Total_Paid) "
+                              "VALUES (%s, %s, %s, %s, %s)", orders)
+        insert_chunks(cursor, "INSERT INTO tickets (Order_ID, Air_Craft_ID, Dep_Date, Dep_Hour, Chosen_Row_Num, "
+                              "Chosen_Col_Num, Price_Paid) VALUES (%s, %s, %s, %s, %s, %s, %s)", tickets)
+    invalidate_tables("air_craft", "aircraft_class", "route")
+
+    rebuild_flight_inventory()
+    update_flights_fully_booked()
+    rebuild_crew_locations()
+    rebuild_aircraft_locations()
+    rebuild_report_rollups()
+    return {
+        "routes": len(routes), "aircraft": len(aircraft), "crew": len(employees), "customers": len(emails),
+        "flights": len(flights), "orders": len(orders), "tickets": len(tickets),
+    }
+
+
+# מוחק את כל הנתונים הסינתטיים שנוצרו על ידי build
+def drop():
+    like = f"{SYNTHETIC_PREFIX}%"
+    with db_cursor(transaction=True) as cursor:
+        cursor.execute("DELETE FROM crew_location WHERE ID LIKE %s", (like,))
+        cursor.execute("DELETE FROM flight_crew WHERE ID LIKE %s OR Air_Craft_ID LIKE %s", (like, like))
+        cursor.execute("DELETE FROM aircraft_location WHERE Air_Craft_ID LIKE %s", (like,))
+        cursor.execute("DELETE FROM seat_hold WHERE Air_Craft_ID LIKE %s", (like,))
+        cursor.execute("DELETE FROM flight_inventory WHERE Air_Craft_ID LIKE %s", (like,))
+        cursor.execute("DELETE FROM tickets WHERE Air_Craft_ID LIKE %s", (like,))
+        cursor.execute("DELETE FROM flight_order WHERE Email LIKE %s", (SYNTHETIC_EMAIL_LIKE,))
+        cursor.execute("DELETE FROM flight WHERE Air_Craft_ID LIKE %s", (like,))
+        cursor.execute("DELETE FROM aircraft_class WHERE Air_Craft_ID LIKE %s", (like,))
+        cursor.execute("DELETE FROM air_craft WHERE Air_Craft_ID LIKE %s", (like,))
+        cursor.execute("DELETE FROM pilot WHERE ID LIKE %s", (like,))
+        cursor.execute("DELETE FROM flight_attendent WHERE ID LIKE %s", (like,))
+        cursor.execute("DELETE FROM employee WHERE ID LIKE %s", (like,))
+        cursor.execute("DELETE FROM route WHERE Origin LIKE %s", (like,))
+        cursor.execute("DELETE FROM phone_numbers WHERE Cust_Email LIKE %s", (SYNTHETIC_EMAIL_LIKE,))
+        cursor.execute("DELETE FROM registered_customer WHERE Email LIKE %s", (SYNTHETIC_EMAIL_LIKE,))
+        cursor.execute("DELETE FROM customer WHERE Email LIKE %s", (SYNTHETIC_EMAIL_LIKE,))
+    invalidate_tables("air_craft", "aircraft_class", "route")
+    rebuild_report_rollups()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load (or remove) a large synthetic flight schedule")
+    parser.add_argument("--aircraft", type=int, default=200)
+    parser.add_argument("--flights-per-aircraft", type=int, default=250)
+    parser.add_argument("--orders-per-flight", type=int, default=3)
+    parser.add_argument("--routes", type=int, default=0,
+                        help="create this many synthetic routes (default: fly the existing routes)")
+    parser.add_argument("--customers", type=int, default=2000, help="synthetic customers (every other one registered)")
+    parser.add_argument("--spare-crew", type=int, default=20, help="unassigned synthetic pilots (plus 2x attendants)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--drop", action="store_true", help="delete the synthetic data and exit")
+    args = parser.parse_args()
+
+    if args.drop:
+        drop()
+        return
+    print(build(args.aircraft, args.flights_per_aircraft, args.orders_per_flight, args.seed,
+                args.routes, args.customers, args.spare_crew))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import dataset  # noqa: E402
+from utils import (  # noqa: E402
+    FLIGHT_STATUS_COMPLETED,
+    FLIGHT_STATUS_SCHEDULED,
+    ORDER_STATUS_ACTIVE,
+    WATERMARK_FLIGHTS_LANDED,
+    db_cursor,
+    rebuild_report_rollups,
+    set_watermark,
+    update_flights_status,
+    update_orders_status_when_flight_completed,
+)
+
+
+# סך קריאות השורות של החיבור הנוכחי (Handler_read_*), כמדד לשורות שנבדקו
+def handler_reads(cursor):
+    cursor.execute("SHOW SESSION STATUS LIKE 'Handler_read%'")
+    return sum(int(value) for _, value in cursor.fetchall())
+
+
+# מחזיר טיסות סינתטיות שכבר נחתו למצב SCHEDULED: landed הטיסות האחרונות נמצאות בחלון שאחרי
+# סימן המים (כמו ריצה רגילה), ו-late טיסות ישנות יותר נשארות לפני סימן המים (טיסות שנכתבו באיחור).
+# ההזמנות של הטיסות חוזרות ל-Active ואירועי ההשלמה שנשארו מריצה קודמת נמחקים
+def reset_landed(cursor, landed, late):
+    cursor.execute(
+        """
+        SELECT Air_Craft_ID, Dep_Date, Dep_Hour, Arr_TS
+        FROM flight
+        WHERE Air_Craft_ID LIKE %s AND Status = %s AND Arr_TS <= NOW()
+        ORDER BY Arr_TS DESC
+        LIMIT %s
+        """,
+        (f"{dataset.SYNTHETIC_PREFIX}%", FLIGHT_STATUS_COMPLETED, landed + late),
+    )
+    rows = cursor.fetchall()
+    if len(rows) < landed + late:
+        raise RuntimeError("not enough landed synthetic flights; load a larger dataset")
+    placeholders = ",".join(["(%s, %s, %s)"] * len(rows))
+    keys = [x for row in rows for x in row[:3]]
+    cursor.execute(
+        f"UPDATE flight SET Status = %s WHERE (Air_Craft_ID, Dep_Date, Dep_Hour) IN ({placeholders})",
+        (FLIGHT_STATUS_SCHEDULED, *keys),
+    )
+    cursor.execute(
+        f"""
+        UPDATE flight_order fo
+        JOIN tickets t ON t.Order_ID = fo.Order_ID
+        SET fo.Order_status = %s
+        WHERE (t.Air_Craft_ID, t.Dep_Date, t.Dep_Hour) IN ({placeholders})
+        """,
+        (ORDER_STATUS_ACTIVE, *keys),
+    )
+    cursor.execute(
+        "DELETE FROM flight_completion WHERE Air_Craft_ID LIKE %s", (f"{dataset.SYNTHETIC_PREFIX}%",)
+    )
+    set_watermark(cursor, WATERMARK_FLIGHTS_LANDED, rows[landed - 1][3] - timedelta(seconds=1))
+    return rows
+
+
+# מריץ את func אחרי reset_landed (ו-prepare, שלא נמדד) ומודד זמן, קריאות שורות ואת משך המנה הארוכה ביותר.
+# כל מנה רצה בטרנזקציה משלה כמו בתחזוקה הרגילה, ו-checkpoint נקרא לפני כל מנה, כך ש-batch_ms_max
+# הוא משך הטרנזקציה (והנעילות) הארוכה ביותר. השינויים נשמרים; reset_landed מחזיר אותם בריצה הבאה
+def measure(func, landed, late, runs, prepare=None):
+    timings, reads, batches = [], [], []
+    for _ in range(runs):
+        marks = []
+        with db_cursor(transaction=True) as cursor:
+            reset_landed(cursor, landed, late)
+        if prepare is not None:
+            prepare()
+        with db_cursor() as cursor:
+            # SHOW STATUS עצמה נספרת בקריאות, לכן מודדים את העלות שלה ומחסירים
+            first = handler_reads(cursor)
+            before = handler_reads(cursor)
+            overhead = before - first
+        started = time.perf_counter()
+        func(lambda: marks.append(time.perf_counter()))
+        finished = time.perf_counter()
+        timings.append(finished - started)
+        marks.append(finished)
+        batches.append(max((b - a for a, b in zip(marks, marks[1:])), default=finished - started))
+        with db_cursor() as cursor:
+            reads.append(handler_reads(cursor) - before - overhead)
+    timings.sort()
+    return {
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 3),
+        "max_ms": round(timings[-1] * 1000, 3),
+        "rows_read_mean": round(sum(reads) / len(reads)),
+        "rows_read_max": max(reads),
+        "batch_ms_max": round(max(batches) * 1000, 3),
+    }
+
+
+def flight_count():
+    with db_cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM flight")
+        return cursor.fetchone()[0]
+
+
+# מודד את שני שלבי התחזוקה על הנתונים שטעונים כרגע
+def measure_step(landed, late, runs):
+    return {
+        "flights_status": measure(lambda checkpoint: update_flights_status(), landed, late, runs),
+        # ההזמנות נמדדות אחרי שהטיסות הושלמו ורשמו אירועי השלמה; batch_ms_max הוא משך הנעילות של מנה
+        "orders_completed": measure(
+            lambda checkpoint: update_orders_status_when_flight_completed(checkpoint=checkpoint),
+            landed, late, runs, prepare=update_flights_status,
+        ),
+    }
+
+
+# לכל גודל היסטוריה: טוען את הנתונים הסינתטיים מחדש ומודד את ריצת התחזוקה על אותו מספר טיסות שנחתו.
+# אם הזמן והשורות שנקראו לא גדלים עם ההיסטוריה, עלות הריצה תלויה רק בכמות העבודה החדשה
+def run(args):
+    results = []
+    for size in args.history:
+        dataset.drop()
+        info = dataset.build(args.aircraft, size, args.orders_per_flight, seed=args.seed)
+        results.append({
+            "flights_per_aircraft": size,
+            "flights_total": flight_count(),
+            "dataset": info,
+            **measure_step(args.landed, args.late, args.runs),
+        })
+        # reset_landed לא מעדכן את סיכומי הדוחות, לכן הם נבנים מחדש אחרי המדידות
+        rebuild_report_rollups()
+    if not args.keep:
+        dataset.drop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that the flight and order maintenance cost stays flat as the history grows: reload the "
+                    "synthetic dataset at each history size and time the same amount of new work. "
+                    "Run against a scratch database loaded from schema.sql; prints JSON.")
+    parser.add_argument("--history", type=int, nargs="+", default=[25, 50, 100, 200, 400],
+                        help="flights per aircraft for each step")
+    parser.add_argument("--aircraft", type=int, default=200)
+    parser.add_argument("--orders-per-flight", type=int, default=3)
+    parser.add_argument("--landed", type=int, default=100, help="flights landed since the last run")
+    parser.add_argument("--late", type=int, default=10, help="flights that landed before the watermark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="keep the last dataset loaded")
+    args = parser.parse_args()
+    # חיבור יחיד במאגר: Handler_read_* הם מונים של החיבור, וכך כל המנות נספרות על אותו חיבור
+    os.environ["DB_POOL_SIZE"] = "1"
+    report = {
+        "meta": {"started_at": datetime.now().isoformat(timespec="seconds"),
+                 "landed": args.landed, "late": args.late, "runs": args.runs},
+        "steps": run(args),
+    }
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
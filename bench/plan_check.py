@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import sys
+import uuid
+
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import dataset  # noqa: E402
+from bench.common import load_context, maintenance_window, rolled_back  # noqa: E402
+from reports import get_report_data  # noqa: E402
+from sql_trace import record_statements  # noqa: E402
+from utils import (  # noqa: E402
+    cancel_flight_if_allowed,
+    cancel_order_by_policy,
+    create_flight_and_assign_crew,
+    db_cursor,
+    get_allflights_filtered,
+    get_available_attendants,
+    get_available_pilots,
+    get_custorders,
+    get_flight_seats_left,
+    get_order_with_tickets,
+    get_seat_occupancy,
+    get_specific_aricrafts,
+    hold_seats,
+    insert_order_and_tickets,
+    mailexists,
+    new_guest,
+    new_user,
+    purge_expired_seat_holds,
+    update_flights_status,
+    update_orders_status_when_flight_completed,
+)
+
+# טבלאות קטנות שמותר לסרוק במלואן (גודלן לא תלוי בהיסטוריית הטיסות וההזמנות)
+SMALL_TABLES = {
+    "route", "air_craft", "aircraft_class", "employee", "pilot", "flight_attendent", "manager",
+    "address", "maintenance_state", "maintenance_lease", "schema_migrations",
+}
+FULL_SCAN_ACCESS = {"ALL", "index"}
+# scans: טבלאות נוספות שמותר לסרוק במלואן בתרחיש מסוים
+DEFAULT_LIMITS = {"max_rows": 1000, "filesort": False, "temporary": False, "scans": frozenset()}
+
+
+# קונה מושב פנוי אחד בטיסה (שמירה ואז הזמנה)
+def checkout(ctx):
+    token = uuid.uuid4().hex
+    seats = get_seat_occupancy(ctx["aircraft"], ctx["dep_date"], ctx["dep_hour"], False, token)
+    start, rows, cols = seats.cabins["Economy"]
+    seat = next(f"{r}-{c}" for r in range(start, start + rows) for c in range(1, cols + 1) if not seats.is_taken(r, c))
+    hold_seats(token, ctx["aircraft"], ctx["dep_date"], ctx["dep_hour"], [seat])
+    insert_order_and_tickets(ctx["email"], ctx["aircraft"], ctx["dep_date"], ctx["dep_hour"],
+                             [seat], [], 100, None, 100, hold_token=token)
+
+
+# הרשמה כמו במסך ההרשמה: בדיקת מייל קיים ואז יצירת המשתמש
+def signup(ctx):
+    email = f"{uuid.uuid4().hex}@{dataset.SYNTHETIC_DOMAIN}"
+    if not mailexists(email):
+        new_user("Plan Check", email, dataset.SYNTHETIC_PASSWORD, "P0000000", "1990-01-01",
+                 ctx["dep_date"], ["0500000000"])
+
+
+def guest(ctx):
+    email = f"{uuid.uuid4().hex}@{dataset.SYNTHETIC_DOMAIN}"
+    if not mailexists(email):
+        new_guest(email, "Plan Check", ["0500000000"])
+
+
+# טיסה חדשה עם צוות באשף הוספת הטיסה, רחוק בעתיד כדי שלא תתנגש בטיסות קיימות
+def add_flight(ctx):
+    create_flight_and_assign_crew(ctx["aircraft"], ctx["origin"], ctx["dest"], ctx["dep_date"] + timedelta(days=3650),
+                                  ctx["dep_time"], 100, 200, ctx["pilots"], ctx["attendants"])
+
+
+# תרחישים: שם, פונקציה שמריצה את ה-helper לפי נתוני ההקשר, וחריגות ממגבלות ברירת המחדל
+SCENARIOS = [
+    ("search_by_date", lambda c: get_allflights_filtered(date=c["dep_date"].isoformat()), {}),
+    ("available_pilots", lambda c: get_available_pilots(c["origin"], c["dep_date"], c["dep_time"], True), {}),
+    ("available_attendants", lambda c: get_available_attendants(c["origin"], c["dep_date"], c["dep_time"], False), {}),
+    ("available_aircraft", lambda c: get_specific_aricrafts(c["origin"], c["dest"], c["dep_date"], c["dep_time"]), {}),
+    ("seat_occupancy", lambda c: get_seat_occupancy(c["aircraft"], c["dep_date"], c["dep_hour"], True, None), {}),
+    ("seats_left", lambda c: get_flight_seats_left(c["aircraft"], c["dep_date"], c["dep_hour"]), {}),
+    # הקיבוץ לפי הזמנה והמיון לפי ההמראה הראשונה בטבלה המשנית רצים על ההזמנות של לקוח אחד בלבד
+    # (דרך האינדקס Email_Status); max_rows נשאר בתוקף, כך שמיון של כל ההיסטוריה עדיין ייכשל
+    ("order_history", lambda c: get_custorders(c["history_email"]), {"filesort": True, "temporary": True}),
+    ("order_details", lambda c: get_order_with_tickets(c["order_id"], c["order_email"]), {}),
+    ("checkout", rolled_back(checkout), {}),
+    ("cancel_order", lambda c: rolled_back(cancel_order_by_policy)(c["order_id"], c["order_email"]), {}),
+    ("cancel_flight", lambda c: rolled_back(cancel_flight_if_allowed)(
+        c["aircraft"], c["dep_date"], c["dep_time"], c["origin"], c["dest"]), {}),
+    ("flights_landed", lambda c: rolled_back(maintenance_window(update_flights_status))(), {}),
+    ("orders_completed", lambda c: rolled_back(maintenance_window(update_orders_status_when_flight_completed))(), {}),
+    ("purge_seat_holds", lambda c: rolled_back(purge_expired_seat_holds)(), {}),
+    ("signup", rolled_back(signup), {}),
+    ("guest", rolled_back(guest), {}),
+    ("add_flight", rolled_back(add_flight), {}),
+    # הדוחות קוראים רק מטבלאות הסיכום (שורה ליום ולסטטוס, מסלול או עובד), שגודלן תלוי בחלון הימים ולא
+    # במספר הטיסות וההזמנות: הקיבוץ והמיון לפי הסכום צריכים טבלה זמנית ומיון, חלון 30 הימים של crew_load
+    # עובר על כל הצוות לכל יום (יותר מ-max_rows), וקצב הביטולים מציג את כל החודשים ולכן סורק את
+    # report_order_daily במלואה
+    ("manager_reports", lambda c: get_report_data(),
+     {"max_rows": None, "filesort": True, "temporary": True, "scans": {"report_order_daily"}}),
+]
+
+
+# עובר על עץ ה-EXPLAIN FORMAT=JSON ומחזיר את גישות הטבלאות ואם יש מיון קובץ או טבלה זמנית
+def walk_plan(node, tables, flags):
+    if isinstance(node, dict):
+        if "table_name" in node and "access_type" in node:
+            tables.append({
+                "table": node["table_name"],
+                "access_type": node["access_type"],
+                "key": node.get("key"),
+                "rows": int(node.get("rows_examined_per_scan", 0)),
+            })
+        if node.get("using_filesort"):
+            flags.add("filesort")
+        if node.get("using_temporary_table"):
+            flags.add("temporary")
+        for value in node.values():
+            walk_plan(value, tables, flags)
+    elif isinstance(node, list):
+        for value in node:
+            walk_plan(value, tables, flags)
+
+
+def explainable(sql):
+    head = sql.lstrip().split(None, 1)[0].upper()
+    return head in ("SELECT", "UPDATE", "DELETE") or (head == "INSERT" and "SELECT" in sql.upper())
+
+
+# מריץ EXPLAIN על פקודה ומחזיר רשימת הפרות של המגבלות
+def check_statement(cursor, sql, params, limits):
+    cursor.execute("EXPLAIN FORMAT=JSON " + sql, params)
+    plan = json.loads(cursor.fetchone()[0])
+    tables, flags = [], set()
+    walk_plan(plan, tables, flags)
+    violations = []
+    for t in tables:
+        if t["table"].startswith("<") or t["table"] in SMALL_TABLES or t["table"] in limits["scans"]:
+            continue
+        if t["access_type"] in FULL_SCAN_ACCESS:
+            violations.append(f"full scan of {t['table']} ({t['access_type']})")
+        elif limits["max_rows"] is not None and t["rows"] > limits["max_rows"]:
+            violations.append(f"{t['table']} examines {t['rows']} rows per scan via {t['key']}")
+    for flag in ("filesort", "temporary"):
+        if flag in flags and not limits[flag]:
+            violations.append(f"uses {flag}")
+    return tables, sorted(flags), violations
+
+
+# מריץ תרחיש אחד, מקליט את פקודות ה-SQL שלו ובודק את תוכנית הביצוע של כל אחת.
+# המטמון צריך להיות כבוי (QUERY_CACHE_ENABLED=0) כדי שכל שאילתה תגיע למסד ותוקלט
+def check_scenario(ctx, func, overrides, max_rows=DEFAULT_LIMITS["max_rows"]):
+    limits = dict(DEFAULT_LIMITS, max_rows=max_rows)
+    limits.update(overrides)
+    with record_statements() as statements:
+        func(ctx)
+    checked, seen = [], set()
+    with db_cursor() as cursor:
+        for sql, params in statements:
+            if sql in seen or not explainable(sql):
+                continue
+            seen.add(sql)
+            tables, flags, violations = check_statement(cursor, sql, params, limits)
+            checked.append({"sql": " ".join(sql.split())[:200], "tables": tables, "flags": flags,
+                            "violations": violations})
+    return checked
+
+
+def run(scenarios, max_rows):
+    ctx = load_context()
+    report = {}
+    for name, func, overrides in scenarios:
+        checked = check_scenario(ctx, func, overrides, max_rows)
+        report[name] = {"ok": all(not s["violations"] for s in checked), "statements": checked}
+    return report
+
+
+# מעדכן את הסטטיסטיקות של הטבלאות הגדולות אחרי טעינת נתונים, כדי שהתוכניות יהיו כמו במסד אמיתי
+def analyze_tables():
+    with db_cursor() as cursor:
+        cursor.execute("ANALYZE TABLE flight, tickets, flight_order, flight_inventory, crew_location, aircraft_location")
+        cursor.fetchall()
+
+
+# דוח ידני על מסד גדול; הבדיקה האוטומטית היא tests/test_query_plans.py
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every statement issued by the utils helpers and report plan regressions")
+    parser.add_argument("--load", action="store_true", help="load the synthetic dataset (bench/dataset.py) first")
+    parser.add_argument("--aircraft", type=int, default=200)
+    parser.add_argument("--flights-per-aircraft", type=int, default=250)
+    parser.add_argument("--max-rows", type=int, default=DEFAULT_LIMITS["max_rows"],
+                        help="maximum rows examined per scan on a history-sized table")
+    parser.add_argument("--only", action="append", help="run only the named scenario (repeatable)")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args()
+    os.environ["QUERY_CACHE_ENABLED"] = "0"
+
+    if args.load:
+        print(dataset.build(args.aircraft, args.flights_per_aircraft), flush=True)
+        analyze_tables()
+
+    scenarios = [s for s in SCENARIOS if not args.only or s[0] in args.only]
+    report = run(scenarios, args.max_rows)
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        for name, result in report.items():
+            print(f"{'PASS' if result['ok'] else 'FAIL'} {name}")
+            for statement in result["statements"]:
+                for violation in statement["violations"]:
+                    print(f"    {violation}: {statement['sql']}")
+
+
+if __name__ == "__main__":
+    main()
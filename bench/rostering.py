@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rostering import AIRBORNE, CrewMember, Roster, RosterFlight, roster_flights  # noqa: E402
+from utils import LONG_FLIGHT_HOURS, required_crew  # noqa: E402
+
+
+# טיסות סינתטיות בזיכרון: כל מטוס טס ברצף בין שדות אקראיים עם זמן סבב בין טיסות
+def synthetic_flights(rng, airports, aircraft_count, flights_per_aircraft, start):
+    flights = []
+    for n in range(aircraft_count):
+        aircraft_id = f"SYN{n:05d}"
+        size = "Large" if n % 3 else "Small"
+        location = rng.choice(airports)
+        dep = start + timedelta(hours=rng.randint(0, 24))
+        for _ in range(flights_per_aircraft):
+            dest = rng.choice([a for a in airports if a != location])
+            hours = rng.choice((1.5, 2.5, 3, 4, 5)) if size == "Small" else rng.choice((2, 3, 5, 8, 11))
+            arr = dep + timedelta(hours=hours)
+            flights.append(RosterFlight((aircraft_id, dep.date(), dep.time()), dep, arr, location, dest, hours, size))
+            location = dest
+            dep = arr + timedelta(hours=rng.randint(2, 6))
+    return flights
+
+
+# צוות סינתטי: רובו מפוזר בשדות עם שעות קודמות אקראיות, חלקו בלי היסטוריה (זמין בכל שדה)
+# וחלקו באוויר עם שיבוץ קיים שנוחת אחרי תחילת הריצה
+def synthetic_crew(rng, airports, crew_count, start, trained_share, floating_share):
+    crew, legs = [], []
+    for n in range(crew_count):
+        role = "Pilot" if n % 3 == 0 else "Flight_Attendant"
+        emp_id = f"SYN{role[0]}{n:06d}"
+        trained = rng.random() < trained_share
+        hours = round(rng.uniform(0, 120), 2)
+        roll = rng.random()
+        if roll < floating_share:
+            crew.append(CrewMember(emp_id, role, trained, 0.0))
+        elif roll < floating_share + 0.1:
+            crew.append(CrewMember(emp_id, role, trained, hours, AIRBORNE))
+            dep = start - timedelta(hours=rng.randint(1, 4))
+            origin, dest = rng.sample(airports, 2)
+            legs.append((emp_id, dep, dep + timedelta(hours=rng.randint(5, 12)), origin, dest))
+        else:
+            crew.append(CrewMember(emp_id, role, trained, hours, rng.choice(airports), start - timedelta(days=1)))
+    return crew, legs
+
+
+# מריץ את המנוע על נתונים סינתטיים ובודק שהתוצאה עומדת בכללים (כמות, הכשרה, רציפות מיקום וחפיפות)
+def run_synthetic(args):
+    rng = random.Random(args.seed)
+    start = datetime(2030, 1, 1)
+    airports = [f"SYN City {i:03d}" for i in range(args.airports)]
+    flights = synthetic_flights(rng, airports, args.aircraft, args.flights_per_aircraft, start)
+    crew, legs = synthetic_crew(rng, airports, args.crew, start, args.trained_share, args.floating_share)
+    initial = {m.id: m.location for m in crew}
+
+    started = time.perf_counter()
+    roster = Roster(crew, legs, repair_depth=args.repair_depth)
+    staffed, unstaffed = roster.run(flights)
+    seconds = time.perf_counter() - started
+
+    violations = validate(roster, staffed, initial, legs) if args.validate else None
+    return {
+        "mode": "synthetic",
+        "flights": len(flights),
+        "crew": len(crew),
+        "airports": len(airports),
+        "staffed": len(staffed),
+        "unstaffed": len(unstaffed),
+        "fill_rate": round(len(staffed) / len(flights), 4) if flights else None,
+        "repairs": roster.repairs,
+        "seconds": round(seconds, 3),
+        "flights_per_second": round(len(flights) / seconds) if seconds else None,
+        "load_hours": roster.load_spread(),
+        "violations": violations,
+    }
+
+
+def validate(roster, staffed, initial, legs):
+    problems = []
+    timelines = {}
+    for emp_id, dep, arr, origin, dest in legs:
+        timelines.setdefault(emp_id, []).append((dep, arr, origin, dest))
+    teams = {}
+    for flight, emp_id, role in roster.assignments():
+        teams.setdefault(flight.key, []).append((emp_id, role))
+        timelines.setdefault(emp_id, []).append((flight.dep, flight.arr, flight.origin, flight.dest))
+        if flight.is_long and not roster.crew[emp_id].trained:
+            problems.append(f"{emp_id} untrained on {flight.key}")
+    for flight in staffed:
+        need = dict(zip(("Pilot", "Flight_Attendant"), required_crew(flight.size)))
+        have = [role for _, role in teams.get(flight.key, [])]
+        if any(have.count(role) != count for role, count in need.items()):
+            problems.append(f"wrong crew count on {flight.key}")
+    for emp_id, spans in timelines.items():
+        spans.sort()
+        location = initial[emp_id]
+        for i, (dep, arr, origin, dest) in enumerate(spans):
+            if i and dep < spans[i - 1][1]:
+                problems.append(f"{emp_id} overlaps at {dep}")
+            if location not in (None, AIRBORNE) and location != origin:
+                problems.append(f"{emp_id} departs {origin} but is at {location}")
+            location = dest
+    return {"count": len(problems), "sample": problems[:20]}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the crew rostering engine on synthetic in-memory flights and crew (default), "
+                    "or as a dry run against the database with --db. Prints the results as JSON.")
+    parser.add_argument("--aircraft", type=int, default=300)
+    parser.add_argument("--flights-per-aircraft", type=int, default=20)
+    parser.add_argument("--crew", type=int, default=6000)
+    parser.add_argument("--airports", type=int, default=25)
+    parser.add_argument("--trained-share", type=float, default=0.6, help="share of crew with long-haul training")
+    parser.add_argument("--floating-share", type=float, default=0.05, help="share of crew with no flights yet")
+    parser.add_argument("--repair-depth", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-validate", dest="validate", action="store_false", help="skip the rule check")
+    parser.add_argument("--db", action="store_true", help="dry-run roster_flights on the database instead")
+    parser.add_argument("--days", type=int, default=30, help="window length from now for --db")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    if args.db:
+        now = datetime.now().replace(microsecond=0)
+        report = roster_flights(now, now + timedelta(days=args.days), dry_run=True)
+        report["unstaffed"] = len(report["unstaffed"])
+        report["mode"] = "db"
+    else:
+        report = run_synthetic(args)
+    report["long_flight_hours"] = LONG_FLIGHT_HOURS
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# הסשנים של לקוח הבדיקה נשמרים בתיקייה זמנית ולא בתיקיית הסשנים של השרת
+os.environ.setdefault("SESSION_SQLITE_DIR", tempfile.mkdtemp(prefix="flytau-bench-sessions-"))
+
+from bench import dataset  # noqa: E402
+from bench.common import load_context, maintenance_window, rolled_back  # noqa: E402
+from main import app  # noqa: E402
+from query_cache import cache_enabled  # noqa: E402
+from reports import get_manager_reports  # noqa: E402
+from sql_trace import record_statements  # noqa: E402
+from utils import (  # noqa: E402
+    get_allflights_filtered,
+    get_available_pilots,
+    get_custorders,
+    get_specific_aricrafts,
+    get_taken_seat_for_flight,
+    update_flights_fully_booked,
+    update_flights_status,
+    update_orders_status_when_flight_completed,
+)
+
+
+# פונקציות ה-utils שנמדדות: שם ופונקציה שמקבלת את נתוני ההקשר
+HELPERS = [
+    ("search_by_date", lambda c: get_allflights_filtered(date=c["dep_date"].isoformat())),
+    ("search_by_route", lambda c: get_allflights_filtered(origin=c["origin"], destination=c["dest"])),
+    ("taken_seats", lambda c: get_taken_seat_for_flight(c["aircraft"], c["dep_date"], c["dep_hour"])),
+    ("available_pilots", lambda c: get_available_pilots(c["origin"], c["dep_date"], c["dep_time"], True)),
+    ("available_aircraft", lambda c: get_specific_aricrafts(c["origin"], c["dest"], c["dep_date"], c["dep_time"])),
+    ("customer_orders", lambda c: get_custorders(c["order_email"])),
+    ("manager_reports", lambda c: get_manager_reports(app)),
+    ("flights_status", lambda c: rolled_back(maintenance_window(update_flights_status))()),
+    ("orders_completed", lambda c: rolled_back(maintenance_window(update_orders_status_when_flight_completed))()),
+    ("flights_fully_booked", lambda c: rolled_back(update_flights_fully_booked)()),
+]
+
+# עמודי האתר שנמדדים דרך test_client: שם, סוג משתמש (None = אורח) וכתובת לפי ההקשר
+ROUTES = [
+    ("home", None, lambda c: "/"),
+    ("search", None, lambda c: "/search_order_flights"),
+    ("search_by_date", None, lambda c: f"/search_order_flights?date={c['dep_date'].isoformat()}"),
+    ("choose_seat_count", None, lambda c: (
+        f"/search_order_flights/choosenumseat?aircraft={c['aircraft']}&dep_date={c['dep_date']}"
+        f"&dep_time={c['dep_time']}&origin={c['origin']}&destination={c['dest']}"
+        f"&economy_price=100&business_price=none")),
+    ("customer_orders", "customer", lambda c: "/custorder_details"),
+    ("manager_flights", "manager", lambda c: "/homemgr/flights"),
+    ("manager_reports", "manager", lambda c: "/homemgr/reports"),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+# מריץ פונקציה כמה פעמים ומחזיר זמני p50/p99 ומספר שאילתות SQL לכל הרצה
+def measure(func, runs, warmup):
+    for _ in range(warmup):
+        func()
+    timings, queries = [], []
+    for _ in range(runs):
+        with record_statements() as statements:
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        queries.append(len(statements))
+    return {
+        "runs": runs,
+        "p50_ms": round(percentile(timings, 50) * 1000, 3),
+        "p99_ms": round(percentile(timings, 99) * 1000, 3),
+        "mean_ms": round(sum(timings) / runs * 1000, 3),
+        "queries_mean": round(sum(queries) / runs, 2),
+        "queries_max": max(queries),
+    }
+
+
+# לקוח test_client עם סשן של לקוח רשום או מנהל (או בלי סשן לאורח)
+def make_client(kind, ctx):
+    client = app.test_client()
+    if kind is not None:
+        with client.session_transaction() as sess:
+            if kind == "customer":
+                sess["mail"] = ctx["order_email"]
+                sess["fullname"] = "Bench Customer"
+            else:
+                sess["id"] = "bench"
+                sess["namemgr"] = "Bench Manager"
+                sess["is_admin"] = True
+    return client
+
+
+def run_helpers(ctx, names, runs, warmup):
+    results = {}
+    for name, func in HELPERS:
+        if names and name not in names:
+            continue
+        with app.app_context():
+            results[name] = measure(lambda: func(ctx), runs, warmup)
+    return results
+
+
+def run_routes(ctx, names, runs, warmup):
+    results = {}
+    for name, kind, path in ROUTES:
+        if names and name not in names:
+            continue
+        client = make_client(kind, ctx)
+        url = path(ctx)
+
+        def request():
+            response = client.get(url)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{url} returned {response.status_code}")
+
+        results[name] = measure(request, runs, warmup)
+    return results
+
+
+# מוסיף לכל מדידה את היחס ל-p50 של אותה מדידה בריצה קודמת
+def compare(report, baseline):
+    for section in ("helpers", "routes"):
+        for name, result in report[section].items():
+            before = baseline.get(section, {}).get(name)
+            if before and before["p50_ms"]:
+                result["p50_vs_baseline"] = round(result["p50_ms"] / before["p50_ms"], 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the hot utils helpers and pages (p50/p99 latency, SQL statements per call) "
+                    "and print the results as JSON. Set QUERY_CACHE_ENABLED=0 to measure uncached queries.")
+    parser.add_argument("--load", action="store_true", help="load the synthetic dataset (bench/dataset.py) first")
+    parser.add_argument("--aircraft", type=int, default=200)
+    parser.add_argument("--flights-per-aircraft", type=int, default=250)
+    parser.add_argument("--routes-count", type=int, default=0, help="synthetic routes to create with --load")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--only", action="append", help="measure only the named helper/page (repeatable)")
+    parser.add_argument("--skip-routes", action="store_true", help="measure only the utils helpers")
+    parser.add_argument("--baseline", help="JSON file from an earlier run to compare p50 against")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    dataset_info = None
+    if args.load:
+        dataset_info = dataset.build(args.aircraft, args.flights_per_aircraft, routes_count=args.routes_count)
+
+    ctx = load_context()
+    report = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "runs": args.runs,
+            "warmup": args.warmup,
+            "query_cache": cache_enabled(),
+            "dataset": dataset_info,
+        },
+        "helpers": run_helpers(ctx, args.only, args.runs, args.warmup),
+        "routes": {} if args.skip_routes else run_routes(ctx, args.only, args.runs, args.warmup),
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
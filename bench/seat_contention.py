@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import (  # noqa: E402
+    SeatHoldError,
+    get_seat_occupancy,
+    hold_seats,
+    insert_order_and_tickets,
+    pool_stats,
+)
+
+
+# קונה מדומה: בוחר מושבים פנויים, שומר אותם והופך את השמירה להזמנה, עד שהטיסה מתמלאת
+def buyer(args, counters, lock, deadline):
+    token = uuid.uuid4().hex
+    while time.monotonic() < deadline:
+        seats = get_seat_occupancy(args.aircraft, args.dep_date, args.dep_time, False, token)
+        start, rows, cols = seats.cabins["Economy"]
+        free = [f"{r}-{c}" for r in range(start, start + rows) for c in range(1, cols + 1) if not seats.is_taken(r, c)]
+        if not free:
+            return
+        chosen = random.sample(free, min(args.seats, len(free)))
+        held, _ = hold_seats(token, args.aircraft, args.dep_date, args.dep_time, chosen)
+        if not held:
+            with lock:
+                counters["hold_conflicts"] += 1
+            continue
+        try:
+            insert_order_and_tickets(args.email, args.aircraft, args.dep_date, args.dep_time,
+                                     chosen, [], args.price, None, args.price * len(chosen), hold_token=token)
+        except SeatHoldError:
+            with lock:
+                counters["lost_at_checkout"] += 1
+            continue
+        with lock:
+            counters["orders"] += 1
+            counters["seats_sold"] += len(chosen)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Many simulated buyers booking seats on one flight")
+    parser.add_argument("--aircraft", required=True)
+    parser.add_argument("--dep-date", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--dep-time", required=True, help="HH:MM:SS")
+    parser.add_argument("--email", required=True, help="existing customer e-mail the orders are placed under")
+    parser.add_argument("--buyers", type=int, default=32)
+    parser.add_argument("--seats", type=int, default=2, help="seats per order")
+    parser.add_argument("--price", type=float, default=100.0)
+    parser.add_argument("--duration", type=float, default=60.0, help="stop after this many seconds")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DB_POOL_SIZE", str(args.buyers))
+    counters = {"orders": 0, "seats_sold": 0, "hold_conflicts": 0, "lost_at_checkout": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+    threads = [threading.Thread(target=buyer, args=(args, counters, lock, deadline)) for _ in range(args.buyers)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    attempts = counters["orders"] + counters["hold_conflicts"] + counters["lost_at_checkout"]
+    result = dict(counters)
+    result.update(
+        buyers=args.buyers,
+        elapsed_s=round(elapsed, 3),
+        orders_per_s=round(counters["orders"] / elapsed, 2) if elapsed else 0.0,
+        wasted_attempt_ratio=round(1 - counters["orders"] / attempts, 4) if attempts else 0.0,
+        db_pool=pool_stats(),
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
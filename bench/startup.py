@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# רץ בתהליך חדש: מודד זמן ייבוא של main וזמן עד לתשובה הראשונה (דרך test_client, בלי שרת)
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+response = main.app.test_client().get(sys.argv[1])
+done = time.perf_counter()
+print(json.dumps({"import_s": imported - started, "first_request_s": done - started,
+                  "status": response.status_code, "matplotlib_loaded": "matplotlib" in sys.modules}))
+"""
+
+
+# מריץ את main בתהליך חדש עם -X importtime ומחזיר את המודולים עם זמן הייבוא המצטבר הגבוה ביותר
+def import_profile(top):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.append((int(cumulative_us), int(self_us), name.strip()))
+    modules.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": c / 1000, "self_ms": s / 1000} for c, s, name in modules[:top]]
+
+
+# מודד עלייה קרה אחת: זמן מהפעלת התהליך ועד סוף הייבוא ועד התשובה הראשונה
+def cold_start(path):
+    spawned = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", CHILD, path], cwd=ROOT, capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["process_s"] = time.perf_counter() - spawned
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker cold-start benchmark: import time and time-to-first-request")
+    parser.add_argument("--path", default="/", help="first request path (default: the anonymous home page)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="fail (exit 1) if the median time-to-first-request exceeds this many seconds")
+    args = parser.parse_args()
+
+    runs = [cold_start(args.path) for _ in range(args.runs)]
+    first_request = sorted(r["first_request_s"] for r in runs)
+    median = first_request[len(first_request) // 2]
+    report = {
+        "runs": runs,
+        "median_import_s": round(sorted(r["import_s"] for r in runs)[len(runs) // 2], 4),
+        "median_first_request_s": round(median, 4),
+        "slowest_imports": import_profile(args.top),
+    }
+    print(json.dumps(report, indent=2))
+    if args.budget is not None and median > args.budget:
+        print(f"cold start {median:.3f}s exceeds budget {args.budget:.3f}s", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import db_cursor  # noqa: E402
+
+# זוגות של שאילתה בצורה הישנה (פונקציה על עמודה) מול הצורה שמשתמשת בעמודות Dep_TS / Arr_TS
+QUERIES = {
+    "search_order": (
+        "SELECT f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour FROM flight f "
+        "WHERE TIMESTAMP(f.Dep_Date, f.Dep_Hour) >= %(now)s "
+        "ORDER BY TIMESTAMP(f.Dep_Date, f.Dep_Hour) LIMIT 50",
+        "SELECT f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour FROM flight f "
+        "WHERE f.Dep_TS >= %(now)s ORDER BY f.Dep_TS LIMIT 50",
+    ),
+    "landed_window": (
+        "SELECT COUNT(*) FROM flight f "
+        "WHERE TIMESTAMP(f.Arrival_Date, f.Arrival_Time) > %(since)s "
+        "AND TIMESTAMP(f.Arrival_Date, f.Arrival_Time) <= %(now)s",
+        "SELECT COUNT(*) FROM flight f WHERE f.Arr_TS > %(since)s AND f.Arr_TS <= %(now)s",
+    ),
+    "order_nearest_departure": (
+        "SELECT MIN(TIMESTAMP(t.Dep_Date, t.Dep_Hour)) FROM tickets t WHERE t.Order_ID = %(order_id)s",
+        "SELECT MIN(t.Dep_TS) FROM tickets t WHERE t.Order_ID = %(order_id)s",
+    ),
+}
+
+
+# מחזיר את תוכנית הביצוע של שאילתה (טבלה, סוג גישה, אינדקס, מספר שורות משוער ו-Extra)
+def explain(cursor, sql, params):
+    cursor.execute("EXPLAIN " + sql, params)
+    names = [d[0] for d in cursor.description]
+    return [
+        {k: row[k] for k in ("table", "type", "key", "rows", "Extra") if k in row}
+        for row in (dict(zip(names, r)) for r in cursor.fetchall())
+    ]
+
+
+# מריץ שאילתה מספר פעמים ומחזיר זמן ממוצע במילישניות
+def timed(cursor, sql, params, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        cursor.execute(sql, params)
+        cursor.fetchall()
+    return round((time.perf_counter() - started) / repeat * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="EXPLAIN and timings for function-wrapped vs generated timestamp queries. "
+                    "Run against a database loaded with bench/dataset.py; prints JSON.")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    now = datetime.now().replace(microsecond=0)
+    with db_cursor() as cursor:
+        cursor.execute("SELECT MAX(Order_ID) FROM flight_order")
+        params = {"now": now, "since": now - timedelta(hours=6), "order_id": cursor.fetchone()[0]}
+        # גרסת השרת וגודל הטבלאות נשמרים עם התוצאות, כדי שאפשר יהיה להשוות בין מדידות
+        cursor.execute("SELECT VERSION()")
+        version = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM flight")
+        flights = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM tickets")
+        tickets = cursor.fetchone()[0]
+        report = {"meta": {"started_at": now.isoformat(), "server": version, "flights": flights,
+                           "tickets": tickets, "repeat": args.repeat}}
+        for name, (before, after) in QUERIES.items():
+            report[name] = {
+                "before": {"plan": explain(cursor, before, params), "ms": timed(cursor, before, params, args.repeat)},
+                "after": {"plan": explain(cursor, after, params), "ms": timed(cursor, after, params, args.repeat)},
+            }
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import base64
+import os
+from typing import Optional
+
+import msgspec
+from flask import current_app
+from itsdangerous import BadSignature, TimestampSigner
+
+# כמה שניות טוקן של תהליך הזמנה תקף מרגע החתימה האחרונה
+BOOKING_TOKEN_TTL = int(os.getenv("BOOKING_TOKEN_TTL", 3600))
+# כמה שניות אורח יכול לבטל הזמנה שאיתר, לפני שצריך לאתר אותה שוב
+ORDER_LOOKUP_TTL = int(os.getenv("ORDER_LOOKUP_TTL", 900))
+
+
+# מצב תהליך ההזמנה (טיסה, כמויות, מושבים), נשמר בטוקן חתום ולא בסשן. הטוקן עובר בכתובת ואינו מוצפן,
+# לכן אסור לשמור בו פרטים אישיים; פרטי אורח עוברים בטוקן GuestDetails נפרד
+class BookingState(msgspec.Struct, omit_defaults=True):
+    aircraft: str
+    dep_date: str
+    dep_time: str
+    origin: str
+    destination: str
+    economy_price: str
+    business_price: Optional[str] = None
+    numecon: int = 0
+    numbusi: Optional[int] = None
+    chosenecon: list[str] = []
+    chosenbusi: list[str] = []
+    hold_token: Optional[str] = None
+
+    # פרטי הטיסה במבנה שהתבניות מצפות לו
+    @property
+    def flight(self):
+        return {
+            "aircraft": self.aircraft,
+            "dep_date": self.dep_date,
+            "dep_time": self.dep_time,
+            "origin": self.origin,
+            "destination": self.destination,
+            "economy_price": self.economy_price,
+            "business_price": self.business_price,
+        }
+
+
+# פרטי אורח בתהליך ההזמנה. הטוקן חתום אבל לא מוצפן, ולכן עובר רק בשדה מוסתר בטופסי POST
+# (לא בכתובת, שנשמרת ביומנים, בהיסטוריה ובכותרת Referer); hold_token קושר אותו להזמנה אחת
+class GuestDetails(msgspec.Struct, omit_defaults=True):
+    hold_token: str
+    name: str
+    passport: str
+    dob: str
+    email: str
+    phonenums: int
+    phones: list[str] = []
+
+
+# הזמנה שאורח איתר לפי מזהה ומייל, לצורך ביטול בלי לשמור אותה בסשן; עובר רק בטופס ותקף ORDER_LOOKUP_TTL
+class OrderLookup(msgspec.Struct):
+    order_id: int
+    email: str
+
+
+def _signer(kind):
+    return TimestampSigner(current_app.secret_key, salt=f"flytau.{kind.__name__}")
+
+
+# מקודד את המצב ב-msgpack וחותם עליו עם חותמת זמן; התוצאה בטוחה לשימוש ב-URL ובטופס
+def dump_token(state):
+    payload = base64.urlsafe_b64encode(msgspec.msgpack.encode(state)).rstrip(b"=")
+    return _signer(type(state)).sign(payload).decode("ascii")
+
+
+# מחזיר את המצב מהטוקן, או None אם הטוקן חסר, מזויף, פג תוקף או לא תואם למבנה
+def load_token(token, kind, max_age=BOOKING_TOKEN_TTL):
+    if not token:
+        return None
+    try:
+        payload = _signer(kind).unsign(token, max_age=max_age)
+        raw = base64.urlsafe_b64decode(payload + b"=" * (-len(payload) % 4))
+        return msgspec.msgpack.decode(raw, type=kind)
+    except (BadSignature, ValueError, msgspec.DecodeError):
+        return None
@@ -0,0 +1,182 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+
+# גרסת ציור הגרפים: שינוי בקוד הציור צריך להעלות אותה כדי שייווצרו קבצים חדשים
+CHART_VERSION = 1
+CHART_LOCK_TTL = 120
+CHART_CACHE_SECONDS = 365 * 24 * 3600
+# גרף שאף עמוד דוחות לא הפנה אליו זמן כזה נמחק בתחזוקה. כל הצגה של העמוד מעדכנת את זמן השינוי
+# של הקבצים שהוא מציג, כך שעמוד שנטען בזמן הזה עדיין מוצא את התמונות שלו גם אחרי שהנתונים השתנו
+CHART_RETENTION_SECONDS = int(os.getenv("CHART_RETENTION_SECONDS", 7 * 24 * 3600))
+# תיקיית הגרפים של האפליקציה (static/reports ליד main.py), לתחזוקה שרצה בלי אפליקציית Flask
+REPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "reports")
+
+
+# מוודא שקיימת תיקיית דוחות ומחזיר את הנתיב שלה
+def ensure_reports_dir(app) -> str:
+    reports_dir = os.path.join(app.static_folder, "reports")
+    os.makedirs(reports_dir, exist_ok=True)
+    return reports_dir
+
+
+# יוצר גרף קצב ביטולים לפי חודש ושומר אותו כקובץ
+def make_cancel_rate_chart(rows, out_path: str):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    labels = [f"{r['y']}-{int(r['m']):02d}" for r in rows]
+    values = [float(r["cancel_rate"]) for r in rows]
+    plt.figure(figsize=(9, 3.2))
+    plt.plot(labels, values, marker="o")
+    plt.title("Cancel Rate by Month (%)")
+    plt.xlabel("Month")
+    plt.ylabel("Cancel Rate (%)")
+    plt.xticks(rotation=30, ha="right")
+    plt.tight_layout()
+    plt.savefig(out_path, dpi=160, format="png")
+    plt.close()
+
+
+# יוצר גרף עמודות של המסלולים עם ההכנסות הגבוהות ביותר
+def make_revenue_routes_chart(rows, out_path: str):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    labels = [f"{r['Origin']} - {r['Destination']}" for r in rows]
+    values = [float(r["revenue"]) for r in rows]
+    plt.figure(figsize=(9, 3.6))
+    plt.bar(labels, values)
+    plt.title("Top Revenue Routes (Last 90 Days)")
+    plt.xlabel("Route")
+    plt.ylabel("Revenue")
+    plt.xticks(rotation=25, ha="right")
+    plt.tight_layout()
+    plt.savefig(out_path, dpi=160, format="png")
+    plt.close()
+
+
+CHART_RENDERERS = {
+    "cancel_rate": make_cancel_rate_chart,
+    "revenue_routes": make_revenue_routes_chart,
+}
+
+
+# שם קובץ לפי תוכן: סוג הגרף וגיבוב של הנתונים, כך שנתונים זהים תמיד מקבלים אותו קובץ
+def chart_filename(kind, rows):
+    payload = json.dumps({"kind": kind, "version": CHART_VERSION, "rows": rows}, sort_keys=True, default=str)
+    return f"{kind}-{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:20]}.png"
+
+
+# מוחק גרפים (וקבצים זמניים של ציור שנקטע) שלא הוצגו יותר מ-max_age שניות ומחזיר כמה נמחקו.
+# שמות הגרפים קבועים לפי התוכן ונשמרים במטמון הדפדפן, לכן לא מוחקים גרף מיד כשנוצר גרף חדש מאותו סוג
+def purge_stale_charts(reports_dir=REPORTS_DIR, max_age=CHART_RETENTION_SECONDS):
+    cutoff = time.time() - max_age
+    removed = 0
+    for pattern in ("*.png", "*.tmp"):
+        for path in glob.glob(os.path.join(reports_dir, pattern)):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+# רץ בתהליך הציור: מצייר לקובץ זמני ומעביר אותו אטומית לשם הסופי, ומשחרר את נעילת הקובץ בסוף
+def render_chart(kind, rows, out_path, lock_path):
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    try:
+        CHART_RENDERERS[kind](rows, tmp_path)
+        os.replace(tmp_path, out_path)
+    finally:
+        for path in (tmp_path, lock_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    return out_path
+
+
+# לוקח נעילה על קובץ (משותפת לכל תהליכי השרת); נעילה ישנה מ-CHART_LOCK_TTL נחשבת נטושה
+def _try_lock(lock_path):
+    for _ in range(2):
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) < CHART_LOCK_TTL:
+                    return False
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+    return False
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+# מאגר תהליכי ציור לכל תהליך שרת. spawn כדי שהתהליכים לא יירשו את מצב השרת (חיבורים, תהליכונים)
+def get_executor():
+    global _executor, _executor_pid
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=int(os.getenv("CHART_WORKERS", 1)),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _executor_pid = os.getpid()
+    return _executor
+
+
+# מחזיר כתובת לתמונת הגרף אם היא כבר קיימת (ומסמן שהוצגה עכשיו); אחרת שולח ציור ברקע ומחזיר None
+# (בלי לחכות לציור)
+def chart_url(app, kind, rows):
+    if not rows:
+        return None
+    name = chart_filename(kind, rows)
+    reports_dir = ensure_reports_dir(app)
+    out_path = os.path.join(reports_dir, name)
+    try:
+        os.utime(out_path)
+        return f"/static/reports/{name}"
+    except FileNotFoundError:
+        pass
+    lock_path = out_path + ".lock"
+    if _try_lock(lock_path):
+        try:
+            get_executor().submit(render_chart, kind, rows, out_path, lock_path)
+        except Exception:
+            os.remove(lock_path)
+            raise
+    return None
+
+
+# מחזיר כתובות לכל הגרפים של הדוחות לפי הנתונים שלהם
+def chart_urls(app, data):
+    return {kind: chart_url(app, kind, data.get(kind)) for kind in CHART_RENDERERS}
+
+
+# מסמן את תמונות הגרפים כניתנות לשמירה במטמון הדפדפן לתמיד (שם הקובץ משתנה כשהתוכן משתנה)
+def init_app(app):
+    @app.after_request
+    def cache_chart_images(response):
+        from flask import request
+
+        if request.path.startswith("/static/reports/") and response.status_code == 200:
+            response.headers["Cache-Control"] = f"public, max-age={CHART_CACHE_SECONDS}, immutable"
+        return response
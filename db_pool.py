@@ -0,0 +1,216 @@
+import os
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+
+
+# מאגר חיבורים למסד הנתונים: מחזיק חיבורים פתוחים לשימוש חוזר במקום לפתוח חיבור חדש בכל שאילתה
+class ConnectionPool:
+    def __init__(self, size=5, max_age=1800, ping_after=10, timeout=5, **connect_kwargs):
+        self.size = size
+        self.max_age = max_age
+        self.ping_after = ping_after
+        self.timeout = timeout
+        self.connect_kwargs = connect_kwargs
+        self._idle = deque()
+        self._born = {}
+        self._open = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "borrowed": 0,
+            "waited": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "dead": 0,
+        }
+
+    # פותח חיבור חדש (מחוץ לנעילה) ורושם את זמן היצירה שלו תחת הנעילה
+    def _connect(self):
+        conn = mysql.connector.connect(**self.connect_kwargs)
+        with self._cond:
+            self._born[id(conn)] = time.monotonic()
+            self._stats["created"] += 1
+        return conn
+
+    # מעדכן מונה סטטיסטיקה תחת נעילת המאגר, כך שלא יאבדו עדכונים בין תהליכונים
+    def _count(self, name):
+        with self._cond:
+            self._stats[name] += 1
+
+    # סוגר חיבור ומוציא אותו מהמאגר
+    def _discard(self, conn):
+        with self._cond:
+            self._born.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    # מחזיר חיבור תקין מהמאגר, ממתין אם כל החיבורים בשימוש
+    def acquire(self):
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while not self._idle and self._open >= self.size:
+                waited = True
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if not self._idle and self._open >= self.size:
+                        self._stats["timeouts"] += 1
+                        raise mysql.connector.errors.PoolError("Timed out waiting for a database connection")
+            idle = self._idle.pop() if self._idle else None
+            if idle is None:
+                self._open += 1
+            wait = time.monotonic() - started
+            self._stats["borrowed"] += 1
+            if waited:
+                self._stats["waited"] += 1
+                self._stats["wait_time_total"] += wait
+                self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait)
+
+        try:
+            if idle is None:
+                return self._connect()
+            conn, last_used = idle
+            now = time.monotonic()
+            with self._cond:
+                born = self._born.get(id(conn), now)
+            if now - born > self.max_age:
+                self._count("recycled")
+                self._discard(conn)
+                return self._connect()
+            if now - last_used > self.ping_after and not conn.is_connected():
+                self._count("dead")
+                self._discard(conn)
+                return self._connect()
+            return conn
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    # מחזיר חיבור למאגר לאחר השימוש
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            healthy = True
+        except Exception:
+            healthy = False
+        with self._cond:
+            if healthy:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._open -= 1
+                self._stats["dead"] += 1
+                self._discard(conn)
+            self._cond.notify()
+
+    # סוגר את כל החיבורים הפנויים במאגר
+    def close_idle(self):
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._open -= 1
+                self._discard(conn)
+            self._cond.notify_all()
+
+    # מחזיר סטטיסטיקות שימוש והמתנה של המאגר
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self.size
+            stats["open"] = self._open
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._open - len(self._idle)
+        stats["wait_time_avg"] = stats["wait_time_total"] / stats["waited"] if stats["waited"] else 0.0
+        return stats
+
+
+# עוטף חיבור מהמאגר כך שסגירה שלו מחזירה אותו למאגר במקום לסגור אותו
+class PooledConnection:
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_pid = None
+
+
+# יוצר את מאגר החיבורים של התהליך לפי משתני הסביבה (פעם אחת לכל תהליך)
+def get_pool():
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(
+                size=int(os.getenv("DB_POOL_SIZE", 5)),
+                max_age=float(os.getenv("DB_POOL_MAX_AGE", 1800)),
+                ping_after=float(os.getenv("DB_POOL_PING_AFTER", 10)),
+                timeout=float(os.getenv("DB_POOL_TIMEOUT", 5)),
+                host=os.getenv("DB_HOST"),
+                port=int(os.getenv("DB_PORT", 3306)),
+                user=os.getenv("DB_USER"),
+                password=os.getenv("DB_PASSWORD"),
+                database=os.getenv("DB_NAME"),
+                autocommit=True,
+                connection_timeout=5,
+            )
+            _pool_pid = os.getpid()
+    return _pool
+
+
+# האם לשמור חיבור אחד לכל בקשה (במקום חיבור לכל שאילתה)
+def per_request_mode():
+    return os.getenv("DB_POOL_PER_REQUEST", "1") == "1"
+
+
+# מחזיר את החיבור של הבקשה הנוכחית אם אנחנו בתוך הקשר של Flask, אחרת None
+def request_connection():
+    if not per_request_mode():
+        return None
+    from flask import g, has_app_context
+
+    if not has_app_context():
+        return None
+    conn = g.get("_db_conn")
+    if conn is None:
+        conn = get_pool().acquire()
+        g._db_conn = conn
+    return conn
+
+
+# מחזיר למאגר את החיבור של הבקשה בסיום הקשר האפליקציה
+def release_request_connection(exc=None):
+    from flask import g
+
+    conn = g.pop("_db_conn", None)
+    if conn is not None:
+        get_pool().release(conn)
+
+
+# רושם את שחרור החיבור בסוף כל בקשה באפליקציה
+def init_app(app):
+    app.teardown_appcontext(release_request_connection)
+
+
+# מחזיר סטטיסטיקות של מאגר החיבורים
+def pool_stats():
+    return get_pool().stats()
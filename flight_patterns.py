@@ -0,0 +1,266 @@
+import argparse
+import bisect
+import json
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+from query_cache import invalidates
+from utils import (
+    FLIGHT_STATUS_SCHEDULED,
+    LONG_FLIGHT_HOURS,
+    calculate_arrival_datetime,
+    db_cursor,
+    get_route_by_origin_dest,
+    getaircraft_byid,
+    insert_flights_batch,
+)
+
+load_dotenv()
+
+# ימי השבוע של תבנית נשמרים כמסכת סיביות לפי date.weekday(): שני = סיבית 0 ... ראשון = סיבית 6
+WEEKDAY_NAMES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MATERIALIZE_CHUNK = 500
+
+
+class PatternError(ValueError):
+    pass
+
+
+def weekdays_mask(days):
+    mask = 0
+    for day in days:
+        mask |= 1 << (WEEKDAY_NAMES.index(day) if isinstance(day, str) else int(day))
+    return mask
+
+
+def weekdays_names(mask):
+    return [name for i, name in enumerate(WEEKDAY_NAMES) if mask & (1 << i)]
+
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date() if isinstance(value, str) else value
+
+
+def _parse_time(value):
+    if isinstance(value, str):
+        return datetime.strptime(value, "%H:%M:%S" if len(value) == 8 else "%H:%M").time()
+    if isinstance(value, timedelta):
+        return (datetime.min + value).time()
+    return value
+
+
+# יוצר תבנית טיסה חוזרת (מסלול, מטוס, שעה, ימים בשבוע, טווח תאריכים) ומרחיב אותה לטיסות
+def create_pattern(origin, dest, aircraft_id, dep_time, weekdays, start_date, end_date,
+                   economy_price, business_price=None):
+    route = get_route_by_origin_dest(origin, dest)
+    if not route:
+        raise PatternError(f"no route {origin} -> {dest}")
+    aircraft = getaircraft_byid(aircraft_id)
+    if not aircraft:
+        raise PatternError(f"unknown aircraft {aircraft_id}")
+    if float(route[1]) > LONG_FLIGHT_HOURS and aircraft[1] != "Large":
+        raise PatternError(f"flights longer than {LONG_FLIGHT_HOURS:g} hours need a Large aircraft")
+    if aircraft[1] == "Large" and business_price is None:
+        raise PatternError("a Large aircraft needs a business price")
+    mask = weekdays_mask(weekdays)
+    start_date, end_date = _parse_date(start_date), _parse_date(end_date)
+    if not mask or end_date < start_date:
+        raise PatternError("pattern needs at least one weekday and an end date after the start date")
+
+    with db_cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO flight_pattern
+            (Route_ID, Air_Craft_ID, Dep_Hour, Weekdays, Start_Date, End_Date, Economy_Price, Business_Price)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            (route[0], aircraft_id, _parse_time(dep_time), mask, start_date, end_date,
+             economy_price, business_price if aircraft[1] == "Large" else None),
+        )
+        pattern_id = cursor.lastrowid
+    result = materialize_pattern(pattern_id)
+    result["pattern_id"] = pattern_id
+    return result
+
+
+# מאריך את טווח התבנית ומרחיב רק את התאריכים החדשים. קיצור מותר רק עד התאריך שכבר הורחב לטיסות:
+# הטיסות שכבר נוצרו אינן מקושרות לתבנית, וביטול שלהן עובר דרך ביטול טיסה רגיל
+def extend_pattern(pattern_id, end_date):
+    end_date = _parse_date(end_date)
+    with db_cursor(transaction=True) as cursor:
+        cursor.execute(
+            "SELECT Start_Date, Materialized_Until FROM flight_pattern WHERE Pattern_ID = %s FOR UPDATE",
+            (pattern_id,),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise PatternError(f"no pattern {pattern_id}")
+        start, done = row
+        if end_date < start:
+            raise PatternError("the end date must not be before the start date")
+        if done is not None and end_date < done:
+            raise PatternError(f"flights up to {done} were already created; cancel them before ending the pattern earlier")
+        cursor.execute("UPDATE flight_pattern SET End_Date = %s WHERE Pattern_ID = %s", (end_date, pattern_id))
+    return materialize_pattern(pattern_id)
+
+
+# מחזיר את כל התבניות עם המסלול ועד איזה תאריך כבר נוצרו טיסות
+def list_patterns():
+    with db_cursor(dictionary=True) as cursor:
+        cursor.execute(
+            """
+            SELECT p.Pattern_ID, r.Origin, r.Destination, p.Air_Craft_ID, p.Dep_Hour, p.Weekdays,
+                   p.Start_Date, p.End_Date, p.Economy_Price, p.Business_Price, p.Materialized_Until
+            FROM flight_pattern p
+            JOIN route r ON r.Route_ID = p.Route_ID
+            ORDER BY p.Pattern_ID
+            """
+        )
+        rows = cursor.fetchall()
+    for row in rows:
+        row["Days"] = weekdays_names(row["Weekdays"])
+    return rows
+
+
+# מנה אחת של הרחבה: נועל את התבנית, מחשב את המועדים הבאים אחרי Materialized_Until (עד limit מועדים),
+# מדלג על מועדים שבהם המטוס כבר בשימוש או לא נמצא בשדה המוצא (כלל הרציפות של אשף הוספת הטיסה),
+# מכניס את השאר ומקדם את Materialized_Until באותה טרנזקציה
+@invalidates("flight", "flight_inventory", "aircraft_location")
+def _materialize_chunk(pattern_id, limit, now):
+    with db_cursor(transaction=True) as cursor:
+        cursor.execute(
+            """
+            SELECT p.Route_ID, p.Air_Craft_ID, p.Dep_Hour, p.Weekdays, p.Start_Date, p.End_Date,
+                   p.Economy_Price, p.Business_Price, p.Materialized_Until, r.Duration, r.Origin, r.Destination
+            FROM flight_pattern p
+            JOIN route r ON r.Route_ID = p.Route_ID
+            WHERE p.Pattern_ID = %s
+            FOR UPDATE
+            """,
+            (pattern_id,),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise PatternError(f"no pattern {pattern_id}")
+        route_id, aircraft_id, dep_hour, mask, start, end, economy, business, done, duration, origin, dest = row
+        dep_time = _parse_time(dep_hour)
+        day = start if done is None else max(start, done + timedelta(days=1))
+        if day > end:
+            return 0, [], [], True
+        slots = []
+        while day <= end and len(slots) < limit:
+            if mask & (1 << day.weekday()):
+                dep_dt = datetime.combine(day, dep_time)
+                arr_dt = calculate_arrival_datetime(day, dep_time, float(duration)).replace(second=0, microsecond=0)
+                if dep_dt > now:
+                    slots.append((dep_dt, arr_dt))
+            last_day = day
+            day += timedelta(days=1)
+
+        busy = []
+        if slots:
+            # הטיסות של המטוס בטווח המנה, ובנוסף הנחיתה האחרונה שלו לפני הטווח (המיקום שלו בתחילתו)
+            cursor.execute(
+                """
+                SELECT Dep_TS, Arr_TS, Destination
+                FROM aircraft_location
+                WHERE Air_Craft_ID = %s AND Arr_TS > %s AND Dep_TS < %s
+                UNION ALL
+                SELECT * FROM (
+                    SELECT Dep_TS, Arr_TS, Destination
+                    FROM aircraft_location
+                    WHERE Air_Craft_ID = %s AND Arr_TS <= %s
+                    ORDER BY Arr_TS DESC
+                    LIMIT 1
+                ) last
+                """,
+                (aircraft_id, slots[0][0], slots[-1][1], aircraft_id, slots[0][0]),
+            )
+            busy = sorted(cursor.fetchall())
+
+        # הטיסות של המטוס לא חופפות זו לזו, לכן מספיק לבדוק את הטיסה שלפני המועד ואת זו שאחריו;
+        # הטיסה שלפני המועד היא גם הנחיתה האחרונה שלו, והיא צריכה להיות בשדה המוצא של התבנית
+        flights, skipped, not_at_origin = [], [], []
+        for dep_dt, arr_dt in slots:
+            i = bisect.bisect_left(busy, (dep_dt,))
+            if (i > 0 and busy[i - 1][1] > dep_dt) or (i < len(busy) and busy[i][0] < arr_dt):
+                skipped.append(dep_dt)
+                continue
+            if i > 0 and busy[i - 1][2] != origin:
+                not_at_origin.append(dep_dt)
+                continue
+            busy.insert(i, (dep_dt, arr_dt, dest))
+            flights.append((aircraft_id, dep_dt.date(), dep_time, route_id, arr_dt.date(), arr_dt.time(),
+                            economy, business, FLIGHT_STATUS_SCHEDULED))
+        insert_flights_batch(cursor, flights)
+        cursor.execute(
+            "UPDATE flight_pattern SET Materialized_Until = %s WHERE Pattern_ID = %s",
+            (last_day, pattern_id),
+        )
+        return len(flights), skipped, not_at_origin, day > end
+
+
+# מרחיב תבנית לטיסות במנות (טרנזקציה לכל מנה). רק מועדים אחרי Materialized_Until נוצרים,
+# כך שהרצה חוזרת או הארכת התבנית מוסיפות רק את התאריכים החדשים
+def materialize_pattern(pattern_id, chunk_size=MATERIALIZE_CHUNK, now=None):
+    now = now or datetime.now()
+    created, skipped, not_at_origin = 0, [], []
+    while True:
+        n, chunk_skipped, chunk_not_at_origin, finished = _materialize_chunk(pattern_id, chunk_size, now)
+        created += n
+        skipped += chunk_skipped
+        not_at_origin += chunk_not_at_origin
+        if finished:
+            break
+    return {
+        "created": created,
+        "skipped": [dt.isoformat(sep=" ") for dt in skipped],
+        "not_at_origin": [dt.isoformat(sep=" ") for dt in not_at_origin],
+    }
+
+
+# מרחיב את כל התבניות שעדיין יש להן תאריכים שלא נוצרו
+def materialize_all():
+    with db_cursor() as cursor:
+        cursor.execute(
+            "SELECT Pattern_ID FROM flight_pattern WHERE Materialized_Until IS NULL OR Materialized_Until < End_Date"
+        )
+        pattern_ids = [r[0] for r in cursor.fetchall()]
+    return {pattern_id: materialize_pattern(pattern_id) for pattern_id in pattern_ids}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create, extend and expand recurring flight patterns")
+    sub = parser.add_subparsers(dest="command", required=True)
+    create = sub.add_parser("create", help="define a pattern and create its flights")
+    create.add_argument("--origin", required=True)
+    create.add_argument("--dest", required=True)
+    create.add_argument("--aircraft", required=True)
+    create.add_argument("--time", required=True, help="departure time, HH:MM")
+    create.add_argument("--days", required=True, help="comma separated, e.g. Mon,Tue,Wed,Thu,Fri")
+    create.add_argument("--start", required=True, help="YYYY-MM-DD")
+    create.add_argument("--end", required=True, help="YYYY-MM-DD")
+    create.add_argument("--economy-price", type=float, required=True)
+    create.add_argument("--business-price", type=float)
+    extend = sub.add_parser("extend", help="move a pattern's end date and create only the new flights")
+    extend.add_argument("pattern_id", type=int)
+    extend.add_argument("--end", required=True, help="YYYY-MM-DD")
+    sub.add_parser("materialize", help="create the missing flights of every pattern")
+    sub.add_parser("list", help="list the patterns")
+    args = parser.parse_args()
+
+    if args.command == "create":
+        result = create_pattern(args.origin, args.dest, args.aircraft, args.time, args.days.split(","),
+                                args.start, args.end, args.economy_price, args.business_price)
+    elif args.command == "extend":
+        result = extend_pattern(args.pattern_id, args.end)
+    elif args.command == "materialize":
+        result = materialize_all()
+    else:
+        result = list_patterns()
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,65 @@
 from flask import render_template, Flask, redirect, request, session, flash, abort
-from flask_session import Session
-from datetime import timedelta, date
+from datetime import datetime, timedelta, date
 import mysql.connector
 from contextlib import contextmanager
-from utils import *
+from utils import (
+    SeatHoldError,
+    add_aircraft,
+    add_employee,
+    cache_stats,
+    cancel_flight_if_allowed,
+    cancel_order_by_policy,
+    check_aircraft,
+    checkcust,
+    checkmgr,
+    create_flight_and_assign_crew,
+    get_allflights_filtered,
+    get_available_attendants,
+    get_available_pilots,
+    get_custorders,
+    get_dest,
+    get_employee_names_by_ids,
+    get_flight_seats_left,
+    get_order_with_tickets,
+    get_origins,
+    get_passport_and_birthdate_by_email,
+    get_route_by_origin_dest,
+    get_seat_occupancy,
+    get_specific_aricrafts,
+    getaircraft_byid,
+    getmgr,
+    getname,
+    hold_seats,
+    insert_order_and_tickets,
+    is_hebrew_name,
+    mailexists,
+    new_guest,
+    new_user,
+    order_exists_for_email,
+    pool_stats,
+    unit_of_work,
+    validate_seats,
+)
+import db_pool
+import charts
+import session_store
+from booking_token import ORDER_LOOKUP_TTL, BookingState, GuestDetails, OrderLookup, dump_token, load_token
 import os
 from dotenv import load_dotenv
 from functools import wraps
+import uuid
 
 load_dotenv()
 app = Flask(__name__)
+app.secret_key = os.getenv("SECRET_KEY")
+# המפתח חותם את הסשנים ואת טוקני ההזמנה; בלעדיו אין לעלות בכלל
+if not app.secret_key:
+    raise RuntimeError("SECRET_KEY must be set")
 
 
 app.config.update(
-    SESSION_TYPE = 'filesystem',
-    SESSION_FILE_DIR = '/flask_session_data',
     SESSION_PERMANENT = True,
-    SESSION_PERMANENT_LIFETIME = timedelta(minutes=30),
+    PERMANENT_SESSION_LIFETIME = timedelta(minutes=30),
     SESSION_COOKIE_SECURE = True
 )
 
@@ -28,11 +71,12 @@ def admin_required(f):
         return f(*args, **kwargs)
     return wrapper
 
-Session(app)
+session_store.init_app(app)
+db_pool.init_app(app)
+charts.init_app(app)
 #עמוד בית
 @app.route('/')
 def home_page():
-    session['is_admin'] = False
     if 'fullname' in session:
         return redirect('/search_order_flights')
     elif 'namemgr' in session:
@@ -125,186 +169,186 @@ def search_order_flights():
         dests=dests,
         name=name)
 
+# קורא את מצב תהליך ההזמנה מהטוקן החתום שהגיע בכתובת או בטופס (None אם אין טוקן תקף)
+def current_booking():
+    return load_token(request.values.get("booking"), BookingState)
+
+# כתובת השלב הבא בתהליך ההזמנה, עם מצב ההזמנה המעודכן
+def booking_redirect(path, state):
+    return redirect(f"{path}?booking={dump_token(state)}")
+
+# פרטי האורח של הזמנה מטוקן חתום נפרד שעובר רק בגוף טופסי POST, לא בכתובת ולא בסשן.
+# הטוקן שייך להזמנה לפי hold_token, כך שאי אפשר לצרף פרטי אורח של הזמנה אחרת
+def current_guest(state):
+    guest = load_token(request.form.get("guest"), GuestDetails)
+    if guest is None or guest.hold_token != state.hold_token:
+        return None
+    return guest
+
+# הסכום לתשלום לפי המושבים שנבחרו בכל מחלקה
+def order_total(state):
+    totalprice = 0
+    if state.chosenecon:
+        totalprice += len(state.chosenecon) * float(state.economy_price)
+    if state.chosenbusi and state.business_price is not None:
+        totalprice += len(state.chosenbusi) * float(state.business_price)
+    return totalprice
+
+# מסך סיכום ההזמנה לפני התשלום; לאורח הפרטים ממשיכים בטופס בטוקן guest
+def render_order_summary(state, name, passport, b_date, guest=None, error=None):
+    return render_template(
+        'submitorder.html',
+        flightdetails=state.flight,
+        totalprice=order_total(state),
+        econseats=state.chosenecon,
+        busiseats=state.chosenbusi,
+        name=name,
+        passport=passport,
+        birth_date=b_date,
+        booking=dump_token(state),
+        guest=dump_token(guest) if guest is not None else None,
+        error=error
+    )
+
 #עמוד בחירת מושבים
 @app.route("/search_order_flights/choosenumseat", methods=["GET", "POST"])
 def choosenumseats():
     name = session.get('fullname', 'guest')
 
-    if request.method == "GET":
-        aircraft = request.args.get("aircraft")
-        dep_date = request.args.get("dep_date")
-        dep_time = request.args.get("dep_time")
-        origin = request.args.get("origin")
-        destination = request.args.get("destination")
-        economy_price = request.args.get("economy_price")
+    if request.method == "GET" and request.args.get("aircraft"):
         business_price = request.args.get("business_price")
-        session["chosen_flight"] = {
-            "aircraft": aircraft,
-            "dep_date": dep_date,
-            "dep_time": dep_time,
-            "origin": origin,
-            "destination": destination,
-            "economy_price": economy_price,
-            "business_price": None if business_price == "none" else business_price
-        }
-    chosen = session.get("chosen_flight", {})
+        state = BookingState(
+            aircraft=request.args.get("aircraft"),
+            dep_date=request.args.get("dep_date"),
+            dep_time=request.args.get("dep_time"),
+            origin=request.args.get("origin"),
+            destination=request.args.get("destination"),
+            economy_price=request.args.get("economy_price"),
+            business_price=None if business_price == "none" else business_price
+        )
+    else:
+        state = current_booking()
+        if state is None:
+            return redirect('/search_order_flights')
+    context = dict(name=name, econprice=state.economy_price, busiprice=state.business_price, booking=dump_token(state))
     if request.method == "POST":
-        session["numecon"] = request.form.get("seatsecon")
-        if session["chosen_flight"]["business_price"] is not None:
-            session["numbusi"] = request.form.get("seatsbusi")
-        if 'numbusi' in session:
-            if session["numecon"] == '0' and session["numbusi"] == '0':
-                return render_template('numseats.html', error='בחר לפחות כרטיס אחד', name=name, econprice=chosen.get("economy_price"), busiprice=chosen.get("business_price"))
-        else:
-            if session["numecon"] == '0':
-                return render_template('numseats.html', error='בחר לפחות כרטיס אחד', name=name, econprice=chosen.get("economy_price"), busiprice=chosen.get("business_price"))
-        return redirect("/search_order_flights/choosenumseat/chooseseats")
-    return render_template(
-        "numseats.html",
-        name=name,
-        econprice=chosen.get("economy_price"),
-        busiprice=chosen.get("business_price")
-    )
+        try:
+            numecon = int(request.form.get("seatsecon") or 0)
+            numbusi = int(request.form.get("seatsbusi") or 0) if state.business_price is not None else None
+        except ValueError:
+            numecon = numbusi = -1
+        if numecon < 0 or (numbusi or 0) < 0:
+            return render_template('numseats.html', error='מספר הכרטיסים חייב להיות מספר שלם חיובי', **context)
+        state.numecon, state.numbusi = numecon, numbusi
+        if state.numecon == 0 and not state.numbusi:
+            return render_template('numseats.html', error='בחר לפחות כרטיס אחד', **context)
+        return booking_redirect("/search_order_flights/choosenumseat/chooseseats", state)
+    return render_template("numseats.html", **context)
 #בוחר מקומות ומוודא שתואם למס' הכרטיסים שנבחרו
 @app.route("/search_order_flights/choosenumseat/chooseseats", methods=["POST", "GET"])
 def chooseseats():
     name = session.get('fullname', 'guest')
-    business_rows = 0
-    business_cols = 0
-    if session["chosen_flight"]["business_price"] is not None:
-        business_rows, business_cols = get_class_layout(session['chosen_flight']['aircraft'], "Business")
-    economy_rows, economy_cols = get_class_layout(session['chosen_flight']['aircraft'], "Economy")
-    economy_start_row = business_rows + 1
-    economy_end_row = business_rows + economy_rows
-    taken_keys = get_taken_seat_for_flight(session['chosen_flight']['aircraft'], session['chosen_flight']['dep_date'], session['chosen_flight']['dep_time'])
-    has_business = session["chosen_flight"]["business_price"] is not None
-    cap_econ = economy_rows * economy_cols
-    cap_busi = business_rows * business_cols if has_business else 0
-    req_econ = int(session.get("numecon") or 0)
-    req_busi = int(session.get("numbusi") or 0) if has_business else 0
-    taken_econ = 0
-    taken_busi = 0
-    for key in taken_keys:
-        r_str, c_str = key.split(":")
-        r = int(r_str)
-        c = int(c_str)
-        if has_business and 1 <= r <= business_rows and 1 <= c <= business_cols:
-            taken_busi += 1
-        elif economy_start_row <= r <= economy_end_row and 1 <= c <= economy_cols:
-            taken_econ += 1
-    if has_business and (taken_busi + req_busi > cap_busi):
-        free = max(cap_busi - taken_busi, 0)
-        return render_template(
-            "chooseseats.html",
-            name=name,
-            aircraft_id=session['chosen_flight']['aircraft'],
-            dep_date=session['chosen_flight']['dep_date'],
-            dep_hour=session['chosen_flight']['dep_time'],
-            taken_keys=taken_keys,
-            business_rows=business_rows,
-            business_cols=business_cols,
-            economy_start_row=economy_start_row,
-            economy_end_row=economy_end_row,
-            economy_cols=economy_cols,
-            error=f"אין מספיק מושבים פנויים ב-Buisness Class. פנויים: {free}, ביקשת: {req_busi}"
-        )
-
-    if (taken_econ + req_econ > cap_econ):
-        free = max(cap_econ - taken_econ, 0)
-        return render_template(
-            "chooseseats.html",
-            name=name,
-            aircraft_id=session['chosen_flight']['aircraft'],
-            dep_date=session['chosen_flight']['dep_date'],
-            dep_hour=session['chosen_flight']['dep_time'],
-            taken_keys=taken_keys,
-            business_rows=business_rows,
-            business_cols=business_cols,
-            economy_start_row=economy_start_row,
-            economy_end_row=economy_end_row,
-            economy_cols=economy_cols,
-            error=f"אין מספיק מושבים פנויים ב-Economy Class. פנויים: {free}, ביקשת: {req_econ}"
-        )
+    state = current_booking()
+    if state is None:
+        return redirect('/search_order_flights')
+    has_business = state.business_price is not None
+    if state.hold_token is None:
+        state.hold_token = uuid.uuid4().hex
+    seats = get_seat_occupancy(state.aircraft, state.dep_date, state.dep_time, has_business, state.hold_token)
+    context = dict(
+        name=name,
+        aircraft_id=state.aircraft,
+        dep_date=state.dep_date,
+        dep_hour=state.dep_time,
+        seats=seats,
+        business_rows=seats.business_rows,
+        business_cols=seats.business_cols,
+        economy_start_row=seats.economy_start_row,
+        economy_end_row=seats.economy_end_row,
+        economy_cols=seats.economy_cols,
+        numecon=state.numecon,
+        numbusi=state.numbusi,
+        booking=dump_token(state),
+    )
+    req_econ = state.numecon
+    req_busi = (state.numbusi or 0) if has_business else 0
+    seats_left = get_flight_seats_left(state.aircraft, state.dep_date, state.dep_time)
+    free_econ = seats_left.get("Economy", 0)
+    free_busi = seats_left.get("Business", 0) if has_business else 0
+    if has_business and (req_busi > free_busi):
+        return render_template("chooseseats.html", **context, error=f"אין מספיק מושבים פנויים ב-Buisness Class. פנויים: {free_busi}, ביקשת: {req_busi}")
+    if (req_econ > free_econ):
+        return render_template("chooseseats.html", **context, error=f"אין מספיק מושבים פנויים ב-Economy Class. פנויים: {free_econ}, ביקשת: {req_econ}")
     if request.method == 'POST':
         numecon = request.form.getlist('seatsecon')
         numbusi = request.form.getlist('seatsbusi')
-        if len(numecon) != int(session["numecon"]):
-            return render_template("chooseseats.html",
-                        name=name,
-                        aircraft_id=session['chosen_flight']['aircraft'],
-                        dep_date=session['chosen_flight']['dep_date'],
-                        dep_hour=session['chosen_flight']['dep_time'],
-                        taken_keys=taken_keys,
-                        business_rows=business_rows,
-                        business_cols=business_cols,
-                        economy_start_row=economy_start_row,
-                        economy_end_row=economy_end_row,
-                        economy_cols=economy_cols,
-                        error=f"בחר בדיוק {session['numecon']} מושבים ב-Economy Class")
-        if 'numbusi' in session:
-            if len(numbusi) != int(session["numbusi"]):
-                return render_template("chooseseats.html",
-                                       name=name,
-                                       aircraft_id=session['chosen_flight']['aircraft'],
-                                       dep_date=session['chosen_flight']['dep_date'],
-                                       dep_hour=session['chosen_flight']['dep_time'],
-                                       taken_keys=taken_keys,
-                                       business_rows=business_rows,
-                                       business_cols=business_cols,
-                                       economy_start_row=economy_start_row,
-                                       economy_end_row=economy_end_row,
-                                       economy_cols=economy_cols,
-                                       error=f" בחר בדיוק {session['numbusi']} מושבים ב-Buisness Class")
-        session['chosenecon'] = numecon
-        session['chosenbusi'] = numbusi
+        if len(numecon) != state.numecon:
+            return render_template("chooseseats.html", **context, error=f"בחר בדיוק {state.numecon} מושבים ב-Economy Class")
+        if state.numbusi is not None:
+            if len(numbusi) != state.numbusi:
+                return render_template("chooseseats.html", **context, error=f" בחר בדיוק {state.numbusi} מושבים ב-Buisness Class")
+        held, lost = hold_seats(state.hold_token, state.aircraft, state.dep_date, state.dep_time, numecon + numbusi)
+        if not held:
+            seats = get_seat_occupancy(state.aircraft, state.dep_date, state.dep_time, has_business, state.hold_token)
+            context['seats'] = seats
+            return render_template("chooseseats.html", **context, error=f"המושבים {', '.join(lost) or 'שבחרת'} נתפסו זה עתה, בחר מושבים אחרים")
+        state.chosenecon = numecon
+        state.chosenbusi = numbusi
         if name == 'guest':
-            return redirect('/guest_details')
-        return redirect('/submitorder')
-    return render_template(
-        "chooseseats.html",
-        name=name,
-        aircraft_id=session['chosen_flight']['aircraft'],
-        dep_date=session['chosen_flight']['dep_date'],
-        dep_hour=session['chosen_flight']['dep_time'],
-        taken_keys=taken_keys,
-        business_rows=business_rows,
-        business_cols=business_cols,
-        economy_start_row=economy_start_row,
-        economy_end_row=economy_end_row,
-        economy_cols=economy_cols,
-    )
-# מטפל בפרטי לקוח אורח, בודק שם באנגלית ומייל קיים ושומר בסשן
+            return booking_redirect('/guest_details', state)
+        return booking_redirect('/submitorder', state)
+    return render_template("chooseseats.html", **context)
+# מטפל בפרטי לקוח אורח, בודק שם באנגלית ומייל קיים ושומר בטוקן ההזמנה
 @app.route('/guest_details', methods=["POST", "GET"])
 def guestdetails():
     name = session.get('fullname', 'guest')
+    state = current_booking()
+    if state is None or state.hold_token is None:
+        return redirect('/search_order_flights')
+    booking = request.values.get("booking")
     if request.method == 'POST':
         fullname = request.form.get('fullname').replace(" ", "")
-        if fullname.isalpha() and fullname.isascii():
-            session['guestname'] = request.form.get('fullname')
-        else:
-            return render_template('guest_details.html', error='נא להכניס שם מלא באנגלית בלבד', name=name, today=date.today().isoformat())
-        session['guestpassport'] = request.form.get('passport')
-        session['guestdob'] = request.form.get('dob')
-        session['guestemail'] = request.form.get('email')
-        session['guestphonenums'] = int(request.form.get('phone_nums'))
-        if mailexists(session['guestemail']) == True:
-            return render_template('guest_details.html', error='המייל קיים במערכת', name=name, today=date.today().isoformat())
-        return redirect('/phoneguest')
-    return render_template('guest_details.html', name=name, today=date.today().isoformat())
-
-# מקבל מספרי טלפון של אורח ושומר אותם בסשן
+        if not (fullname.isalpha() and fullname.isascii()):
+            return render_template('guest_details.html', error='נא להכניס שם מלא באנגלית בלבד', name=name, today=date.today().isoformat(), booking=booking)
+        email = request.form.get('email')
+        if mailexists(email) == True:
+            return render_template('guest_details.html', error='המייל קיים במערכת', name=name, today=date.today().isoformat(), booking=booking)
+        guest = GuestDetails(
+            hold_token=state.hold_token,
+            name=request.form.get('fullname'),
+            passport=request.form.get('passport'),
+            dob=request.form.get('dob'),
+            email=email,
+            phonenums=int(request.form.get('phone_nums')),
+        )
+        # השלב הבא מוצג ישירות ולא בהפניה, כדי שפרטי האורח יעברו רק בטופס
+        return render_template('phoneguest.html', phonenums=guest.phonenums, booking=booking, guest=dump_token(guest))
+    return render_template('guest_details.html', name=name, today=date.today().isoformat(), booking=booking)
+
+# מקבל מספרי טלפון של אורח, מוסיף אותם לטוקן פרטי האורח ומציג את סיכום ההזמנה
 @app.route('/phoneguest', methods=["POST", "GET"])
 def phoneguest():
-    if request.method == 'POST':
-        session['phones'] = request.form.getlist('phones')
-        return redirect('/submitorder')
-    return render_template('phoneguest.html', phonenums = session['guestphonenums'])
+    state = current_booking()
+    if state is None:
+        return redirect('/search_order_flights')
+    guest = current_guest(state)
+    if guest is None:
+        return booking_redirect('/guest_details', state)
+    guest.phones = request.form.getlist('phones')
+    return render_order_summary(state, guest.name, guest.passport, guest.dob, guest=guest)
 
 # יוצר הזמנה ומכניס את כל הכרטיסים של משתמש רשום או אורח ומציג אישור
 @app.route('/submitorder', methods=["POST", "GET"])
 def submitorder():
+    state = current_booking()
+    if state is None:
+        return redirect('/search_order_flights')
+    # טוקן משלב קודם (בלי שמירת מושבים או בלי מושבים שנבחרו) לא יכול ליצור הזמנה
+    if state.hold_token is None or not (state.chosenecon or state.chosenbusi):
+        return booking_redirect('/search_order_flights/choosenumseat/chooseseats', state)
     passport = None
     b_date = None
+    guest = None
     if 'fullname' in session and 'mail' in session:
         name = session['fullname']
         row = get_passport_and_birthdate_by_email(session['mail'])
@@ -312,65 +356,67 @@ def submitorder():
             passport = row["Passport_Num"]
             b_date = row["Birth_Date"]
     else:
-        name = session.get('guestname')
-        passport = session['guestpassport']
-        b_date = session['guestdob']
-    flightdetails = session["chosen_flight"]
-    econseats = session.get('chosenecon')
-    busiseats = session.get('chosenbusi')
-    totalprice = 0
-    if econseats is not None:
-        totalprice += len(econseats) * float(flightdetails["economy_price"])
-    if busiseats and flightdetails.get('business_price') is not None:
-        totalprice += len(busiseats) * float(flightdetails['business_price'])
+        # אורח מגיע לכאן רק בטופס מסך הסיכום עם טוקן הפרטים שלו
+        guest = current_guest(state)
+        if guest is None:
+            return booking_redirect('/guest_details', state)
+        name = guest.name
+        passport = guest.passport
+        b_date = guest.dob
+    flightdetails = state.flight
+    econseats = state.chosenecon
+    busiseats = state.chosenbusi
+    totalprice = order_total(state)
     if request.method == 'POST':
-        if 'guestemail' in session:
-            new_guest(session['guestemail'], session['guestname'], session['phones'])
-            orderid = insert_order_and_tickets(
-                session['guestemail'],
-                flightdetails['aircraft'],
-                flightdetails['dep_date'],
-                flightdetails['dep_time'],
-                econseats,
-                busiseats,
-                flightdetails['economy_price'],
-                flightdetails['business_price'],
-                totalprice
-            )
-        elif "mail" in session:
-            orderid = insert_order_and_tickets(
-                session['mail'],
-                flightdetails['aircraft'],
-                flightdetails['dep_date'],
-                flightdetails['dep_time'],
-                econseats,
-                busiseats,
-                flightdetails['economy_price'],
-                flightdetails['business_price'],
-                totalprice
+        try:
+            if guest is not None:
+                with unit_of_work():
+                    new_guest(guest.email, guest.name, guest.phones)
+                    orderid = insert_order_and_tickets(
+                        guest.email,
+                        flightdetails['aircraft'],
+                        flightdetails['dep_date'],
+                        flightdetails['dep_time'],
+                        econseats,
+                        busiseats,
+                        flightdetails['economy_price'],
+                        flightdetails['business_price'],
+                        totalprice,
+                        hold_token=state.hold_token
+                    )
+            elif "mail" in session:
+                orderid = insert_order_and_tickets(
+                    session['mail'],
+                    flightdetails['aircraft'],
+                    flightdetails['dep_date'],
+                    flightdetails['dep_time'],
+                    econseats,
+                    busiseats,
+                    flightdetails['economy_price'],
+                    flightdetails['business_price'],
+                    totalprice,
+                    hold_token=state.hold_token
+                )
+        except SeatHoldError:
+            return render_order_summary(
+                state, name, passport, b_date, guest=guest,
+                error='תוקף שמירת המושבים פג או שהם נתפסו, יש לבחור מושבים מחדש'
             )
         return render_template('approved.html', orderid=orderid, name=name)
-    return render_template(
-        'submitorder.html',
-        flightdetails=flightdetails,
-        totalprice=totalprice,
-        econseats=econseats,
-        busiseats=busiseats,
-        name=name,
-        passport=passport,
-        birth_date=b_date
-    )
+    return render_order_summary(state, name, passport, b_date)
 
 # הצגת פרטי הזמנה של אורח לפי מזהה הזמנה וכתובת מייל
 @app.route("/guestorder", methods=["GET", "POST"])
 def guestorder():
-    name = session.get('fullname', 'guest')
     if request.method == 'POST':
-        session['orderid'] = request.form.get('id')
-        session['ordermail'] = request.form.get('mail')
-        if order_exists_for_email(int(session['orderid']), session['ordermail']):
-            session['order'], session['tickets'] = get_order_with_tickets(int(session['orderid']), session['ordermail'])
-            return redirect('/cancel_order')
+        orderid = int(request.form.get('id'))
+        ordermail = request.form.get('mail')
+        if order_exists_for_email(orderid, ordermail):
+            # ההזמנה מוצגת ישירות, ומזהה ההזמנה והמייל עוברים לטופס הביטול בטוקן חתום קצר מועד
+            lookup = OrderLookup(order_id=orderid, email=ordermail)
+            order, tickets = get_order_with_tickets(orderid, ordermail)
+            return render_template('guestorder_details.html', order=order, tickets=tickets,
+                                   name=session.get('fullname', 'guest'), lookup=dump_token(lookup))
         else:
             return render_template('guestorder.html', error="ההזמנה לא נמצאה במערכת")
     return render_template("guestorder.html")
@@ -379,13 +425,16 @@ def guestorder():
 @app.route("/cancel_order", methods=["GET", "POST"])
 def guestorder_details():
     name = session.get('fullname', 'guest')
-    if request.method == 'POST':
-        cancelled, massege = cancel_order_by_policy(int(session['orderid']),session['ordermail'])
-        if cancelled is True:
-            return render_template('guestorder_details.html',order=session['order'], tickets=session['tickets'], name=name, good=massege)
-        else:
-            return render_template('guestorder_details.html',order=session['order'], tickets=session['tickets'], name=name, error=massege)
-    return render_template('guestorder_details.html', order=session['order'], tickets=session['tickets'], name=name)
+    lookup_token = request.form.get("lookup")
+    lookup = load_token(lookup_token, OrderLookup, max_age=ORDER_LOOKUP_TTL)
+    if request.method != 'POST' or lookup is None:
+        return redirect('/guestorder')
+    cancelled, massege = cancel_order_by_policy(lookup.order_id, lookup.email)
+    order, tickets = get_order_with_tickets(lookup.order_id, lookup.email)
+    if cancelled is True:
+        return render_template('guestorder_details.html',order=order, tickets=tickets, name=name, lookup=lookup_token, good=massege)
+    else:
+        return render_template('guestorder_details.html',order=order, tickets=tickets, name=name, lookup=lookup_token, error=massege)
 
 # מציג הזמנות של לקוח רשום ומאפשר לבטל הזמנה לפי מדיניות הביטולים
 @app.route('/custorder_details', methods=["GET", "POST"])
@@ -396,13 +445,14 @@ def custorder_details():
     email = session['mail']
     name = session.get('fullname', 'guest')
     status_filter = request.args.get('status')
-    orders = get_custorders(email, status_filter)
+    after = request.args.get('after') or None
     if request.method == "POST":
         order_id = request.form.get('order_id')
         cancelled, message = cancel_order_by_policy(int(order_id), email)
-        orders = get_custorders(email, status_filter)
-        return render_template("custorder_details.html",orders=orders,name=name,good=message if cancelled else None,error=None if cancelled else message)
-    return render_template("custorder_details.html", orders=orders,name=name)
+        orders, next_after = get_custorders(email, status_filter, after)
+        return render_template("custorder_details.html",orders=orders,next_after=next_after,name=name,good=message if cancelled else None,error=None if cancelled else message)
+    orders, next_after = get_custorders(email, status_filter, after)
+    return render_template("custorder_details.html", orders=orders,next_after=next_after,name=name)
 
 #---------------------------------מעבר לפונקציות מנהלים--------------------
 
@@ -689,29 +739,83 @@ def submitflight():
         business_price="",
         error=None
     )
+# ייבוא לוח טיסות מקובץ (CSV או JSON): בדיקה מרוכזת והכנסה במנות, עם דוח שגיאות לפי שורה
+@app.route('/homemgr/import_schedule', methods=["POST", "GET"])
+@admin_required
+def import_schedule_page():
+    if request.method == 'POST':
+        from schedule_import import import_schedule, read_schedule
+
+        upload = request.files.get('schedule')
+        if upload is None or not upload.filename:
+            return render_template('import_schedule.html', error='יש לבחור קובץ לוח טיסות')
+        fmt = 'json' if upload.filename.lower().endswith('.json') else 'csv'
+        try:
+            rows = read_schedule(upload.read(), fmt)
+        except (ValueError, UnicodeDecodeError):
+            return render_template('import_schedule.html', error='לא ניתן לקרוא את הקובץ')
+        report = import_schedule(rows, dry_run=bool(request.form.get('dry_run')))
+        return render_template('import_schedule.html', report=report)
+    return render_template('import_schedule.html')
+
+# תבניות טיסה חוזרות: הגדרת תבנית חדשה או הארכת תבנית קיימת, והרחבה שלהן לטיסות
+@app.route('/homemgr/patterns', methods=["POST", "GET"])
+@admin_required
+def flight_patterns_page():
+    from flight_patterns import WEEKDAY_NAMES, PatternError, create_pattern, extend_pattern, list_patterns
+
+    context = dict(origins=get_origins(), dests=get_dest(), weekdays=WEEKDAY_NAMES, today=date.today().isoformat())
+    if request.method == 'POST':
+        try:
+            if request.form.get('pattern_id'):
+                result = extend_pattern(int(request.form.get('pattern_id')), request.form.get('end_date'))
+            else:
+                business = request.form.get('business_price') or None
+                result = create_pattern(
+                    request.form.get('origin'),
+                    request.form.get('dest'),
+                    request.form.get('aircraft_id'),
+                    request.form.get('departure_time'),
+                    request.form.getlist('weekdays'),
+                    request.form.get('start_date'),
+                    request.form.get('end_date'),
+                    float(request.form.get('economy_price')),
+                    float(business) if business else None,
+                )
+        except (PatternError, ValueError) as e:
+            return render_template('patterns.html', patterns=list_patterns(), error=str(e), **context)
+        good = f"נוספו {result['created']} טיסות"
+        if result['skipped']:
+            good += f", {len(result['skipped'])} מועדים דולגו כי המטוס תפוס"
+        if result['not_at_origin']:
+            good += f", {len(result['not_at_origin'])} מועדים דולגו כי המטוס לא נמצא בשדה המוצא"
+        return render_template('patterns.html', patterns=list_patterns(), good=good, **context)
+    return render_template('patterns.html', patterns=list_patterns(), **context)
+
 #הצגת דוחות וסטטיסטיקות למנהל
 @app.route("/homemgr/reports")
 @admin_required
 def admin_reports():
     if "namemgr" not in session:
         abort(403)
+    # מודול הדוחות נטען רק בפעם הראשונה שמנהל פותח את הדוחות, כדי לא להאט את עליית התהליכים
+    from reports import get_manager_reports
+
     data = get_manager_reports(app)
     return render_template("statistics_admin.html", **data)
 
+#סטטיסטיקות מערכת למנהל (מאגר חיבורים למסד ומטמון שאילתות)
+@app.route("/homemgr/system_stats")
+@admin_required
+def system_stats():
+    return {"db_pool": pool_stats(), "query_cache": cache_stats(), "sessions": session_store.session_stats()}
+
 #התנתקות מהמערכת
 @app.route('/logout')
 def logout():
     session.clear()
     return redirect('/')
 
-#עדכון אוטומטי של סטטוס כל הטיסות בעת כניסה לעמודים הרלוונטים
-@app.before_request
-def auto_update_flight_status():
-    if request.path.startswith(("/search_order_flights", "/homemgr")):
-        update_flights_status()
-        update_flights_fully_booked()
-        update_orders_status_when_flight_completed()
-
 @app.errorhandler(403)
 def forbidden(e):
     session.clear()
@@ -0,0 +1,161 @@
+import argparse
+import os
+import signal
+import socket
+import time
+
+from dotenv import load_dotenv
+
+from charts import purge_stale_charts
+from session_store import purge_expired_sessions
+from utils import (
+    db_cursor,
+    update_flights_status,
+    update_flights_fully_booked,
+    update_orders_status_when_flight_completed,
+    rebuild_flight_inventory,
+    purge_expired_seat_holds,
+    rebuild_crew_locations,
+    rebuild_aircraft_locations,
+    rebuild_report_rollups,
+)
+
+load_dotenv()
+
+LEASE_NAME = "flight_status_maintenance"
+
+
+# מזהה ייחודי של התהליך הנוכחי לצורך בעלות על החכירה
+def lease_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# מנסה לקחת או לחדש חכירה במסד, כך שרק שרת אחד מריץ את התחזוקה בכל רגע
+def acquire_lease(name, owner, ttl_seconds):
+    with db_cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO maintenance_lease (Name, Owner, Expires_At)
+            VALUES (%s, %s, NOW() + INTERVAL %s SECOND)
+            ON DUPLICATE KEY UPDATE
+              Owner = IF(Expires_At < NOW() OR Owner = VALUES(Owner), VALUES(Owner), Owner),
+              Expires_At = IF(Owner = VALUES(Owner), VALUES(Expires_At), Expires_At)
+            """,
+            (name, owner, int(ttl_seconds)),
+        )
+        cursor.execute("SELECT Owner FROM maintenance_lease WHERE Name = %s", (name,))
+        row = cursor.fetchone()
+    return row is not None and row[0] == owner
+
+
+# החכירה עברה לשרת אחר באמצע סבב
+class LeaseLost(RuntimeError):
+    pass
+
+
+# מחזיר פונקציה שמחדשת את החכירה בין מנות של סבב; אם החכירה כבר לא שלנו הסבב נעצר
+# לפני המנה הבאה, כך שסבב ארוך מה-TTL לא רץ במקביל לשרת שלקח את החכירה
+def lease_keeper(name, owner, ttl_seconds):
+    def renew():
+        if not acquire_lease(name, owner, ttl_seconds):
+            raise LeaseLost(f"lease {name} was taken over by another worker")
+    return renew
+
+
+# משחרר את החכירה אם היא שייכת לתהליך הנוכחי
+def release_lease(name, owner):
+    with db_cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM maintenance_lease WHERE Name = %s AND Owner = %s",
+            (name, owner),
+        )
+
+
+# מריץ סבב אחד של עדכוני סטטוס טיסות והזמנות וניקוי שמירות מושבים שפג תוקפן
+# checkpoint נקרא לפני כל שלב ולפני כל מנה בשלבים שעובדים במנות
+def run_once(full=False, checkpoint=None):
+    checkpoint = checkpoint or (lambda: None)
+    checkpoint()
+    update_flights_status(full=full)
+    checkpoint()
+    update_orders_status_when_flight_completed(checkpoint=checkpoint)
+    checkpoint()
+    purge_expired_seat_holds(checkpoint=checkpoint)
+    checkpoint()
+    purge_expired_sessions()
+
+
+# ניקוי קבצים מקומיים של השרת (הגרפים נשמרים בתיקיית static של כל שרת), ולכן רץ בכל שרת בלי חכירה
+def run_local():
+    purge_stale_charts()
+
+
+# לולאת התחזוקה: בכל מחזור מנקה את הקבצים המקומיים ומריצה את העדכונים רק אם התהליך מחזיק בחכירה
+def run_forever(interval, lease_ttl):
+    owner = lease_owner()
+    keep_lease = lease_keeper(LEASE_NAME, owner, lease_ttl)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                run_local()
+                if acquire_lease(LEASE_NAME, owner, lease_ttl):
+                    run_once(checkpoint=keep_lease)
+            except LeaseLost as e:
+                print(f"maintenance run stopped: {e}", flush=True)
+            except Exception as e:
+                print(f"maintenance run failed: {e}", flush=True)
+            time.sleep(max(interval - (time.monotonic() - started), 0))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        release_lease(LEASE_NAME, owner)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FLYTAU flight/order status maintenance worker")
+    parser.add_argument("--interval", type=float, default=float(os.getenv("MAINTENANCE_INTERVAL", 60)),
+                        help="seconds between runs")
+    parser.add_argument("--lease-ttl", type=float, default=None,
+                        help="lease lifetime in seconds (default: 3 x interval)")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    parser.add_argument("--full", action="store_true",
+                        help="with --once: ignore the landing watermark and rescan all flights")
+    parser.add_argument("--rebuild-inventory", action="store_true",
+                        help="rebuild the per-flight seat inventory from tickets and exit")
+    parser.add_argument("--rebuild-crew-index", action="store_true",
+                        help="rebuild the crew location index from flight_crew and exit")
+    parser.add_argument("--rebuild-aircraft-index", action="store_true",
+                        help="rebuild the aircraft rotation timeline from flight and exit")
+    parser.add_argument("--rebuild-reports", action="store_true",
+                        help="rebuild the daily report rollups from the full history and exit")
+    args = parser.parse_args()
+
+    if args.rebuild_inventory or args.rebuild_crew_index or args.rebuild_aircraft_index or args.rebuild_reports:
+        if args.rebuild_inventory:
+            rebuild_flight_inventory()
+            update_flights_fully_booked()
+        if args.rebuild_crew_index:
+            rebuild_crew_locations()
+        if args.rebuild_aircraft_index:
+            rebuild_aircraft_locations()
+        if args.rebuild_inventory or args.rebuild_reports:
+            rebuild_report_rollups()
+        return
+
+    lease_ttl = args.lease_ttl or args.interval * 3
+    if args.once:
+        run_local()
+        owner = lease_owner()
+        if acquire_lease(LEASE_NAME, owner, lease_ttl):
+            try:
+                run_once(full=args.full, checkpoint=lease_keeper(LEASE_NAME, owner, lease_ttl))
+            finally:
+                release_lease(LEASE_NAME, owner)
+        return
+    run_forever(args.interval, lease_ttl)
+
+
+if __name__ == "__main__":
+    main()
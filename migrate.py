@@ -0,0 +1,139 @@
+import argparse
+import os
+import re
+import time
+
+from dotenv import load_dotenv
+from mysql.connector import errorcode
+import mysql.connector
+
+from utils import db_cursor
+
+load_dotenv()
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# שגיאות שמשמעותן שהשינוי כבר קיים במסד, כך שאפשר להריץ שוב מיגרציה שנכשלה באמצע
+ALREADY_APPLIED_ERRORS = {
+    errorcode.ER_TABLE_EXISTS_ERROR,
+    errorcode.ER_DUP_FIELDNAME,
+    errorcode.ER_DUP_KEYNAME,
+    errorcode.ER_CANT_DROP_FIELD_OR_KEY,
+}
+
+
+# מחזיר את קבצי המיגרציה בתיקייה כרשימת (גרסה, שם, נתיב) ממוינת לפי גרסה
+def load_migrations(directory=MIGRATIONS_DIR):
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Duplicate migration version in " + directory)
+    return migrations
+
+
+# מפצל קובץ SQL לפקודות (כל פקודה מסתיימת ב-; בסוף שורה), בלי שורות הערה
+def split_statements(sql):
+    statements, current = [], []
+    for line in sql.splitlines():
+        if not current and (not line.strip() or line.strip().startswith("--")):
+            continue
+        current.append(line)
+        if line.rstrip().endswith(";"):
+            statements.append("\n".join(current).rstrip().rstrip(";"))
+            current = []
+    if current:
+        statements.append("\n".join(current))
+    return statements
+
+
+# יוצר את טבלת הגרסאות אם אינה קיימת ומחזיר את הגרסאות שכבר הוחלו
+def applied_versions(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+          Version INT NOT NULL,
+          Name VARCHAR(100) NOT NULL,
+          Applied_At DATETIME NOT NULL,
+          PRIMARY KEY (Version)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+        """
+    )
+    cursor.execute("SELECT Version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def record_version(cursor, version, name):
+    cursor.execute(
+        "INSERT INTO schema_migrations (Version, Name, Applied_At) VALUES (%s, %s, NOW())",
+        (version, name),
+    )
+
+
+# מריץ מיגרציה אחת. פקודות DDL נשמרות מיד ב-MySQL, ולכן הגרסה נרשמת רק אחרי שכל הפקודות הצליחו
+def apply_migration(cursor, version, name, path):
+    with open(path, encoding="utf-8") as f:
+        statements = split_statements(f.read())
+    for statement in statements:
+        try:
+            cursor.execute(statement)
+        except mysql.connector.Error as e:
+            if e.errno not in ALREADY_APPLIED_ERRORS:
+                raise
+            print(f"  {version:04d}: skipped ({e.msg})", flush=True)
+    record_version(cursor, version, name)
+
+
+# מחיל את כל המיגרציות שטרם הוחלו עד גרסת היעד (כולל) ומחזיר את רשימת הגרסאות שהוחלו
+def migrate(target=None, dry_run=False, baseline=False):
+    done = []
+    with db_cursor() as cursor:
+        applied = applied_versions(cursor)
+        for version, name, path in load_migrations():
+            if version in applied or (target is not None and version > target):
+                continue
+            if dry_run:
+                print(f"pending {version:04d}_{name}")
+            elif baseline:
+                record_version(cursor, version, name)
+                print(f"marked {version:04d}_{name}")
+            else:
+                started = time.monotonic()
+                print(f"applying {version:04d}_{name}", flush=True)
+                apply_migration(cursor, version, name, path)
+                print(f"applied {version:04d}_{name} in {time.monotonic() - started:.1f}s", flush=True)
+            done.append(version)
+    return done
+
+
+# מדפיס את מצב כל המיגרציות (הוחלה / ממתינה)
+def status():
+    with db_cursor() as cursor:
+        applied = applied_versions(cursor)
+    for version, name, _ in load_migrations():
+        print(f"{'applied' if version in applied else 'pending'} {version:04d}_{name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply numbered schema migrations to an existing FLYTAU database")
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations and exit")
+    parser.add_argument("--target", type=int, default=None, help="apply migrations up to this version")
+    parser.add_argument("--dry-run", action="store_true", help="only print the migrations that would run")
+    parser.add_argument("--baseline", action="store_true",
+                        help="record pending migrations as applied without running them "
+                             "(for a database created from the current schema.sql)")
+    args = parser.parse_args()
+
+    if args.status:
+        status()
+        return
+    migrate(target=args.target, dry_run=args.dry_run, baseline=args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+-- Lease and watermark tables used by maintenance.py
+CREATE TABLE IF NOT EXISTS maintenance_lease (
+  Name VARCHAR(50) NOT NULL,
+  Owner VARCHAR(100) NOT NULL,
+  Expires_At DATETIME NOT NULL,
+  PRIMARY KEY (Name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS maintenance_state (
+  Name VARCHAR(50) NOT NULL,
+  Watermark DATETIME DEFAULT NULL,
+  PRIMARY KEY (Name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
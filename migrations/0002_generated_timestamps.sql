@@ -0,0 +1,21 @@
+-- Stored generated departure/arrival timestamps with indexes.
+-- Adding a STORED generated column rebuilds the table (ALGORITHM=COPY); LOCK=SHARED keeps reads available.
+ALTER TABLE flight DROP INDEX Arrival;
+
+ALTER TABLE flight
+  ADD COLUMN Dep_TS DATETIME GENERATED ALWAYS AS (TIMESTAMP(Dep_Date, Dep_Hour)) STORED,
+  ADD COLUMN Arr_TS DATETIME GENERATED ALWAYS AS (TIMESTAMP(Arrival_Date, Arrival_Time)) STORED,
+  ALGORITHM=COPY, LOCK=SHARED;
+
+ALTER TABLE flight ADD INDEX Departure (Dep_TS), ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE flight ADD INDEX Arrival (Arr_TS), ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE tickets
+  ADD COLUMN Dep_TS DATETIME GENERATED ALWAYS AS (TIMESTAMP(Dep_Date, Dep_Hour)) STORED,
+  ALGORITHM=COPY, LOCK=SHARED;
+
+ALTER TABLE tickets
+  DROP INDEX Order_ID,
+  ADD INDEX Order_ID (Order_ID, Dep_TS),
+  ALGORITHM=INPLACE, LOCK=NONE;
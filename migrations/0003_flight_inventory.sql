@@ -0,0 +1,33 @@
+-- Per-flight, per-class seat counters (same backfill as utils.rebuild_flight_inventory)
+CREATE TABLE IF NOT EXISTS flight_inventory (
+  Air_Craft_ID VARCHAR(20) NOT NULL,
+  Dep_Date DATE NOT NULL,
+  Dep_Hour TIME NOT NULL,
+  Class ENUM('Economy','Business') NOT NULL,
+  Capacity INT NOT NULL,
+  Sold INT NOT NULL DEFAULT 0,
+  Active INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (Air_Craft_ID, Dep_Date, Dep_Hour, Class),
+  CONSTRAINT flight_inventory_ibfk_1 FOREIGN KEY (Air_Craft_ID, Dep_Date, Dep_Hour)
+    REFERENCES flight (Air_Craft_ID, Dep_Date, Dep_Hour)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT IGNORE INTO flight_inventory (Air_Craft_ID, Dep_Date, Dep_Hour, Class, Capacity, Sold, Active)
+SELECT f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour, ac.Class, ac.Row_Num * ac.Col_Num,
+       COALESCE(x.sold, 0), COALESCE(x.active, 0)
+FROM flight f
+JOIN aircraft_class ac ON ac.Air_Craft_ID = f.Air_Craft_ID
+LEFT JOIN (
+    SELECT t.Air_Craft_ID, t.Dep_Date, t.Dep_Hour,
+           CASE WHEN t.Chosen_Row_Num <= COALESCE(b.Row_Num, 0) THEN 'Business' ELSE 'Economy' END AS Class,
+           COUNT(*) AS sold,
+           SUM(fo.Order_status = 'Active') AS active
+    FROM tickets t
+    JOIN flight_order fo ON fo.Order_ID = t.Order_ID
+    LEFT JOIN aircraft_class b ON b.Air_Craft_ID = t.Air_Craft_ID AND b.Class = 'Business'
+    GROUP BY t.Air_Craft_ID, t.Dep_Date, t.Dep_Hour, Class
+) x
+  ON x.Air_Craft_ID = f.Air_Craft_ID
+ AND x.Dep_Date     = f.Dep_Date
+ AND x.Dep_Hour     = f.Dep_Hour
+ AND x.Class        = ac.Class;
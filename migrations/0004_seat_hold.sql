@@ -0,0 +1,15 @@
+-- Short-lived seat holds between seat selection and checkout
+CREATE TABLE IF NOT EXISTS seat_hold (
+  Air_Craft_ID VARCHAR(20) NOT NULL,
+  Dep_Date DATE NOT NULL,
+  Dep_Hour TIME NOT NULL,
+  Row_Num INT NOT NULL,
+  Col_Num INT NOT NULL,
+  Hold_Token VARCHAR(64) NOT NULL,
+  Expires_At DATETIME NOT NULL,
+  PRIMARY KEY (Air_Craft_ID, Dep_Date, Dep_Hour, Row_Num, Col_Num),
+  KEY Hold_Token (Hold_Token),
+  KEY Expires_At (Expires_At),
+  CONSTRAINT seat_hold_ibfk_1 FOREIGN KEY (Air_Craft_ID, Dep_Date, Dep_Hour)
+    REFERENCES flight (Air_Craft_ID, Dep_Date, Dep_Hour)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,50 @@
+-- Crew and aircraft location timelines (same backfill as utils.rebuild_crew_locations / rebuild_aircraft_locations)
+CREATE TABLE IF NOT EXISTS crew_location (
+  ID VARCHAR(20) NOT NULL,
+  Air_Craft_ID VARCHAR(20) NOT NULL,
+  Dep_Date DATE NOT NULL,
+  Dep_Hour TIME NOT NULL,
+  Dep_TS DATETIME NOT NULL,
+  Arr_TS DATETIME NOT NULL,
+  Origin VARCHAR(50) NOT NULL,
+  Destination VARCHAR(50) NOT NULL,
+  PRIMARY KEY (ID, Air_Craft_ID, Dep_Date, Dep_Hour),
+  KEY Timeline (ID, Arr_TS),
+  KEY Flight (Air_Craft_ID, Dep_Date, Dep_Hour),
+  CONSTRAINT crew_location_ibfk_1 FOREIGN KEY (ID, Air_Craft_ID, Dep_Date, Dep_Hour)
+    REFERENCES flight_crew (ID, Air_Craft_ID, Dep_Date, Dep_Hour)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS aircraft_location (
+  Air_Craft_ID VARCHAR(20) NOT NULL,
+  Dep_Date DATE NOT NULL,
+  Dep_Hour TIME NOT NULL,
+  Dep_TS DATETIME NOT NULL,
+  Arr_TS DATETIME NOT NULL,
+  Origin VARCHAR(50) NOT NULL,
+  Destination VARCHAR(50) NOT NULL,
+  PRIMARY KEY (Air_Craft_ID, Dep_Date, Dep_Hour),
+  KEY Timeline (Air_Craft_ID, Arr_TS),
+  CONSTRAINT aircraft_location_ibfk_1 FOREIGN KEY (Air_Craft_ID, Dep_Date, Dep_Hour)
+    REFERENCES flight (Air_Craft_ID, Dep_Date, Dep_Hour)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT IGNORE INTO crew_location (ID, Air_Craft_ID, Dep_Date, Dep_Hour, Dep_TS, Arr_TS, Origin, Destination)
+SELECT fc.ID, f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour,
+       f.Dep_TS, f.Arr_TS,
+       r.Origin, r.Destination
+FROM flight_crew fc
+JOIN flight f
+  ON f.Air_Craft_ID = fc.Air_Craft_ID
+ AND f.Dep_Date     = fc.Dep_Date
+ AND f.Dep_Hour     = fc.Dep_Hour
+JOIN route r ON r.Route_ID = f.Route_ID
+WHERE f.Status <> 'CANCELED';
+
+INSERT IGNORE INTO aircraft_location (Air_Craft_ID, Dep_Date, Dep_Hour, Dep_TS, Arr_TS, Origin, Destination)
+SELECT f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour,
+       f.Dep_TS, f.Arr_TS,
+       r.Origin, r.Destination
+FROM flight f
+JOIN route r ON r.Route_ID = f.Route_ID
+WHERE f.Status <> 'CANCELED';
@@ -0,0 +1,10 @@
+-- Indexes for the search, order-history, order-completion and report queries.
+-- route (Origin, Destination) is already covered by its UNIQUE KEY Origin.
+ALTER TABLE flight ADD INDEX Status_Dep (Status, Dep_Date), ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE flight_order ADD INDEX Email_Status (Email, Order_status), ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE flight_order ADD INDEX Order_Date (Order_Date), ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Email_Status now backs the customer foreign key, so the single-column index is redundant
+ALTER TABLE flight_order DROP INDEX Email, ALGORITHM=INPLACE, LOCK=NONE;
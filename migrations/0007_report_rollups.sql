@@ -0,0 +1,71 @@
+-- Daily report rollups read by /homemgr/reports (same backfill as utils.rebuild_report_rollups)
+CREATE TABLE IF NOT EXISTS report_flight_daily (
+  Day DATE NOT NULL,
+  Status ENUM('SCHEDULED','FULLY BOOKED','COMPLETED','CANCELED') NOT NULL,
+  Flights INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (Day, Status)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS report_order_daily (
+  Day DATE NOT NULL,
+  Order_status ENUM('Active','Completed','Customer_Canceled','System_Canceled') NOT NULL,
+  Orders INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (Day, Order_status)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS report_route_daily (
+  Day DATE NOT NULL,
+  Route_ID INT NOT NULL,
+  Completed_Flights INT NOT NULL DEFAULT 0,
+  Tickets_Sold INT NOT NULL DEFAULT 0,
+  Revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+  Hours DECIMAL(10,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (Day, Route_ID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS report_crew_daily (
+  Day DATE NOT NULL,
+  ID VARCHAR(20) NOT NULL,
+  Flights INT NOT NULL DEFAULT 0,
+  Long_Hours DECIMAL(10,2) NOT NULL DEFAULT 0,
+  Short_Hours DECIMAL(10,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (Day, ID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT IGNORE INTO report_flight_daily (Day, Status, Flights)
+SELECT f.Dep_Date, f.Status, COUNT(*)
+FROM flight f
+GROUP BY f.Dep_Date, f.Status;
+
+INSERT IGNORE INTO report_order_daily (Day, Order_status, Orders)
+SELECT o.Order_Date, o.Order_status, COUNT(*)
+FROM flight_order o
+GROUP BY o.Order_Date, o.Order_status;
+
+INSERT IGNORE INTO report_route_daily (Day, Route_ID, Completed_Flights, Tickets_Sold, Revenue, Hours)
+SELECT f.Dep_Date, f.Route_ID,
+       COUNT(DISTINCT f.Air_Craft_ID, f.Dep_Hour),
+       COUNT(t.Order_ID),
+       COALESCE(SUM(t.Price_Paid), 0),
+       COUNT(DISTINCT f.Air_Craft_ID, f.Dep_Hour) * MAX(r.Duration)
+FROM flight f
+JOIN route r ON r.Route_ID = f.Route_ID
+LEFT JOIN tickets t
+  ON t.Air_Craft_ID = f.Air_Craft_ID
+ AND t.Dep_Date     = f.Dep_Date
+ AND t.Dep_Hour     = f.Dep_Hour
+WHERE f.Status = 'COMPLETED'
+GROUP BY f.Dep_Date, f.Route_ID;
+
+INSERT IGNORE INTO report_crew_daily (Day, ID, Flights, Long_Hours, Short_Hours)
+SELECT f.Dep_Date, fc.ID, COUNT(*),
+       SUM(CASE WHEN r.Duration > 6 THEN r.Duration ELSE 0 END),
+       SUM(CASE WHEN r.Duration <= 6 THEN r.Duration ELSE 0 END)
+FROM flight f
+JOIN flight_crew fc
+  ON fc.Air_Craft_ID = f.Air_Craft_ID
+ AND fc.Dep_Date     = f.Dep_Date
+ AND fc.Dep_Hour     = f.Dep_Hour
+JOIN route r ON r.Route_ID = f.Route_ID
+WHERE f.Status = 'COMPLETED'
+GROUP BY f.Dep_Date, fc.ID;
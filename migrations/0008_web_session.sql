@@ -0,0 +1,8 @@
+-- Server-side sessions shared by all app servers (SESSION_BACKEND=mysql, see session_store.py)
+CREATE TABLE IF NOT EXISTS web_session (
+  Sid CHAR(43) NOT NULL,
+  Expires_At DATETIME NOT NULL,
+  Data MEDIUMBLOB NOT NULL,
+  PRIMARY KEY (Sid),
+  KEY Expires_At (Expires_At)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
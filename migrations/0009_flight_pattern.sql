@@ -0,0 +1,17 @@
+-- Recurring flight patterns expanded into flight rows by flight_patterns.py
+CREATE TABLE IF NOT EXISTS flight_pattern (
+  Pattern_ID INT NOT NULL AUTO_INCREMENT,
+  Route_ID INT NOT NULL,
+  Air_Craft_ID VARCHAR(20) NOT NULL,
+  Dep_Hour TIME NOT NULL,
+  Weekdays TINYINT UNSIGNED NOT NULL,
+  Start_Date DATE NOT NULL,
+  End_Date DATE NOT NULL,
+  Economy_Price DECIMAL(10,2) NOT NULL,
+  Business_Price DECIMAL(10,2) DEFAULT NULL,
+  Materialized_Until DATE DEFAULT NULL,
+  PRIMARY KEY (Pattern_ID),
+  KEY Air_Craft_ID (Air_Craft_ID),
+  CONSTRAINT flight_pattern_ibfk_1 FOREIGN KEY (Route_ID) REFERENCES route (Route_ID),
+  CONSTRAINT flight_pattern_ibfk_2 FOREIGN KEY (Air_Craft_ID) REFERENCES air_craft (Air_Craft_ID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
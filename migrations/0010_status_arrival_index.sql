@@ -0,0 +1,2 @@
+-- Lets update_flights_status find flights that landed before the watermark but are still not completed
+ALTER TABLE flight ADD INDEX Status_Arrival (Status, Arr_TS), ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,22 @@
+-- Completion events written by every writer that moves a flight to COMPLETED;
+-- update_orders_status_when_flight_completed consumes them instead of scanning an arrival-time window
+CREATE TABLE IF NOT EXISTS flight_completion (
+  Seq BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  Air_Craft_ID VARCHAR(20) NOT NULL,
+  Dep_Date DATE NOT NULL,
+  Dep_Hour TIME NOT NULL,
+  PRIMARY KEY (Seq)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- One-off sweep: completed flights that still have Active orders (missed by the old arrival window)
+INSERT INTO flight_completion (Air_Craft_ID, Dep_Date, Dep_Hour)
+SELECT DISTINCT f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour
+FROM flight f
+JOIN tickets t
+  ON t.Air_Craft_ID = f.Air_Craft_ID
+ AND t.Dep_Date     = f.Dep_Date
+ AND t.Dep_Hour     = f.Dep_Hour
+JOIN flight_order fo ON fo.Order_ID = t.Order_ID
+WHERE f.Status = 'COMPLETED' AND fo.Order_status = 'Active';
+
+DELETE FROM maintenance_state WHERE Name = 'orders_completed';
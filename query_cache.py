@@ -0,0 +1,202 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+
+# מטמון תוצאות שאילתות בזיכרון התהליך: כל רשומה מתויגת בטבלאות שהיא קוראת,
+# מוגבלת בגודל (LRU) ובזמן (TTL), ונמחקת כשפונקציית כתיבה משנה אחת מהטבלאות
+class QueryCache:
+    def __init__(self, max_entries=1024, default_ttl=30.0):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    # מוחק רשומה מהמטמון ומאינדקס התגיות (בתוך הנעילה)
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for table in entry[2]:
+            keys = self._tags.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[table]
+
+    # מחזיר (נמצא, ערך) עבור מפתח, תוך בדיקת תוקף
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return True, entry[1]
+
+    # שומר ערך במטמון עם התגיות שלו ומפנה את הרשומות הישנות ביותר אם חרגנו מהגודל
+    def set(self, key, value, tables, ttl=None):
+        expires = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (expires, value, tuple(tables))
+            for table in tables:
+                self._tags.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._stats["evictions"] += 1
+
+    # מוחק את כל הרשומות שקראו מאחת הטבלאות ומודיע למאזינים
+    def invalidate(self, *tables):
+        with self._lock:
+            for table in tables:
+                for key in list(self._tags.get(table, ())):
+                    self._drop(key)
+                    self._stats["invalidations"] += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(tables)
+
+    # רושם פונקציה שתיקרא עם רשימת הטבלאות בכל פסילה
+    def add_listener(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_cache = QueryCache(
+    max_entries=int(os.getenv("QUERY_CACHE_SIZE", 1024)),
+    default_ttl=float(os.getenv("QUERY_CACHE_TTL", 30)),
+)
+
+
+# הטבלאות שנכתבו ביחידת העבודה הפעילה; הפסילה שלהן נדחית עד שהיחידה נשמרת (או מבוטלת),
+# כדי שקורא מקביל לא ימלא את המטמון מחדש בנתונים שלפני ה-COMMIT
+_pending = ContextVar("pending_invalidations", default=None)
+
+
+# נפתח על ידי unit_of_work סביב הטרנזקציה: אוסף פסילות ומבצע אותן אחרי COMMIT/ROLLBACK
+@contextmanager
+def deferred_invalidation():
+    if _pending.get() is not None:
+        yield
+        return
+    tables = set()
+    token = _pending.set(tables)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+        if tables:
+            _cache.invalidate(*tables)
+
+
+# פוסל מיד, או רושם לפסילה בסוף יחידת העבודה הפעילה
+def _invalidate(tables):
+    pending = _pending.get()
+    if pending is None:
+        _cache.invalidate(*tables)
+    else:
+        pending.update(tables)
+
+
+def cache_enabled():
+    return os.getenv("QUERY_CACHE_ENABLED", "1") == "1"
+
+
+# מחזיר עותק של תוצאה כדי שקוד קורא לא ישנה את הערך השמור במטמון
+def _copy(value):
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, set):
+        return set(value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+# דקורטור לפונקציות קריאה: שומר את התוצאה לפי הפונקציה והארגומנטים ומתייג בטבלאות שנקראו
+def cached(*tables, ttl=None):
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not cache_enabled():
+                return func(*args, **kwargs)
+            # בתוך יחידת עבודה שכבר כתבה לאחת הטבלאות קוראים ישירות מהמסד ולא שומרים במטמון
+            pending = _pending.get()
+            if pending and not pending.isdisjoint(tables):
+                return func(*args, **kwargs)
+            key = (name, args, tuple(sorted(kwargs.items())))
+            try:
+                found, value = _cache.get(key)
+            except TypeError:
+                return func(*args, **kwargs)
+            if found:
+                return _copy(value)
+            value = func(*args, **kwargs)
+            _cache.set(key, value, tables, ttl)
+            return _copy(value)
+
+        return wrapper
+
+    return decorator
+
+
+# דקורטור לפונקציות כתיבה: פוסל את המטמון של הטבלאות שהפונקציה משנה בסיום הקריאה,
+# או אחרי ה-COMMIT כשהיא רצה בתוך יחידת עבודה
+def invalidates(*tables):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _invalidate(tables)
+
+        return wrapper
+
+    return decorator
+
+
+# פוסל ידנית את המטמון של טבלאות
+def invalidate_tables(*tables):
+    _invalidate(tables)
+
+
+# רושם מאזין לפסילות מטמון (למשל מאגרי נתונים בזיכרון שצריכים להתרענן)
+def on_invalidate(listener):
+    _cache.add_listener(listener)
+
+
+# מחזיר מוני פגיעה, החטאה ופינוי של המטמון
+def cache_stats():
+    return _cache.stats()
@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+
+# טבלאות הייחוס שנטענות לזיכרון
+REFERENCE_TABLES = ("route", "air_craft", "aircraft_class")
+
+
+# תמונת מצב של נתוני הייחוס (נתיבים, מטוסים ותצורת מחלקות) באינדקסים לפי מפתח
+class ReferenceData:
+    def __init__(self, routes, aircraft, layouts):
+        self.routes_by_od = {}
+        self.routes_by_id = {}
+        self.origins = []
+        self.dests = []
+        for route_id, origin, dest, duration in routes:
+            self.routes_by_od[(origin, dest)] = (route_id, duration)
+            self.routes_by_id[route_id] = (origin, dest, duration)
+            if origin not in self.origins:
+                self.origins.append(origin)
+            if dest not in self.dests:
+                self.dests.append(dest)
+        self.aircraft = {aircraft_id: (manufacturer, size) for aircraft_id, manufacturer, size in aircraft}
+        self.layouts = {(aircraft_id, seat_class): (int(rows), int(cols)) for aircraft_id, seat_class, rows, cols in layouts}
+
+
+# מאגר נתוני ייחוס לכל תהליך: נטען פעם אחת, מתרענן כשפונקציית כתיבה משנה טבלת ייחוס,
+# אחרי max_age שניות (עבור שינויים מתהליכים אחרים), או כשמבקשים מפתח שלא קיים
+class ReferenceRegistry:
+    def __init__(self, loader, max_age=300.0, miss_reload_after=1.0):
+        self._loader = loader
+        self.max_age = max_age
+        self.miss_reload_after = miss_reload_after
+        self._data = None
+        self._loaded_at = 0.0
+        self._dirty = True
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    # טוען מחדש את כל טבלאות הייחוס
+    def reload(self):
+        with self._lock:
+            routes, aircraft, layouts = self._loader()
+            self._data = ReferenceData(routes, aircraft, layouts)
+            self._loaded_at = time.monotonic()
+            self._dirty = False
+            self.loads += 1
+            return self._data
+
+    # מחזיר את תמונת המצב הנוכחית, וטוען אותה מחדש אם היא מסומנת כלא עדכנית
+    def get(self):
+        if self._dirty or self._data is None or time.monotonic() - self._loaded_at > self.max_age:
+            return self.reload()
+        return self._data
+
+    # מחפש ערך בתמונת המצב; אם הוא חסר טוען מחדש פעם אחת (ייתכן שנוסף בתהליך אחר)
+    def lookup(self, pick):
+        data = self.get()
+        value = pick(data)
+        if value is None and time.monotonic() - self._loaded_at > self.miss_reload_after:
+            value = pick(self.reload())
+        return value
+
+    # מסמן את המאגר לטעינה מחדש אם אחת מטבלאות הייחוס השתנתה
+    def invalidate(self, tables=REFERENCE_TABLES):
+        if set(tables) & set(REFERENCE_TABLES):
+            self._dirty = True
+
+
+def registry_max_age():
+    return float(os.getenv("REFERENCE_DATA_MAX_AGE", 300))
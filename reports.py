@@ -0,0 +1,99 @@
+from charts import chart_urls
+from utils import (
+    FLIGHT_STATUS_SCHEDULED,
+    FLIGHT_STATUS_FULLY_BOOKED,
+    FLIGHT_STATUS_COMPLETED,
+    FLIGHT_STATUS_CANCELED,
+    ORDER_STATUS_CUSTOMER_CANCELED,
+    db_cursor,
+)
+
+
+# נתוני דוחות המנהלים בלי הגרפים
+def get_report_data():
+    # כל השאילתות קוראות מטבלאות הסיכום היומיות (report_*_daily) ולא מטבלאות הטיסות וההזמנות
+    queries = {
+        "kpis": f"""
+            SELECT
+                SUM(CASE WHEN Status = '{FLIGHT_STATUS_SCHEDULED}' THEN Flights ELSE 0 END) AS scheduled_cnt,
+                SUM(CASE WHEN Status = '{FLIGHT_STATUS_FULLY_BOOKED}' THEN Flights ELSE 0 END) AS full_cnt,
+                SUM(CASE WHEN Status = '{FLIGHT_STATUS_COMPLETED}' THEN Flights ELSE 0 END) AS completed_cnt,
+                SUM(CASE WHEN Status = '{FLIGHT_STATUS_CANCELED}' THEN Flights ELSE 0 END) AS cancelled_cnt
+            FROM report_flight_daily
+            WHERE Day >= DATE_FORMAT(CURDATE(), '%Y-%m-01')
+              AND Day < DATE_ADD(DATE_FORMAT(CURDATE(), '%Y-%m-01'), INTERVAL 1 MONTH);
+        """,
+        "cancel_rate": f"""
+            SELECT YEAR(Day) AS y, MONTH(Day) AS m,
+                   ROUND((SUM(CASE WHEN Order_status = '{ORDER_STATUS_CUSTOMER_CANCELED}' THEN Orders ELSE 0 END)
+                          / SUM(Orders)) * 100, 2) AS cancel_rate
+            FROM report_order_daily
+            GROUP BY YEAR(Day), MONTH(Day)
+            HAVING SUM(Orders) > 0
+            ORDER BY y, m;
+        """,
+        "top_routes": """
+            SELECT r.Origin, r.Destination, SUM(d.Completed_Flights) AS completed_flights
+            FROM report_route_daily d
+            JOIN route r ON r.Route_ID = d.Route_ID
+            WHERE d.Day >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
+            GROUP BY r.Origin, r.Destination
+            ORDER BY completed_flights DESC
+            LIMIT 10;
+        """,
+        "crew_load": """
+            SELECT d.ID AS employee_id,
+                   SUM(d.Long_Hours) AS long_hours,
+                   SUM(d.Short_Hours) AS short_hours,
+                   ROUND(SUM(d.Long_Hours + d.Short_Hours), 2) AS total_hours
+            FROM report_crew_daily d
+            WHERE d.Day >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
+            GROUP BY d.ID
+            ORDER BY total_hours DESC
+            LIMIT 20;
+        """,
+        "revenue_routes": """
+            SELECT r.Origin, r.Destination,
+                   ROUND(SUM(d.Revenue), 2) AS revenue,
+                   SUM(d.Tickets_Sold) AS tickets_sold
+            FROM report_route_daily d
+            JOIN route r ON r.Route_ID = d.Route_ID
+            WHERE d.Day >= DATE_SUB(CURDATE(), INTERVAL 90 DAY)
+            GROUP BY r.Origin, r.Destination
+            HAVING SUM(d.Tickets_Sold) > 0
+            ORDER BY revenue DESC
+            LIMIT 10;
+        """,
+    }
+
+    results = {}
+    with db_cursor() as cursor:
+        for key, query in queries.items():
+            cursor.execute(query)
+            rows = cursor.fetchall()
+            if key == "kpis":
+                kpi_row = rows[0] if rows else (0, 0, 0, 0)
+                results[key] = {
+                    "scheduled_cnt": kpi_row[0] or 0,
+                    "full_cnt": kpi_row[1] or 0,
+                    "completed_cnt": kpi_row[2] or 0,
+                    "cancelled_cnt": kpi_row[3] or 0,
+                }
+            elif key == "cancel_rate":
+                results[key] = [{"y": r[0], "m": r[1], "cancel_rate": r[2]} for r in rows]
+            elif key == "top_routes":
+                results[key] = [{"Origin": r[0], "Destination": r[1], "completed_flights": r[2]} for r in rows]
+            elif key == "crew_load":
+                results[key] = [
+                    {"employee_id": r[0], "long_hours": r[1], "short_hours": r[2], "total_hours": r[3]} for r in rows
+                ]
+            elif key == "revenue_routes":
+                results[key] = [{"Origin": r[0], "Destination": r[1], "revenue": r[2], "tickets_sold": r[3]} for r in rows]
+    return results
+
+
+# החזרה של דוחות מנהלים
+def get_manager_reports(app):
+    results = get_report_data()
+    results["charts"] = chart_urls(app, results)
+    return results
@@ -0,0 +1,403 @@
+import argparse
+import bisect
+import heapq
+import itertools
+import json
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import mysql.connector
+from dotenv import load_dotenv
+
+from query_cache import invalidates
+from utils import (
+    FLIGHT_STATUS_FULLY_BOOKED,
+    FLIGHT_STATUS_SCHEDULED,
+    LONG_FLIGHT_HOURS,
+    db_cursor,
+    index_crew_locations,
+    required_crew,
+)
+
+load_dotenv()
+
+ROLES = ("Pilot", "Flight_Attendant")
+# חלון השעות שנספרות בעומס, כמו בדוח crew_load
+LOAD_WINDOW_DAYS = 30
+# כמה טיסות קודמות מאותו שדה נבדקות בתיקון לפני שמוותרים על טיסה
+REPAIR_DEPTH = 50
+APPLY_CHUNK = 500
+
+# מיקום של עובד שנמצא באוויר (או שעוד לא נחת בפעם הראשונה); None = עובד בלי אף טיסה, זמין בכל שדה
+AIRBORNE = object()
+
+
+# טיסה שצריך לשבץ לה צוות; key הוא מפתח הטיסה (מטוס, תאריך, שעה)
+class RosterFlight:
+    __slots__ = ("key", "dep", "arr", "origin", "dest", "hours", "size")
+
+    def __init__(self, key, dep, arr, origin, dest, hours, size):
+        self.key = key
+        self.dep = dep
+        self.arr = arr
+        self.origin = origin
+        self.dest = dest
+        self.hours = float(hours)
+        self.size = size
+
+    @property
+    def is_long(self):
+        return self.hours > LONG_FLIGHT_HOURS
+
+
+# ציר הזמן של עובד בזיכרון: איפה הוא ומאז מתי, השיבוצים הקיימים במסד אחרי תחילת הריצה
+# (future, ממוין לפי המראה) והשיבוצים של הריצה הנוכחית (stack)
+class CrewMember:
+    __slots__ = ("id", "role", "trained", "load", "location", "since", "future", "stack", "version")
+
+    def __init__(self, emp_id, role, trained, load=0.0, location=None, since=None):
+        self.id = emp_id
+        self.role = role
+        self.trained = bool(trained)
+        self.load = float(load)
+        self.location = location
+        self.since = since
+        self.future = []
+        self.stack = []
+        self.version = 0
+
+
+def _load_key(member):
+    return member.load, member.id
+
+
+# מנוע השיבוץ: עובר על הטיסות לפי זמן ההמראה, מקדם את צירי הזמן של הצוות לפי אירועי המראה ונחיתה
+# ובוחר לכל תפקיד את העובדים הזמינים עם הכי מעט שעות. כשחסרים עובדים מנסה תיקון: עובד ששובץ
+# לטיסה קודמת מאותו שדה עובר לטיסה הנוכחית ועובד שהיה פנוי בשדה מחליף אותו בטיסה הקודמת
+class Roster:
+    def __init__(self, crew, legs=(), repair_depth=REPAIR_DEPTH):
+        self.crew = {m.id: m for m in crew}
+        self.pools = defaultdict(dict)
+        self.events = []
+        self.seq = itertools.count()
+        self.now = None
+        self.repair_depth = repair_depth
+        self.repairs = 0
+        self.flights = []
+        self.crews = {}
+        self.by_origin = defaultdict(list)
+        for member in crew:
+            if member.location is not AIRBORNE:
+                self.pools[(member.role, member.location)][member.id] = member
+        # legs: שיבוצים קיימים שנוחתים אחרי תחילת הריצה, (עובד, המראה, נחיתה, מוצא, יעד);
+        # השעות שלהם נספרות בעומס כמו שעות הריצה
+        for emp_id, dep, arr, origin, dest in sorted(legs, key=lambda leg: leg[1]):
+            member = self.crew.get(emp_id)
+            if member is None:
+                continue
+            self._push(dep, member, AIRBORNE, None)
+            self._push(arr, member, dest, None)
+            member.future.append((dep, arr, origin))
+            member.load += (arr - dep).total_seconds() / 3600
+        for member in crew:
+            member.future.sort()
+
+    # אירוע בציר הזמן; נחיתות לפני המראות באותו רגע. version=None לשיבוץ מהמסד (תמיד תקף),
+    # אחרת האירוע בטל אם השיבוץ של הריצה בוטל בינתיים
+    def _push(self, when, member, location, version):
+        kind = 1 if location is AIRBORNE else 0
+        heapq.heappush(self.events, (when, kind, next(self.seq), member.id, location, version))
+
+    def _advance(self, when):
+        self.now = when
+        while self.events and self.events[0][0] <= when:
+            at, _, _, emp_id, location, version = heapq.heappop(self.events)
+            member = self.crew[emp_id]
+            if version is None or version == member.version:
+                self._move(member, location, at)
+
+    def _move(self, member, location, since):
+        if member.location is not AIRBORNE:
+            self.pools[(member.role, member.location)].pop(member.id, None)
+        member.location = location
+        member.since = since
+        if location is not AIRBORNE:
+            self.pools[(member.role, location)][member.id] = member
+
+    # הכשרה לטיסה ארוכה, והשיבוץ הבא של העובד במסד מתחיל אחרי הנחיתה ומהיעד של הטיסה
+    @staticmethod
+    def _fits(member, flight):
+        if flight.is_long and not member.trained:
+            return False
+        i = bisect.bisect_left(member.future, (flight.dep,))
+        return i == len(member.future) or (member.future[i][0] >= flight.arr and member.future[i][2] == flight.dest)
+
+    def _candidates(self, role, airport):
+        return itertools.chain(self.pools.get((role, airport), {}).values(), self.pools.get((role, None), {}).values())
+
+    def _take(self, member, idx):
+        flight = self.flights[idx]
+        member.stack.append((idx, member.location, member.since))
+        member.load += flight.hours
+        member.version += 1
+        if flight.arr <= self.now:
+            self._move(member, flight.dest, flight.arr)
+        else:
+            self._move(member, AIRBORNE, flight.dep)
+            self._push(flight.arr, member, flight.dest, member.version)
+
+    # מבטל את השיבוץ האחרון של העובד בריצה ומחזיר אותו למקום שבו היה לפניו
+    def _release(self, member):
+        idx, location, since = member.stack.pop()
+        member.load -= self.flights[idx].hours
+        member.version += 1
+        self._move(member, location, since)
+
+    # עובד מטיסה קודמת g אפשר להעביר רק אם g היא השיבוץ האחרון שלו ואין לו שיבוץ במסד מאז ההמראה של g
+    def _movable(self, member, g_idx, flight):
+        if not member.stack or member.stack[-1][0] != g_idx:
+            return False
+        prior = self.flights[g_idx]
+        i = bisect.bisect_left(member.future, (prior.dep,))
+        if i < len(member.future) and member.future[i][0] < flight.dep:
+            return False
+        return self._fits(member, flight)
+
+    def _repair(self, idx, role, short):
+        flight = self.flights[idx]
+        found = []
+        for g_idx in reversed(self.by_origin[flight.origin][-self.repair_depth:]):
+            prior = self.flights[g_idx]
+            team = self.crews[g_idx][role]
+            for pos, member in enumerate(team):
+                if len(found) == short:
+                    return found
+                if not self._movable(member, g_idx, flight):
+                    continue
+                # המחליף היה בשדה כבר לפני ההמראה של g ולא זז מאז
+                replacements = [
+                    m for m in self._candidates(role, prior.origin)
+                    if (m.since is None or m.since <= prior.dep) and self._fits(m, prior)
+                ]
+                if not replacements:
+                    continue
+                replacement = min(replacements, key=_load_key)
+                self._release(member)
+                self._take(replacement, g_idx)
+                team[pos] = replacement
+                self._take(member, idx)
+                found.append(member)
+                self.repairs += 1
+        return found
+
+    # משבץ צוות מלא לטיסה, או מחזיר False ומשחרר את מי ששובץ אם אי אפשר
+    def staff(self, flight):
+        self._advance(flight.dep)
+        idx = len(self.flights)
+        self.flights.append(flight)
+        team = {}
+        for role, need in zip(ROLES, required_crew(flight.size)):
+            chosen = heapq.nsmallest(
+                need, (m for m in self._candidates(role, flight.origin) if self._fits(m, flight)), key=_load_key
+            )
+            for member in chosen:
+                self._take(member, idx)
+            if len(chosen) < need:
+                chosen += self._repair(idx, role, need - len(chosen))
+            team[role] = chosen
+            if len(chosen) < need:
+                for member in itertools.chain.from_iterable(team.values()):
+                    self._release(member)
+                return False
+        self.crews[idx] = team
+        self.by_origin[flight.origin].append(idx)
+        return True
+
+    # משבץ את כל הטיסות ומחזיר (טיסות ששובצו, טיסות שנשארו בלי צוות)
+    def run(self, flights):
+        unstaffed = []
+        for flight in sorted(flights, key=lambda f: (f.dep, f.key)):
+            if not self.staff(flight):
+                unstaffed.append(flight)
+        return [self.flights[idx] for idx in self.crews], unstaffed
+
+    # השיבוצים הסופיים: (טיסה, עובד, תפקיד); תיקון יכול להחליף עובדים בטיסות שכבר שובצו,
+    # לכן הם נקראים רק בסוף הריצה
+    def assignments(self):
+        for idx, team in self.crews.items():
+            for role, members in team.items():
+                for member in members:
+                    yield self.flights[idx], member.id, role
+
+    # התפלגות השעות של העובדים, לבדיקת האיזון
+    def load_spread(self):
+        loads = sorted(m.load for m in self.crew.values())
+        if not loads:
+            return {}
+        mean = sum(loads) / len(loads)
+        return {
+            "min": round(loads[0], 2),
+            "median": round(loads[len(loads) // 2], 2),
+            "max": round(loads[-1], 2),
+            "mean": round(mean, 2),
+            "stddev": round((sum((x - mean) ** 2 for x in loads) / len(loads)) ** 0.5, 2),
+        }
+
+
+# טיסות עתידיות בחלון שעדיין אין להן אף איש צוות
+def load_unstaffed_flights(cursor, start, end):
+    cursor.execute(
+        """
+        SELECT f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour, f.Dep_TS, f.Arr_TS, r.Origin, r.Destination, r.Duration, a.Size
+        FROM flight f
+        JOIN route r ON r.Route_ID = f.Route_ID
+        JOIN air_craft a ON a.Air_Craft_ID = f.Air_Craft_ID
+        WHERE f.Dep_TS >= %s AND f.Dep_TS < %s
+          AND f.Status IN (%s, %s)
+          AND NOT EXISTS (
+            SELECT 1 FROM flight_crew fc
+            WHERE fc.Air_Craft_ID = f.Air_Craft_ID AND fc.Dep_Date = f.Dep_Date AND fc.Dep_Hour = f.Dep_Hour
+          )
+        ORDER BY f.Dep_TS
+        """,
+        (start, end, FLIGHT_STATUS_SCHEDULED, FLIGHT_STATUS_FULLY_BOOKED),
+    )
+    return [
+        RosterFlight((aircraft_id, dep_date, dep_hour), dep_ts, arr_ts, origin, dest, duration, size)
+        for aircraft_id, dep_date, dep_hour, dep_ts, arr_ts, origin, dest, duration, size in cursor.fetchall()
+    ]
+
+
+# טוען את כל הצוות בכמה שאילתות: תפקיד והכשרה, המיקום האחרון לפני start, השיבוצים שנוחתים אחרי start
+# ושעות 30 הימים האחרונים מ-report_crew_daily (אותו מדד של דוח crew_load)
+def load_crew(cursor, start):
+    cursor.execute(
+        """
+        SELECT ID, 'Pilot', Long_Dist_Training FROM pilot
+        UNION ALL
+        SELECT ID, 'Flight_Attendant', Long_Dist_Training FROM flight_attendent
+        """
+    )
+    roles = cursor.fetchall()
+    cursor.execute("SELECT DISTINCT ID FROM crew_location")
+    has_history = {r[0] for r in cursor.fetchall()}
+    cursor.execute(
+        """
+        SELECT c.ID, c.Destination, c.Arr_TS
+        FROM crew_location c
+        JOIN (
+          SELECT ID, MAX(Arr_TS) AS Arr_TS FROM crew_location WHERE Arr_TS <= %s GROUP BY ID
+        ) last ON last.ID = c.ID AND last.Arr_TS = c.Arr_TS
+        """,
+        (start,),
+    )
+    located = {emp_id: (dest, arr_ts) for emp_id, dest, arr_ts in cursor.fetchall()}
+    cursor.execute(
+        "SELECT ID, Dep_TS, Arr_TS, Origin, Destination FROM crew_location WHERE Arr_TS > %s",
+        (start,),
+    )
+    legs = cursor.fetchall()
+    since_day = (start.date() if isinstance(start, datetime) else start) - timedelta(days=LOAD_WINDOW_DAYS)
+    cursor.execute(
+        """
+        SELECT ID, SUM(Long_Hours + Short_Hours)
+        FROM report_crew_daily
+        WHERE Day >= %s
+        GROUP BY ID
+        """,
+        (since_day,),
+    )
+    hours = {emp_id: float(total or 0) for emp_id, total in cursor.fetchall()}
+
+    crew = []
+    for emp_id, role, trained in roles:
+        if emp_id in located:
+            location, since = located[emp_id]
+        else:
+            location, since = (AIRBORNE, None) if emp_id in has_history else (None, None)
+        crew.append(CrewMember(emp_id, role, trained, hours.get(emp_id, 0.0), location, since))
+    return crew, legs
+
+
+# כותב מנה של שיבוצים ל-flight_crew ולאינדקס מיקום הצוות בטרנזקציה אחת
+@invalidates("flight_crew", "crew_location")
+def _apply_chunk(rows):
+    with db_cursor(transaction=True) as cursor:
+        cursor.executemany(
+            "INSERT INTO flight_crew (ID, Air_Craft_ID, Dep_Date, Dep_Hour, Role) VALUES (%s, %s, %s, %s, %s)",
+            [(emp_id, *flight.key, role) for flight, emp_id, role in rows],
+        )
+        index_crew_locations(
+            cursor,
+            [(emp_id, *flight.key, flight.dep, flight.arr, flight.origin, flight.dest) for flight, emp_id, _ in rows],
+        )
+
+
+# משבץ צוות לכל הטיסות הלא מאוישות בחלון [start, end) וכותב את התוצאה במנות של טיסות
+# (טרנזקציה לכל מנה). מנה שנכשלה במסד (למשל כי מנהל שיבץ אחת הטיסות בינתיים) לא מבטלת את האחרות
+def roster_flights(start, end, dry_run=False, chunk_size=APPLY_CHUNK):
+    started = time.perf_counter()
+    with db_cursor() as cursor:
+        flights = load_unstaffed_flights(cursor, start, end)
+        crew, legs = load_crew(cursor, start)
+    loaded = time.perf_counter()
+
+    roster = Roster(crew, legs)
+    staffed, unstaffed = roster.run(flights)
+    solved = time.perf_counter()
+
+    by_flight = defaultdict(list)
+    for flight, emp_id, role in roster.assignments():
+        by_flight[flight.key].append((flight, emp_id, role))
+    written, failed = 0, []
+    if not dry_run:
+        keys = list(by_flight)
+        for i in range(0, len(keys), chunk_size):
+            chunk = keys[i:i + chunk_size]
+            try:
+                _apply_chunk([row for key in chunk for row in by_flight[key]])
+                written += len(chunk)
+            except mysql.connector.Error as e:
+                failed.append({"flights": len(chunk), "error": e.msg})
+    return {
+        "flights": len(flights),
+        "staffed": len(staffed),
+        "written": written,
+        "unstaffed": [
+            {"aircraft": f.key[0], "dep_date": f.key[1], "dep_hour": f.key[2], "origin": f.origin, "dest": f.dest}
+            for f in unstaffed
+        ],
+        "repairs": roster.repairs,
+        "failed_chunks": failed,
+        "dry_run": dry_run,
+        "load_hours": roster.load_spread(),
+        "seconds": {
+            "load": round(loaded - started, 3),
+            "solve": round(solved - loaded, 3),
+            "total": round(time.perf_counter() - started, 3),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assign crews to all unstaffed flights in a date range")
+    parser.add_argument("--start", help="YYYY-MM-DD, default: now")
+    parser.add_argument("--end", required=True, help="YYYY-MM-DD (exclusive)")
+    parser.add_argument("--chunk-size", type=int, default=APPLY_CHUNK, help="flights per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="compute the roster, write nothing")
+    args = parser.parse_args()
+
+    now = datetime.now().replace(microsecond=0)
+    start = max(now, datetime.fromisoformat(args.start)) if args.start else now
+    end = datetime.combine(date.fromisoformat(args.end), datetime.min.time())
+    report = roster_flights(start, end, args.dry_run, args.chunk_size)
+    summary = {k: v for k, v in report.items() if k != "unstaffed"}
+    summary["unstaffed"] = len(report["unstaffed"])
+    print(json.dumps(summary, indent=2, default=str))
+    for flight in report["unstaffed"][:50]:
+        print(f"unstaffed: {flight['aircraft']} {flight['dep_date']} {flight['dep_hour']} {flight['origin']} -> {flight['dest']}")
+
+
+if __name__ == "__main__":
+    main()
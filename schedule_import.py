@@ -0,0 +1,309 @@
+import argparse
+import bisect
+import csv
+import io
+import json
+import time
+from datetime import datetime, timedelta
+
+import mysql.connector
+from dotenv import load_dotenv
+
+from query_cache import invalidates
+from utils import (
+    FLIGHT_STATUS_SCHEDULED,
+    LONG_FLIGHT_HOURS,
+    db_cursor,
+    insert_flights_batch,
+    reference_registry,
+    required_crew,
+)
+
+load_dotenv()
+
+# עמודות קובץ הלוח; מזהי צוות מופרדים ב-; (ב-JSON אפשר גם רשימה)
+SCHEDULE_FIELDS = (
+    "origin", "destination", "dep_date", "dep_time", "aircraft_id",
+    "economy_price", "business_price", "pilot_ids", "attendant_ids",
+)
+REQUIRED_FIELDS = ("origin", "destination", "dep_date", "dep_time", "aircraft_id", "economy_price")
+IMPORT_CHUNK = 500
+
+
+# קורא קובץ לוח טיסות (csv או json) ומחזיר רשימת שורות כמילונים. שורת csv שלא ניתן לפענח נשמרת
+# כ-csv.Error במקומה, כדי שתדווח כשגיאה של אותה שורה וכל שאר הקובץ ייבדק
+def read_schedule(stream, fmt):
+    if isinstance(stream, bytes):
+        stream = stream.decode("utf-8-sig")
+    if isinstance(stream, str):
+        stream = io.StringIO(stream)
+    if fmt == "json":
+        rows = json.load(stream)
+        if isinstance(rows, dict):
+            rows = rows.get("flights", [])
+        if not isinstance(rows, list):
+            raise ValueError("a JSON schedule must be a list of flights or an object with a flights list")
+        return rows
+    reader = csv.DictReader(stream)
+    rows = []
+    while True:
+        try:
+            rows.append(next(reader))
+        except StopIteration:
+            return rows
+        except csv.Error as e:
+            rows.append(e)
+
+
+def _ids(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in str(value).split(";") if v.strip()]
+
+
+def _price(value):
+    if value in (None, "", "none"):
+        return None
+    price = float(value)
+    if price <= 0:
+        raise ValueError
+    return price
+
+
+# טוען פעם אחת את אנשי הצוות (עם הכשרה לטיסות ארוכות) ואת צירי הזמן הקיימים של המטוסים והצוות בחלון הלוח
+def load_existing(aircraft_ids, crew_ids, start, end):
+    with db_cursor() as cursor:
+        cursor.execute("SELECT ID, Long_Dist_Training FROM pilot")
+        pilots = dict(cursor.fetchall())
+        cursor.execute("SELECT ID, Long_Dist_Training FROM flight_attendent")
+        attendants = dict(cursor.fetchall())
+        busy = {}
+        for table, column, ids in (("aircraft_location", "Air_Craft_ID", aircraft_ids), ("crew_location", "ID", crew_ids)):
+            if not ids:
+                continue
+            placeholders = ",".join(["%s"] * len(ids))
+            # הטיסות בחלון, ובנוסף הנחיתה האחרונה של כל משאב לפני החלון (המיקום שלו בתחילת הלוח)
+            cursor.execute(
+                f"""
+                SELECT {column}, Dep_TS, Arr_TS, Origin, Destination
+                FROM {table}
+                WHERE {column} IN ({placeholders}) AND Arr_TS > %s AND Dep_TS < %s
+                UNION ALL
+                SELECT l.{column}, l.Dep_TS, l.Arr_TS, l.Origin, l.Destination
+                FROM {table} l
+                JOIN (
+                    SELECT {column}, MAX(Arr_TS) AS Arr_TS
+                    FROM {table}
+                    WHERE {column} IN ({placeholders}) AND Arr_TS <= %s
+                    GROUP BY {column}
+                ) last
+                  ON last.{column} = l.{column}
+                 AND last.Arr_TS = l.Arr_TS
+                """,
+                (*ids, start, end, *ids, start),
+            )
+            for resource, dep_ts, arr_ts, origin, destination in cursor.fetchall():
+                busy.setdefault((table, resource), []).append((dep_ts, arr_ts, None, origin, destination))
+    return pilots, attendants, busy
+
+
+OVERLAP_LABELS = {"aircraft_location": "aircraft", "crew_location": "employee"}
+
+
+# מוצא חפיפות בזמן לכל משאב (מטוס או עובד) בין שורות הקובץ לבין עצמן ולטיסות קיימות;
+# intervals ממופה מ-(טבלה, משאב) לרשימת (המראה, נחיתה, מספר שורה או None לטיסה קיימת, מוצא, יעד)
+def find_overlaps(intervals, errors):
+    for (table, resource), spans in intervals.items():
+        spans.sort(key=lambda s: (s[0], s[1]))
+        holder = None
+        for span in spans:
+            if holder is not None and span[0] < holder[1]:
+                row = span[2] if span[2] is not None else holder[2]
+                if row is not None:
+                    other = "an existing flight" if holder[2] is None or span[2] is None else f"row {holder[2]}"
+                    errors.setdefault(row, []).append(f"{OVERLAP_LABELS[table]} {resource} overlaps {other}")
+            if holder is None or span[1] > holder[1]:
+                holder = span
+
+
+# בודק רציפות מיקום כמו באשף הוספת הטיסה: הנחיתה האחרונה של המשאב עד ההמראה של כל שורה בקובץ
+# (טיסה קיימת או שורה קודמת בזמן באותו קובץ) צריכה להיות בשדה המוצא של השורה
+def find_location_gaps(intervals, errors):
+    for (table, resource), spans in intervals.items():
+        landings = sorted(spans, key=lambda s: s[1])
+        arrivals = [s[1] for s in landings]
+        for dep, _, row, origin, _ in spans:
+            if row is None:
+                continue
+            i = bisect.bisect_right(arrivals, dep)
+            if i == 0:
+                continue
+            _, _, last_row, _, location = landings[i - 1]
+            if location != origin:
+                after = "an existing flight" if last_row is None else f"row {last_row}"
+                errors.setdefault(row, []).append(
+                    f"{OVERLAP_LABELS[table]} {resource} is at {location} after {after}, not at {origin}"
+                )
+
+
+# בודק את כל השורות מול נתוני הייחוס ומחזיר (טיסות תקינות, שגיאות לפי מספר שורה).
+# כל טיסה תקינה היא (מספר שורה, שורת flight, שורות flight_crew)
+def validate_schedule(rows, now=None):
+    now = now or datetime.now()
+    # טעינה טרייה אחת לכל ייבוא, כדי שמטוסים ומסלולים שנוספו זה עתה בתהליך אחר ייכללו
+    data = reference_registry.reload()
+    errors, parsed = {}, []
+    for n, raw in enumerate(rows, 1):
+        if isinstance(raw, csv.Error):
+            errors[n] = [f"unreadable CSV row: {raw}"]
+            continue
+        if not isinstance(raw, dict):
+            errors[n] = ["row must be an object with the schedule columns"]
+            continue
+        row = {k: (raw.get(k).strip() if isinstance(raw.get(k), str) else raw.get(k)) for k in SCHEDULE_FIELDS}
+        problems = [f"missing {k}" for k in REQUIRED_FIELDS if row[k] in (None, "")]
+        if problems:
+            errors[n] = problems
+            continue
+        try:
+            dep_date = datetime.strptime(str(row["dep_date"]), "%Y-%m-%d").date()
+            dep_str = str(row["dep_time"])
+            dep_time = datetime.strptime(dep_str, "%H:%M:%S" if len(dep_str) == 8 else "%H:%M").time()
+        except ValueError:
+            errors[n] = ["invalid dep_date/dep_time (expected YYYY-MM-DD and HH:MM)"]
+            continue
+        try:
+            economy_price = _price(row["economy_price"])
+            business_price = _price(row["business_price"])
+        except (TypeError, ValueError):
+            errors[n] = ["prices must be positive numbers"]
+            continue
+
+        route = data.routes_by_od.get((row["origin"], row["destination"]))
+        aircraft = data.aircraft.get(row["aircraft_id"])
+        if route is None:
+            problems.append(f"no route {row['origin']} -> {row['destination']}")
+        if aircraft is None:
+            problems.append(f"unknown aircraft {row['aircraft_id']}")
+        if problems:
+            errors[n] = problems
+            continue
+
+        route_id, duration = route[0], float(route[1])
+        size = aircraft[1]
+        is_long = duration > LONG_FLIGHT_HOURS
+        dep_dt = datetime.combine(dep_date, dep_time)
+        arr_dt = dep_dt + timedelta(hours=duration)
+        if dep_dt <= now:
+            problems.append("departure is in the past")
+        if is_long and size != "Large":
+            problems.append(f"{duration:g}h route needs a Large aircraft")
+        if size == "Large" and business_price is None:
+            problems.append("business_price is required for a Large aircraft")
+        if size != "Large":
+            business_price = None
+
+        pilot_ids, attendant_ids = _ids(row["pilot_ids"]), _ids(row["attendant_ids"])
+        if pilot_ids or attendant_ids:
+            need_pilots, need_attendants = required_crew(size)
+            if len(set(pilot_ids)) != need_pilots or len(set(attendant_ids)) != need_attendants:
+                problems.append(f"crew must be exactly {need_pilots} pilots and {need_attendants} attendants")
+        if problems:
+            errors[n] = problems
+            continue
+        parsed.append((n, row["aircraft_id"], dep_date, dep_time, route_id, arr_dt, economy_price,
+                       business_price, pilot_ids, attendant_ids, is_long, row["origin"], row["destination"]))
+
+    if not parsed:
+        return [], errors
+
+    aircraft_ids = sorted({p[1] for p in parsed})
+    crew_ids = sorted({e for p in parsed for e in p[8] + p[9]})
+    start = min(datetime.combine(p[2], p[3]) for p in parsed)
+    end = max(p[5] for p in parsed)
+    pilots, attendants, busy = load_existing(aircraft_ids, crew_ids, start, end)
+
+    for n, aircraft_id, dep_date, dep_time, _, arr_dt, _, _, pilot_ids, attendant_ids, is_long, origin, dest in parsed:
+        dep_dt = datetime.combine(dep_date, dep_time)
+        busy.setdefault(("aircraft_location", aircraft_id), []).append((dep_dt, arr_dt, n, origin, dest))
+        for ids, known, role in ((pilot_ids, pilots, "pilot"), (attendant_ids, attendants, "attendant")):
+            for emp_id in ids:
+                if emp_id not in known:
+                    errors.setdefault(n, []).append(f"unknown {role} {emp_id}")
+                elif is_long and not known[emp_id]:
+                    errors.setdefault(n, []).append(f"{role} {emp_id} is not trained for long flights")
+                busy.setdefault(("crew_location", emp_id), []).append((dep_dt, arr_dt, n, origin, dest))
+    find_overlaps(busy, errors)
+    find_location_gaps(busy, errors)
+
+    valid = []
+    for n, aircraft_id, dep_date, dep_time, route_id, arr_dt, economy_price, business_price, pilot_ids, attendant_ids, *_ in parsed:
+        if n in errors:
+            continue
+        flight = (aircraft_id, dep_date, dep_time, route_id, arr_dt.date(), arr_dt.time().replace(second=0, microsecond=0),
+                  economy_price, business_price, FLIGHT_STATUS_SCHEDULED)
+        crew = [(pid, aircraft_id, dep_date, dep_time, "Pilot") for pid in pilot_ids]
+        crew += [(aid, aircraft_id, dep_date, dep_time, "Flight_Attendant") for aid in attendant_ids]
+        valid.append((n, flight, crew))
+    return valid, errors
+
+
+# מכניס מנה אחת של טיסות בטרנזקציה אחת
+@invalidates("flight", "flight_inventory", "flight_crew", "crew_location", "aircraft_location")
+def _insert_chunk(chunk):
+    with db_cursor(transaction=True) as cursor:
+        insert_flights_batch(cursor, [flight for _, flight, _ in chunk], [c for _, _, crew in chunk for c in crew])
+
+
+# מייבא לוח טיסות: בודק את כל השורות, מכניס את התקינות במנות של chunk_size (טרנזקציה לכל מנה)
+# ומחזיר דוח עם השגיאות לפי מספר שורה. מנה שנכשלה במסד לא מבטלת את המנות האחרות
+def import_schedule(rows, chunk_size=IMPORT_CHUNK, dry_run=False):
+    started = time.perf_counter()
+    valid, errors = validate_schedule(rows)
+    inserted = 0
+    if not dry_run:
+        for i in range(0, len(valid), chunk_size):
+            chunk = valid[i:i + chunk_size]
+            try:
+                _insert_chunk(chunk)
+                inserted += len(chunk)
+            except mysql.connector.Error as e:
+                for n, _, _ in chunk:
+                    errors.setdefault(n, []).append(f"not inserted, batch failed: {e.msg}")
+    return {
+        "rows": len(rows),
+        "valid": len(valid),
+        "inserted": inserted,
+        "dry_run": dry_run,
+        "seconds": round(time.perf_counter() - started, 3),
+        "errors": [{"row": n, "errors": errors[n]} for n in sorted(errors)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a flight schedule (CSV or JSON) with optional crew assignments")
+    parser.add_argument("path", help=f"schedule file; columns: {', '.join(SCHEDULE_FIELDS)}")
+    parser.add_argument("--format", choices=("csv", "json"), help="default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK, help="flights per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="validate only, insert nothing")
+    parser.add_argument("--report", help="write the full JSON report to this file")
+    args = parser.parse_args()
+
+    fmt = args.format or ("json" if args.path.lower().endswith(".json") else "csv")
+    with open(args.path, encoding="utf-8-sig", newline="") as f:
+        rows = read_schedule(f, fmt)
+    report = import_schedule(rows, args.chunk_size, args.dry_run)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    summary = {k: v for k, v in report.items() if k != "errors"}
+    summary["rows_with_errors"] = len(report["errors"])
+    print(json.dumps(summary))
+    for error in report["errors"][:50]:
+        print(f"row {error['row']}: {'; '.join(error['errors'])}")
+
+
+if __name__ == "__main__":
+    main()
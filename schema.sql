@@ -4,6 +4,10 @@ SET FOREIGN_KEY_CHECKS = 0;
 
 
 DROP TABLE IF EXISTS tickets;
+DROP TABLE IF EXISTS flight_inventory;
+DROP TABLE IF EXISTS seat_hold;
+DROP TABLE IF EXISTS crew_location;
+DROP TABLE IF EXISTS aircraft_location;
 DROP TABLE IF EXISTS flight_order;
 DROP TABLE IF EXISTS flight_crew;
 DROP TABLE IF EXISTS flight;
@@ -18,6 +22,16 @@ DROP TABLE IF EXISTS address;
 DROP TABLE IF EXISTS employee;
 DROP TABLE IF EXISTS customer;
 DROP TABLE IF EXISTS route;
+DROP TABLE IF EXISTS maintenance_lease;
+DROP TABLE IF EXISTS maintenance_state;
+DROP TABLE IF EXISTS schema_migrations;
+DROP TABLE IF EXISTS report_flight_daily;
+DROP TABLE IF EXISTS report_order_daily;
+DROP TABLE IF EXISTS report_route_daily;
+DROP TABLE IF EXISTS report_crew_daily;
+DROP TABLE IF EXISTS web_session;
+DROP TABLE IF EXISTS flight_pattern;
+DROP TABLE IF EXISTS flight_completion;
 
 SET FOREIGN_KEY_CHECKS = 1;
 
@@ -106,8 +120,14 @@ CREATE TABLE flight (
   Economy_Price DECIMAL(10,2) NOT NULL,
   Business_Price DECIMAL(10,2) DEFAULT NULL,
   Status ENUM('SCHEDULED','FULLY BOOKED','COMPLETED','CANCELED') NOT NULL,
+  Dep_TS DATETIME GENERATED ALWAYS AS (TIMESTAMP(Dep_Date, Dep_Hour)) STORED,
+  Arr_TS DATETIME GENERATED ALWAYS AS (TIMESTAMP(Arrival_Date, Arrival_Time)) STORED,
   PRIMARY KEY (Air_Craft_ID, Dep_Date, Dep_Hour),
   KEY Route_ID (Route_ID),
+  KEY Departure (Dep_TS),
+  KEY Arrival (Arr_TS),
+  KEY Status_Dep (Status, Dep_Date),
+  KEY Status_Arrival (Status, Arr_TS),
   CONSTRAINT flight_ibfk_1 FOREIGN KEY (Air_Craft_ID) REFERENCES air_craft (Air_Craft_ID),
   CONSTRAINT flight_ibfk_2 FOREIGN KEY (Route_ID) REFERENCES route (Route_ID)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -149,7 +169,8 @@ CREATE TABLE flight_order (
   Order_status ENUM('Active','Completed','Customer_Canceled','System_Canceled') NOT NULL,
   Total_Paid DECIMAL(10,2) NOT NULL,
   PRIMARY KEY (Order_ID),
-  KEY Email (Email),
+  KEY Email_Status (Email, Order_status),
+  KEY Order_Date (Order_Date),
   CONSTRAINT flight_order_ibfk_1 FOREIGN KEY (Email) REFERENCES customer (Email)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
@@ -161,13 +182,172 @@ CREATE TABLE tickets (
   Chosen_Row_Num INT NOT NULL,
   Chosen_Col_Num INT NOT NULL,
   Price_Paid DECIMAL(10,2) NOT NULL,
+  Dep_TS DATETIME GENERATED ALWAYS AS (TIMESTAMP(Dep_Date, Dep_Hour)) STORED,
   PRIMARY KEY (Air_Craft_ID, Dep_Date, Dep_Hour, Chosen_Row_Num, Chosen_Col_Num),
-  KEY Order_ID (Order_ID),
+  KEY Order_ID (Order_ID, Dep_TS),
   CONSTRAINT tickets_ibfk_1 FOREIGN KEY (Order_ID) REFERENCES flight_order (Order_ID),
   CONSTRAINT tickets_ibfk_2 FOREIGN KEY (Air_Craft_ID, Dep_Date, Dep_Hour)
     REFERENCES flight (Air_Craft_ID, Dep_Date, Dep_Hour)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
+CREATE TABLE flight_inventory (
+  Air_Craft_ID VARCHAR(20) NOT NULL,
+  Dep_Date DATE NOT NULL,
+  Dep_Hour TIME NOT NULL,
+  Class ENUM('Economy','Business') NOT NULL,
+  Capacity INT NOT NULL,
+  Sold INT NOT NULL DEFAULT 0,
+  Active INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (Air_Craft_ID, Dep_Date, Dep_Hour, Class),
+  CONSTRAINT flight_inventory_ibfk_1 FOREIGN KEY (Air_Craft_ID, Dep_Date, Dep_Hour)
+    REFERENCES flight (Air_Craft_ID, Dep_Date, Dep_Hour)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE seat_hold (
+  Air_Craft_ID VARCHAR(20) NOT NULL,
+  Dep_Date DATE NOT NULL,
+  Dep_Hour TIME NOT NULL,
+  Row_Num INT NOT NULL,
+  Col_Num INT NOT NULL,
+  Hold_Token VARCHAR(64) NOT NULL,
+  Expires_At DATETIME NOT NULL,
+  PRIMARY KEY (Air_Craft_ID, Dep_Date, Dep_Hour, Row_Num, Col_Num),
+  KEY Hold_Token (Hold_Token),
+  KEY Expires_At (Expires_At),
+  CONSTRAINT seat_hold_ibfk_1 FOREIGN KEY (Air_Craft_ID, Dep_Date, Dep_Hour)
+    REFERENCES flight (Air_Craft_ID, Dep_Date, Dep_Hour)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE crew_location (
+  ID VARCHAR(20) NOT NULL,
+  Air_Craft_ID VARCHAR(20) NOT NULL,
+  Dep_Date DATE NOT NULL,
+  Dep_Hour TIME NOT NULL,
+  Dep_TS DATETIME NOT NULL,
+  Arr_TS DATETIME NOT NULL,
+  Origin VARCHAR(50) NOT NULL,
+  Destination VARCHAR(50) NOT NULL,
+  PRIMARY KEY (ID, Air_Craft_ID, Dep_Date, Dep_Hour),
+  KEY Timeline (ID, Arr_TS),
+  KEY Flight (Air_Craft_ID, Dep_Date, Dep_Hour),
+  CONSTRAINT crew_location_ibfk_1 FOREIGN KEY (ID, Air_Craft_ID, Dep_Date, Dep_Hour)
+    REFERENCES flight_crew (ID, Air_Craft_ID, Dep_Date, Dep_Hour)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE aircraft_location (
+  Air_Craft_ID VARCHAR(20) NOT NULL,
+  Dep_Date DATE NOT NULL,
+  Dep_Hour TIME NOT NULL,
+  Dep_TS DATETIME NOT NULL,
+  Arr_TS DATETIME NOT NULL,
+  Origin VARCHAR(50) NOT NULL,
+  Destination VARCHAR(50) NOT NULL,
+  PRIMARY KEY (Air_Craft_ID, Dep_Date, Dep_Hour),
+  KEY Timeline (Air_Craft_ID, Arr_TS),
+  CONSTRAINT aircraft_location_ibfk_1 FOREIGN KEY (Air_Craft_ID, Dep_Date, Dep_Hour)
+    REFERENCES flight (Air_Craft_ID, Dep_Date, Dep_Hour)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE maintenance_lease (
+  Name VARCHAR(50) NOT NULL,
+  Owner VARCHAR(100) NOT NULL,
+  Expires_At DATETIME NOT NULL,
+  PRIMARY KEY (Name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE maintenance_state (
+  Name VARCHAR(50) NOT NULL,
+  Watermark DATETIME DEFAULT NULL,
+  PRIMARY KEY (Name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE flight_completion (
+  Seq BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  Air_Craft_ID VARCHAR(20) NOT NULL,
+  Dep_Date DATE NOT NULL,
+  Dep_Hour TIME NOT NULL,
+  PRIMARY KEY (Seq)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE report_flight_daily (
+  Day DATE NOT NULL,
+  Status ENUM('SCHEDULED','FULLY BOOKED','COMPLETED','CANCELED') NOT NULL,
+  Flights INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (Day, Status)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE report_order_daily (
+  Day DATE NOT NULL,
+  Order_status ENUM('Active','Completed','Customer_Canceled','System_Canceled') NOT NULL,
+  Orders INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (Day, Order_status)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE report_route_daily (
+  Day DATE NOT NULL,
+  Route_ID INT NOT NULL,
+  Completed_Flights INT NOT NULL DEFAULT 0,
+  Tickets_Sold INT NOT NULL DEFAULT 0,
+  Revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+  Hours DECIMAL(10,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (Day, Route_ID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE report_crew_daily (
+  Day DATE NOT NULL,
+  ID VARCHAR(20) NOT NULL,
+  Flights INT NOT NULL DEFAULT 0,
+  Long_Hours DECIMAL(10,2) NOT NULL DEFAULT 0,
+  Short_Hours DECIMAL(10,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (Day, ID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE web_session (
+  Sid CHAR(43) NOT NULL,
+  Expires_At DATETIME NOT NULL,
+  Data MEDIUMBLOB NOT NULL,
+  PRIMARY KEY (Sid),
+  KEY Expires_At (Expires_At)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE flight_pattern (
+  Pattern_ID INT NOT NULL AUTO_INCREMENT,
+  Route_ID INT NOT NULL,
+  Air_Craft_ID VARCHAR(20) NOT NULL,
+  Dep_Hour TIME NOT NULL,
+  Weekdays TINYINT UNSIGNED NOT NULL,
+  Start_Date DATE NOT NULL,
+  End_Date DATE NOT NULL,
+  Economy_Price DECIMAL(10,2) NOT NULL,
+  Business_Price DECIMAL(10,2) DEFAULT NULL,
+  Materialized_Until DATE DEFAULT NULL,
+  PRIMARY KEY (Pattern_ID),
+  KEY Air_Craft_ID (Air_Craft_ID),
+  CONSTRAINT flight_pattern_ibfk_1 FOREIGN KEY (Route_ID) REFERENCES route (Route_ID),
+  CONSTRAINT flight_pattern_ibfk_2 FOREIGN KEY (Air_Craft_ID) REFERENCES air_craft (Air_Craft_ID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Migrations already included in this script (see migrate.py / migrations/)
+CREATE TABLE schema_migrations (
+  Version INT NOT NULL,
+  Name VARCHAR(100) NOT NULL,
+  Applied_At DATETIME NOT NULL,
+  PRIMARY KEY (Version)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT INTO schema_migrations (Version, Name, Applied_At) VALUES
+(1, 'maintenance_tables', NOW()),
+(2, 'generated_timestamps', NOW()),
+(3, 'flight_inventory', NOW()),
+(4, 'seat_hold', NOW()),
+(5, 'location_timelines', NOW()),
+(6, 'hot_path_indexes', NOW()),
+(7, 'report_rollups', NOW()),
+(8, 'web_session', NOW()),
+(9, 'flight_pattern', NOW()),
+(10, 'status_arrival_index', NOW()),
+(11, 'flight_completion', NOW());
+
 -- --------------------------------------------------------------------
 -- Seed data (preserved + extended)
 -- --------------------------------------------------------------------
@@ -383,21 +563,21 @@ INSERT INTO tickets (Order_ID, Air_Craft_ID, Dep_Date, Dep_Hour, Chosen_Row_Num,
 INSERT INTO flight_order (Email, Order_Date, Order_status, Total_Paid)
 VALUES ('stav@gmail.com', '2026-01-21', 'Active', 520.00);
 SET @o2 := LAST_INSERT_ID();
-INSERT INTO tickets VALUES
+INSERT INTO tickets (Order_ID, Air_Craft_ID, Dep_Date, Dep_Hour, Chosen_Row_Num, Chosen_Col_Num, Price_Paid) VALUES
 (@o2,'AC02','2026-02-03','09:30:00', 3, 1, 520.00);
 
 
 INSERT INTO flight_order (Email, Order_Date, Order_status, Total_Paid)
 VALUES ('yoni@gmail.com', '2026-01-10', 'Completed', 280.00);
 SET @o3 := LAST_INSERT_ID();
-INSERT INTO tickets VALUES
+INSERT INTO tickets (Order_ID, Air_Craft_ID, Dep_Date, Dep_Hour, Chosen_Row_Num, Chosen_Col_Num, Price_Paid) VALUES
 (@o3,'AC06','2026-01-10','16:45:00', 10, 2, 280.00);
 
 
 INSERT INTO flight_order (Email, Order_Date, Order_status, Total_Paid)
 VALUES ('stav@gmail.com', '2026-01-22', 'Customer_Canceled', 820.00);
 SET @o4 := LAST_INSERT_ID();
-INSERT INTO tickets VALUES
+INSERT INTO tickets (Order_ID, Air_Craft_ID, Dep_Date, Dep_Hour, Chosen_Row_Num, Chosen_Col_Num, Price_Paid) VALUES
 (@o4,'AC03','2026-02-05','14:00:00', 7, 1, 410.00),
 (@o4,'AC03','2026-02-05','14:00:00', 7, 2, 410.00);
 
@@ -405,7 +585,7 @@ INSERT INTO tickets VALUES
 INSERT INTO flight_order (Email, Order_Date, Order_status, Total_Paid)
 VALUES ('guest1@gmail.com', '2026-01-23', 'Active', 1620.00);
 SET @o5 := LAST_INSERT_ID();
-INSERT INTO tickets VALUES
+INSERT INTO tickets (Order_ID, Air_Craft_ID, Dep_Date, Dep_Hour, Chosen_Row_Num, Chosen_Col_Num, Price_Paid) VALUES
 (@o5,'AC04','2026-02-07','08:15:00', 5, 1, 540.00),
 (@o5,'AC04','2026-02-07','08:15:00', 5, 2, 540.00),
 (@o5,'AC04','2026-02-07','08:15:00', 5, 3, 540.00);
@@ -414,7 +594,89 @@ INSERT INTO tickets VALUES
 INSERT INTO flight_order (Email, Order_Date, Order_status, Total_Paid)
 VALUES ('guest2@gmail.com', '2026-01-24', 'Completed', 900.00);
 SET @o6 := LAST_INSERT_ID();
-INSERT INTO tickets VALUES
+INSERT INTO tickets (Order_ID, Air_Craft_ID, Dep_Date, Dep_Hour, Chosen_Row_Num, Chosen_Col_Num, Price_Paid) VALUES
 (@o6,'AC01','2026-02-01','10:00:00', 1, 1, 900.00);
 
+-- Seat inventory per flight and class (same as utils.rebuild_flight_inventory)
+INSERT INTO flight_inventory (Air_Craft_ID, Dep_Date, Dep_Hour, Class, Capacity, Sold, Active)
+SELECT f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour, ac.Class, ac.Row_Num * ac.Col_Num,
+       COALESCE(x.sold, 0), COALESCE(x.active, 0)
+FROM flight f
+JOIN aircraft_class ac ON ac.Air_Craft_ID = f.Air_Craft_ID
+LEFT JOIN (
+    SELECT t.Air_Craft_ID, t.Dep_Date, t.Dep_Hour,
+           CASE WHEN t.Chosen_Row_Num <= COALESCE(b.Row_Num, 0) THEN 'Business' ELSE 'Economy' END AS Class,
+           COUNT(*) AS sold,
+           SUM(fo.Order_status = 'Active') AS active
+    FROM tickets t
+    JOIN flight_order fo ON fo.Order_ID = t.Order_ID
+    LEFT JOIN aircraft_class b ON b.Air_Craft_ID = t.Air_Craft_ID AND b.Class = 'Business'
+    GROUP BY t.Air_Craft_ID, t.Dep_Date, t.Dep_Hour, Class
+) x
+  ON x.Air_Craft_ID = f.Air_Craft_ID
+ AND x.Dep_Date     = f.Dep_Date
+ AND x.Dep_Hour     = f.Dep_Hour
+ AND x.Class        = ac.Class;
+
+-- Crew location timeline (same as utils.rebuild_crew_locations)
+INSERT INTO crew_location (ID, Air_Craft_ID, Dep_Date, Dep_Hour, Dep_TS, Arr_TS, Origin, Destination)
+SELECT fc.ID, f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour,
+       f.Dep_TS, f.Arr_TS,
+       r.Origin, r.Destination
+FROM flight_crew fc
+JOIN flight f
+  ON f.Air_Craft_ID = fc.Air_Craft_ID
+ AND f.Dep_Date     = fc.Dep_Date
+ AND f.Dep_Hour     = fc.Dep_Hour
+JOIN route r ON r.Route_ID = f.Route_ID
+WHERE f.Status <> 'CANCELED';
+
+-- Aircraft rotation timeline (same as utils.rebuild_aircraft_locations)
+INSERT INTO aircraft_location (Air_Craft_ID, Dep_Date, Dep_Hour, Dep_TS, Arr_TS, Origin, Destination)
+SELECT f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour,
+       f.Dep_TS, f.Arr_TS,
+       r.Origin, r.Destination
+FROM flight f
+JOIN route r ON r.Route_ID = f.Route_ID
+WHERE f.Status <> 'CANCELED';
+
+-- Daily report rollups (same as utils.rebuild_report_rollups)
+INSERT INTO report_flight_daily (Day, Status, Flights)
+SELECT f.Dep_Date, f.Status, COUNT(*)
+FROM flight f
+GROUP BY f.Dep_Date, f.Status;
+
+INSERT INTO report_order_daily (Day, Order_status, Orders)
+SELECT o.Order_Date, o.Order_status, COUNT(*)
+FROM flight_order o
+GROUP BY o.Order_Date, o.Order_status;
+
+INSERT INTO report_route_daily (Day, Route_ID, Completed_Flights, Tickets_Sold, Revenue, Hours)
+SELECT f.Dep_Date, f.Route_ID,
+       COUNT(DISTINCT f.Air_Craft_ID, f.Dep_Hour),
+       COUNT(t.Order_ID),
+       COALESCE(SUM(t.Price_Paid), 0),
+       COUNT(DISTINCT f.Air_Craft_ID, f.Dep_Hour) * MAX(r.Duration)
+FROM flight f
+JOIN route r ON r.Route_ID = f.Route_ID
+LEFT JOIN tickets t
+  ON t.Air_Craft_ID = f.Air_Craft_ID
+ AND t.Dep_Date     = f.Dep_Date
+ AND t.Dep_Hour     = f.Dep_Hour
+WHERE f.Status = 'COMPLETED'
+GROUP BY f.Dep_Date, f.Route_ID;
+
+INSERT INTO report_crew_daily (Day, ID, Flights, Long_Hours, Short_Hours)
+SELECT f.Dep_Date, fc.ID, COUNT(*),
+       SUM(CASE WHEN r.Duration > 6 THEN r.Duration ELSE 0 END),
+       SUM(CASE WHEN r.Duration <= 6 THEN r.Duration ELSE 0 END)
+FROM flight f
+JOIN flight_crew fc
+  ON fc.Air_Craft_ID = f.Air_Craft_ID
+ AND fc.Dep_Date     = f.Dep_Date
+ AND fc.Dep_Hour     = f.Dep_Hour
+JOIN route r ON r.Route_ID = f.Route_ID
+WHERE f.Status = 'COMPLETED'
+GROUP BY f.Dep_Date, fc.ID;
+
 SET FOREIGN_KEY_CHECKS = 1;
\ No newline at end of file
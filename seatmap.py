@@ -0,0 +1,75 @@
+CABIN_BUSINESS = "Business"
+CABIN_ECONOMY = "Economy"
+
+
+# מפת תפוסת מושבים של טיסה: לכל מחלקה מספר שלם המשמש כמערך ביטים (ביט לכל מושב).
+# שורות ה-Business מתחילות בשורה 1, ושורות ה-Economy ממשיכות מיד אחריהן
+class SeatOccupancy:
+    def __init__(self, economy_layout, business_layout=None):
+        business_rows, business_cols = business_layout or (0, 0)
+        economy_rows, economy_cols = economy_layout
+        self.cabins = {
+            CABIN_BUSINESS: (1, business_rows, business_cols),
+            CABIN_ECONOMY: (business_rows + 1, economy_rows, economy_cols),
+        }
+        self.bits = {CABIN_BUSINESS: 0, CABIN_ECONOMY: 0}
+
+    @property
+    def business_rows(self):
+        return self.cabins[CABIN_BUSINESS][1]
+
+    @property
+    def business_cols(self):
+        return self.cabins[CABIN_BUSINESS][2]
+
+    @property
+    def economy_start_row(self):
+        return self.cabins[CABIN_ECONOMY][0]
+
+    @property
+    def economy_end_row(self):
+        start, rows, _ = self.cabins[CABIN_ECONOMY]
+        return start + rows - 1
+
+    @property
+    def economy_cols(self):
+        return self.cabins[CABIN_ECONOMY][2]
+
+    # מחזיר (מחלקה, מיקום ביט) עבור מושב, או None אם המושב מחוץ למפה
+    def _locate(self, row, col):
+        for cabin, (start, rows, cols) in self.cabins.items():
+            if start <= row < start + rows and 1 <= col <= cols:
+                return cabin, (row - start) * cols + (col - 1)
+        return None
+
+    # עותק עצמאי של המפה, כדי שמפה שמורה במטמון לא תשתנה אצל קוראים אחרים
+    def copy(self):
+        seats = SeatOccupancy.__new__(SeatOccupancy)
+        seats.cabins = dict(self.cabins)
+        seats.bits = dict(self.bits)
+        return seats
+
+    # מסמן מושב כתפוס
+    def occupy(self, row, col):
+        located = self._locate(int(row), int(col))
+        if located is not None:
+            cabin, bit = located
+            self.bits[cabin] |= 1 << bit
+
+    # בדיקת O(1) אם מושב תפוס
+    def is_taken(self, row, col):
+        located = self._locate(int(row), int(col))
+        if located is None:
+            return False
+        cabin, bit = located
+        return bool(self.bits[cabin] >> bit & 1)
+
+    def capacity(self, cabin):
+        _, rows, cols = self.cabins[cabin]
+        return rows * cols
+
+    def taken(self, cabin):
+        return self.bits[cabin].bit_count()
+
+    def free(self, cabin):
+        return self.capacity(cabin) - self.taken(cabin)
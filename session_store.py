@@ -0,0 +1,384 @@
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from decimal import Decimal
+
+import msgspec
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+SID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{43}$")
+
+# קודי הרחבה של msgpack לטיפוסים שצריכים לחזור בדיוק כמו שנשמרו
+EXT_DATE = 1
+EXT_DATETIME = 2
+EXT_TIME = 3
+EXT_TIMEDELTA = 4
+EXT_DECIMAL = 5
+
+
+# ממיר ערכים לפני קידוד: תאריכים, שעות, משכי זמן ו-Decimal נשמרים כהרחבות עם טקסט, ו-tuple כרשימה
+def _to_wire(value):
+    if isinstance(value, dict):
+        return {k: _to_wire(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_wire(v) for v in value]
+    if isinstance(value, datetime):
+        return msgspec.msgpack.Ext(EXT_DATETIME, value.isoformat().encode())
+    if isinstance(value, date):
+        return msgspec.msgpack.Ext(EXT_DATE, value.isoformat().encode())
+    if isinstance(value, dt_time):
+        return msgspec.msgpack.Ext(EXT_TIME, value.isoformat().encode())
+    if isinstance(value, timedelta):
+        return msgspec.msgpack.Ext(EXT_TIMEDELTA, str(value // timedelta(microseconds=1)).encode())
+    if isinstance(value, Decimal):
+        return msgspec.msgpack.Ext(EXT_DECIMAL, str(value).encode())
+    return value
+
+
+def _ext_hook(code, data):
+    text = bytes(data).decode()
+    if code == EXT_DATETIME:
+        return datetime.fromisoformat(text)
+    if code == EXT_DATE:
+        return date.fromisoformat(text)
+    if code == EXT_TIME:
+        return dt_time.fromisoformat(text)
+    if code == EXT_TIMEDELTA:
+        return timedelta(microseconds=int(text))
+    if code == EXT_DECIMAL:
+        return Decimal(text)
+    return msgspec.msgpack.Ext(code, data)
+
+
+_encoder = msgspec.msgpack.Encoder()
+_decoder = msgspec.msgpack.Decoder(ext_hook=_ext_hook)
+
+
+def encode_session(data):
+    return _encoder.encode(_to_wire(dict(data)))
+
+
+def decode_session(blob):
+    return _decoder.decode(blob)
+
+
+# מוני שימוש של מאגר הסשנים: מספר פעולות, זמן כולל ומקסימלי לכל פעולה וגודל הרשומות
+class SessionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}
+        self._bytes = {"total": 0, "max": 0, "saved": 0}
+        self.purged = 0
+
+    def record(self, op, started, size=None):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            count, total, worst = self._ops.get(op, (0, 0.0, 0.0))
+            self._ops[op] = (count + 1, total + elapsed, max(worst, elapsed))
+            if size is not None:
+                self._bytes["total"] += size
+                self._bytes["saved"] += 1
+                self._bytes["max"] = max(self._bytes["max"], size)
+
+    def add_purged(self, count):
+        with self._lock:
+            self.purged += count
+
+    def snapshot(self):
+        with self._lock:
+            ops = {
+                op: {"count": count, "avg_ms": total / count * 1000, "max_ms": worst * 1000}
+                for op, (count, total, worst) in self._ops.items()
+            }
+            saved = self._bytes["saved"]
+            return {
+                "ops": ops,
+                "avg_bytes": self._bytes["total"] / saved if saved else 0,
+                "max_bytes": self._bytes["max"],
+                "purged": self.purged,
+            }
+
+
+# מאגר סשנים מקומי: כמה קבצי SQLite במצב WAL (shards) לפי גיבוב מזהה הסשן, עם אינדקס לפי תפוגה.
+# הקבצים נמצאים על הדיסק של השרת, לכן מתאים רק לפריסה עם שרת אחד
+class SQLiteSessionBackend:
+    def __init__(self, directory, shards=8, purge_every=1000, purge_batch=5000):
+        self.directory = directory
+        self.shards = shards
+        self.purge_every = purge_every
+        self.purge_batch = purge_batch
+        self.stats = SessionStats()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._saves = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _shard(self, sid):
+        return zlib.crc32(sid.encode()) % self.shards
+
+    # חיבור לכל shard לכל תהליכון (חיבורי sqlite3 אינם משותפים בין תהליכונים)
+    def _conn(self, shard):
+        conns = getattr(self._local, "conns", None)
+        if conns is None or self._local.pid != os.getpid():
+            conns = self._local.conns = {}
+            self._local.pid = os.getpid()
+        conn = conns.get(shard)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, f"sessions-{shard}.db"), timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session (Sid TEXT PRIMARY KEY, Expires REAL NOT NULL, Data BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS session_expires ON session (Expires)")
+            conns[shard] = conn
+        return conn
+
+    # מחזיר (נתונים, שניות עד תפוגה) או None לסשן שלא קיים או שפג תוקפו
+    def load(self, sid):
+        started = time.perf_counter()
+        now = time.time()
+        row = self._conn(self._shard(sid)).execute(
+            "SELECT Data, Expires FROM session WHERE Sid = ? AND Expires > ?", (sid, now)
+        ).fetchone()
+        self.stats.record("load", started)
+        return (row[0], row[1] - now) if row else None
+
+    def save(self, sid, blob, expires):
+        started = time.perf_counter()
+        shard = self._shard(sid)
+        self._conn(shard).execute(
+            "INSERT OR REPLACE INTO session (Sid, Expires, Data) VALUES (?, ?, ?)", (sid, expires.timestamp(), blob)
+        )
+        self.stats.record("save", started, len(blob))
+        with self._lock:
+            self._saves += 1
+            purge = self._saves % self.purge_every == 0
+        if purge:
+            self.purge_expired(shards=[shard])
+
+    def touch(self, sid, expires):
+        started = time.perf_counter()
+        self._conn(self._shard(sid)).execute(
+            "UPDATE session SET Expires = ? WHERE Sid = ?", (expires.timestamp(), sid)
+        )
+        self.stats.record("touch", started)
+
+    def delete(self, sid):
+        started = time.perf_counter()
+        self._conn(self._shard(sid)).execute("DELETE FROM session WHERE Sid = ?", (sid,))
+        self.stats.record("delete", started)
+
+    # מוחק סשנים שפג תוקפם במנות, לפי אינדקס התפוגה
+    def purge_expired(self, shards=None):
+        started = time.perf_counter()
+        removed = 0
+        for shard in shards if shards is not None else range(self.shards):
+            conn = self._conn(shard)
+            while True:
+                deleted = conn.execute(
+                    "DELETE FROM session WHERE Sid IN (SELECT Sid FROM session WHERE Expires <= ? LIMIT ?)",
+                    (time.time(), self.purge_batch),
+                ).rowcount
+                removed += deleted
+                if deleted < self.purge_batch:
+                    break
+        self.stats.add_purged(removed)
+        self.stats.record("purge", started)
+        return removed
+
+
+# מאגר סשנים משותף לכל השרתים בטבלת web_session במסד, דרך מאגר החיבורים
+class MySQLSessionBackend:
+    def __init__(self, purge_batch=5000):
+        self.purge_batch = purge_batch
+        self.stats = SessionStats()
+
+    def _execute(self, sql, params, fetch=False):
+        import db_pool
+
+        conn = db_pool.request_connection()
+        pooled = conn is None
+        if pooled:
+            conn = db_pool.get_pool().acquire()
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                return cursor.fetchone() if fetch else cursor.rowcount
+            finally:
+                cursor.close()
+        finally:
+            if pooled:
+                db_pool.get_pool().release(conn)
+
+    def load(self, sid):
+        started = time.perf_counter()
+        row = self._execute(
+            """
+            SELECT Data, TIMESTAMPDIFF(SECOND, UTC_TIMESTAMP(), Expires_At)
+            FROM web_session
+            WHERE Sid = %s AND Expires_At > UTC_TIMESTAMP()
+            """,
+            (sid,),
+            fetch=True,
+        )
+        self.stats.record("load", started)
+        return (bytes(row[0]), row[1]) if row else None
+
+    def save(self, sid, blob, expires):
+        started = time.perf_counter()
+        self._execute(
+            """
+            INSERT INTO web_session (Sid, Expires_At, Data) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE Expires_At = VALUES(Expires_At), Data = VALUES(Data)
+            """,
+            (sid, _utc_naive(expires), blob),
+        )
+        self.stats.record("save", started, len(blob))
+
+    def touch(self, sid, expires):
+        started = time.perf_counter()
+        self._execute("UPDATE web_session SET Expires_At = %s WHERE Sid = %s", (_utc_naive(expires), sid))
+        self.stats.record("touch", started)
+
+    def delete(self, sid):
+        started = time.perf_counter()
+        self._execute("DELETE FROM web_session WHERE Sid = %s", (sid,))
+        self.stats.record("delete", started)
+
+    def purge_expired(self):
+        started = time.perf_counter()
+        removed = 0
+        while True:
+            deleted = self._execute(
+                "DELETE FROM web_session WHERE Expires_At <= UTC_TIMESTAMP() LIMIT %s", (self.purge_batch,)
+            )
+            removed += deleted
+            if deleted < self.purge_batch:
+                break
+        self.stats.add_purged(removed)
+        self.stats.record("purge", started)
+        return removed
+
+
+def _utc_naive(value):
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# אובייקט הסשן של הבקשה: מילון שמסמן את עצמו כשונה בכל כתיבה
+class StoredSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False, ttl=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.ttl = ttl
+        self.modified = False
+
+
+# ממשק סשנים של Flask מעל מאגר (SQLite או MySQL): העוגייה מחזיקה רק מזהה אקראי,
+# והנתונים נכתבים למאגר רק כשהסשן השתנה או כשחצי מזמן התוקף שלו עבר
+class StoreSessionInterface(SessionInterface):
+    def __init__(self, backend):
+        self.backend = backend
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and SID_PATTERN.match(sid):
+            stored = self.backend.load(sid)
+            if stored is not None:
+                blob, ttl = stored
+                # msgspec.DecodeError היא גם ValueError, ו-_ext_hook זורק ValueError על הרחבה עם ערך פגום
+                try:
+                    return StoredSession(decode_session(blob), sid=sid, ttl=ttl)
+                except ValueError:
+                    pass
+        return StoredSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if not session.new:
+                self.backend.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        expires = datetime.now(timezone.utc) + app.permanent_session_lifetime
+        cookie_expires = expires if app.config.get("SESSION_PERMANENT", True) else None
+        if session.modified or session.new:
+            self.backend.save(session.sid, encode_session(session), expires)
+        elif self._needs_refresh(app, session):
+            self.backend.touch(session.sid, expires)
+        else:
+            return
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=cookie_expires,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+    # סשן שלא השתנה מקבל הארכת תוקף לכל היותר פעם בחצי מזמן התוקף
+    def _needs_refresh(self, app, session):
+        return session.ttl is None or session.ttl < app.permanent_session_lifetime.total_seconds() / 2
+
+
+_backend = None
+
+
+# בונה את מאגר הסשנים לפי SESSION_BACKEND (mysql כברירת מחדל, או sqlite לשרת יחיד)
+def backend_from_env():
+    kind = os.getenv("SESSION_BACKEND", "mysql")
+    if kind == "mysql":
+        return MySQLSessionBackend()
+    if kind == "sqlite":
+        return SQLiteSessionBackend(
+            os.getenv("SESSION_SQLITE_DIR", "/flask_session_data"),
+            shards=int(os.getenv("SESSION_SQLITE_SHARDS", 8)),
+        )
+    raise ValueError(f"Unknown SESSION_BACKEND {kind}")
+
+
+# מחבר את מאגר הסשנים לאפליקציה. SESSION_BACKEND=filesystem משאיר את Flask-Session הקודם
+def init_app(app):
+    global _backend
+    if os.getenv("SESSION_BACKEND", "mysql") == "filesystem":
+        from flask_session import Session
+
+        app.config.setdefault("SESSION_TYPE", "filesystem")
+        app.config.setdefault("SESSION_FILE_DIR", os.getenv("SESSION_FILE_DIR", "/flask_session_data"))
+        Session(app)
+        return
+    _backend = backend_from_env()
+    app.session_interface = StoreSessionInterface(_backend)
+
+
+# מחזיר מדדי גודל וזמני תגובה של מאגר הסשנים הפעיל
+def session_stats():
+    if _backend is None:
+        return None
+    stats = _backend.stats.snapshot()
+    stats["backend"] = type(_backend).__name__
+    return stats
+
+
+# מוחק במנות את כל הסשנים שפג תוקפם (נקרא מתהליך התחזוקה)
+def purge_expired_sessions():
+    if os.getenv("SESSION_BACKEND", "mysql") == "filesystem":
+        return 0
+    return (_backend or backend_from_env()).purge_expired()
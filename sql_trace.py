@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_recorder = ContextVar("sql_recorder", default=None)
+
+
+# עוטף cursor ורושם כל פקודה שנשלחת דרכו (SQL ופרמטרים) לרשימה של המקליט הפעיל
+class RecordingCursor:
+    def __init__(self, cursor, statements):
+        self._cursor = cursor
+        self._statements = statements
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._statements.append((operation, params))
+        return self._cursor.execute(operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params):
+        seq_params = list(seq_params)
+        self._statements.append((operation, seq_params[0] if seq_params else None))
+        return self._cursor.executemany(operation, seq_params)
+
+
+# מחזיר את ה-cursor כמו שהוא, או עטוף למקליט אם יש מקליט פעיל בהקשר הנוכחי
+def wrap_cursor(cursor):
+    statements = _recorder.get()
+    if statements is None:
+        return cursor
+    return RecordingCursor(cursor, statements)
+
+
+# מקליט את כל פקודות ה-SQL שנשלחות דרך db_cursor בתוך הבלוק ומחזיר אותן כרשימת (SQL, פרמטרים)
+@contextmanager
+def record_statements():
+    statements = []
+    token = _recorder.set(statements)
+    try:
+        yield statements
+    finally:
+        _recorder.reset(token)
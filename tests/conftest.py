@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# בדיקות שמריצות שאילתות אמיתיות רצות רק מול מסד בדיקה שנבחר במפורש (FLYTAU_TEST_DB=1 ומשתני DB_*),
+# כי הן טוענות ומוחקות נתונים סינתטיים. המסד צריך להיטען מ-schema.sql
+@pytest.fixture(scope="session")
+def scratch_db():
+    if os.getenv("FLYTAU_TEST_DB") != "1":
+        pytest.skip("set FLYTAU_TEST_DB=1 and DB_* to run against a scratch database loaded from schema.sql")
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
@@ -0,0 +1,96 @@
+import time
+
+import pytest
+from flask import Flask
+
+from booking_token import BookingState, GuestDetails, OrderLookup, dump_token, load_token
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.secret_key = "test-secret"
+    with app.app_context():
+        yield app
+
+
+def make_state(**changes):
+    fields = {
+        "aircraft": "A1",
+        "dep_date": "2026-11-01",
+        "dep_time": "08:30:00",
+        "origin": "TLV",
+        "destination": "LHR",
+        "economy_price": "450.00",
+        "business_price": "1200.00",
+        "numecon": 2,
+        "numbusi": 1,
+        "chosenecon": ["12A", "12B"],
+        "chosenbusi": ["2C"],
+        "hold_token": "abc123",
+    }
+    fields.update(changes)
+    return BookingState(**fields)
+
+
+def test_round_trip(app):
+    state = make_state()
+    assert load_token(dump_token(state), BookingState) == state
+
+
+def test_round_trip_without_optional_fields(app):
+    state = BookingState("A1", "2026-11-01", "08:30:00", "TLV", "LHR", "450.00")
+    loaded = load_token(dump_token(state), BookingState)
+    assert loaded == state
+    assert loaded.business_price is None
+    assert loaded.chosenecon == []
+
+
+def test_token_is_url_safe(app):
+    token = dump_token(make_state())
+    assert all(c.isalnum() or c in "-_." for c in token)
+
+
+def test_missing_token(app):
+    assert load_token(None, BookingState) is None
+    assert load_token("", BookingState) is None
+
+
+def test_tampered_payload_is_rejected(app):
+    token = dump_token(make_state())
+    payload, rest = token.split(".", 1)
+    forged = dump_token(make_state(economy_price="1.00")).split(".", 1)[0]
+    assert load_token(f"{forged}.{rest}", BookingState) is None
+    flipped = payload[:-1] + ("A" if payload[-1] != "A" else "B")
+    assert load_token(f"{flipped}.{rest}", BookingState) is None
+
+
+def test_other_secret_is_rejected(app):
+    token = dump_token(make_state())
+    app.secret_key = "other-secret"
+    assert load_token(token, BookingState) is None
+
+
+def test_expired_token_is_rejected(app):
+    token = dump_token(make_state())
+    time.sleep(1.1)
+    assert load_token(token, BookingState, max_age=0) is None
+
+
+def test_token_of_another_kind_is_rejected(app):
+    class OtherState(BookingState):
+        pass
+
+    token = dump_token(OtherState(**{f: getattr(make_state(), f) for f in BookingState.__struct_fields__}))
+    assert load_token(token, BookingState) is None
+
+
+def test_guest_details_round_trip(app):
+    guest = GuestDetails("abc123", "Dana Levi", "P123", "1990-01-01", "dana@example.com", 2, ["0501111111"])
+    assert load_token(dump_token(guest), GuestDetails) == guest
+
+
+def test_tokens_are_not_interchangeable(app):
+    lookup = dump_token(OrderLookup(order_id=1, email="dana@example.com"))
+    assert load_token(lookup, GuestDetails) is None
+    assert load_token(dump_token(make_state()), OrderLookup) is None
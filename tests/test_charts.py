@@ -0,0 +1,60 @@
+import os
+import time
+
+import pytest
+from flask import Flask
+
+import charts
+from charts import chart_filename, chart_url, purge_stale_charts
+
+ROWS = [{"y": 2026, "m": 10, "cancel_rate": 2.5}]
+
+
+@pytest.fixture
+def app(tmp_path):
+    return Flask(__name__, static_folder=str(tmp_path))
+
+
+def make_file(path, age):
+    path.write_bytes(b"png")
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_purge_removes_only_old_files(tmp_path):
+    old = make_file(tmp_path / "cancel_rate-old.png", 3600)
+    recent = make_file(tmp_path / "cancel_rate-new.png", 10)
+    leftover = make_file(tmp_path / "cancel_rate-x.png.123.tmp", 3600)
+    other = make_file(tmp_path / "notes.txt", 3600)
+    assert purge_stale_charts(str(tmp_path), max_age=600) == 2
+    assert not old.exists() and not leftover.exists()
+    assert recent.exists() and other.exists()
+
+
+def test_missing_directory_is_fine(tmp_path):
+    assert purge_stale_charts(str(tmp_path / "missing"), max_age=0) == 0
+
+
+def test_showing_a_chart_keeps_it(app, tmp_path):
+    reports_dir = tmp_path / "reports"
+    reports_dir.mkdir()
+    path = make_file(reports_dir / chart_filename("cancel_rate", ROWS), 3600)
+    assert chart_url(app, "cancel_rate", ROWS) == f"/static/reports/{path.name}"
+    assert purge_stale_charts(str(reports_dir), max_age=600) == 0
+    assert path.exists()
+
+
+def test_missing_chart_is_rendered_in_the_background(app, tmp_path, monkeypatch):
+    submitted = []
+
+    class Executor:
+        def submit(self, *args):
+            submitted.append(args)
+
+    monkeypatch.setattr(charts, "get_executor", Executor)
+    assert chart_url(app, "cancel_rate", ROWS) is None
+    assert submitted[0][1] == "cancel_rate"
+    # כבר יש ציור בדרך (קובץ נעילה), לכן בקשה נוספת לא שולחת ציור שני
+    assert chart_url(app, "cancel_rate", ROWS) is None
+    assert len(submitted) == 1
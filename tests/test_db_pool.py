@@ -0,0 +1,122 @@
+import time
+
+import mysql.connector
+import pytest
+
+import db_pool
+
+
+# חיבור מדומה: מספיק ל-acquire/release בלי שרת MySQL
+class FakeConnection:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+        self.in_transaction = False
+        self.rollbacks = 0
+
+    def is_connected(self):
+        return self.connected
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    made = []
+
+    def connect(**kwargs):
+        conn = FakeConnection()
+        made.append(conn)
+        return conn
+
+    monkeypatch.setattr(db_pool.mysql.connector, "connect", connect)
+    return made
+
+
+def test_reuses_released_connection(connections):
+    pool = db_pool.ConnectionPool(size=2)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert len(connections) == 1
+    assert pool.stats()["created"] == 1
+
+
+def test_exhausted_pool_times_out(connections):
+    pool = db_pool.ConnectionPool(size=1, timeout=0.05)
+    pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(mysql.connector.errors.PoolError):
+        pool.acquire()
+    assert time.monotonic() - started >= 0.05
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["open"] == 1
+
+
+def test_waiter_gets_connection_released_by_another_thread(connections):
+    import threading
+
+    pool = db_pool.ConnectionPool(size=1, timeout=2)
+    conn = pool.acquire()
+    threading.Timer(0.05, pool.release, (conn,)).start()
+    assert pool.acquire() is conn
+    assert pool.stats()["waited"] == 1
+
+
+def test_recycles_connection_older_than_max_age(connections):
+    pool = db_pool.ConnectionPool(size=1, max_age=0)
+    old = pool.acquire()
+    pool.release(old)
+    time.sleep(0.01)
+    new = pool.acquire()
+    assert new is not old
+    assert old.closed
+    stats = pool.stats()
+    assert stats["recycled"] == 1
+    assert stats["open"] == 1
+
+
+def test_replaces_connection_that_fails_liveness_ping(connections):
+    pool = db_pool.ConnectionPool(size=1, ping_after=0)
+    old = pool.acquire()
+    pool.release(old)
+    old.connected = False
+    time.sleep(0.01)
+    new = pool.acquire()
+    assert new is not old
+    assert old.closed
+    assert pool.stats()["dead"] == 1
+
+
+def test_skips_ping_for_recently_used_connection(connections):
+    pool = db_pool.ConnectionPool(size=1, ping_after=60)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.connected = False
+    assert pool.acquire() is conn
+
+
+def test_release_rolls_back_open_transaction(connections):
+    pool = db_pool.ConnectionPool(size=1)
+    conn = pool.acquire()
+    conn.in_transaction = True
+    pool.release(conn)
+    assert conn.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_failed_connect_frees_the_slot(monkeypatch):
+    def connect(**kwargs):
+        raise mysql.connector.Error("down")
+
+    monkeypatch.setattr(db_pool.mysql.connector, "connect", connect)
+    pool = db_pool.ConnectionPool(size=1, timeout=0.05)
+    with pytest.raises(mysql.connector.Error):
+        pool.acquire()
+    assert pool.stats()["open"] == 0
@@ -0,0 +1,93 @@
+import re
+
+import pytest
+
+from booking_token import BookingState, GuestDetails, OrderLookup, dump_token, load_token
+
+
+@pytest.fixture(scope="module")
+def app():
+    mp = pytest.MonkeyPatch()
+    mp.setenv("SECRET_KEY", "test-secret")
+    try:
+        import main
+    finally:
+        mp.undo()
+    main.app.config.update(TESTING=True)
+    return main
+
+
+@pytest.fixture
+def client(app, monkeypatch):
+    monkeypatch.setattr(app, "mailexists", lambda email: False)
+    return app.app.test_client()
+
+
+def booking(app, **changes):
+    state = BookingState("A1", "2026-11-01", "08:30:00", "TLV", "LHR", "450.00", numecon=1,
+                         chosenecon=["12-1"], hold_token="hold-1")
+    for field, value in changes.items():
+        setattr(state, field, value)
+    with app.app.app_context():
+        return dump_token(state)
+
+
+def hidden(html, name):
+    return re.search(rf'name="{name}" value="([^"]*)"', html).group(1)
+
+
+GUEST_FORM = {"fullname": "Dana Levi", "email": "dana@example.com", "passport": "P123",
+              "dob": "1990-01-01", "phone_nums": "2"}
+
+
+def test_guest_details_travel_only_in_the_form(app, client):
+    response = client.post("/guest_details", data={"booking": booking(app), **GUEST_FORM})
+    assert response.status_code == 200
+    # שום דבר לא נכתב לסשן בצד השרת
+    assert "Set-Cookie" not in response.headers
+    html = response.get_data(as_text=True)
+    with app.app.app_context():
+        guest = load_token(hidden(html, "guest"), GuestDetails)
+    assert guest.email == "dana@example.com" and guest.hold_token == "hold-1"
+
+    response = client.post("/phoneguest", data={"booking": booking(app), "guest": hidden(html, "guest"),
+                                                 "phones": ["0501111111", "0502222222"]})
+    assert response.status_code == 200
+    assert "Set-Cookie" not in response.headers
+    html = response.get_data(as_text=True)
+    assert "Dana Levi" in html
+    with app.app.app_context():
+        guest = load_token(hidden(html, "guest"), GuestDetails)
+    assert guest.phones == ["0501111111", "0502222222"]
+
+
+def test_guest_token_of_another_booking_is_rejected(app, client):
+    response = client.post("/guest_details", data={"booking": booking(app), **GUEST_FORM})
+    token = hidden(response.get_data(as_text=True), "guest")
+    other = booking(app, hold_token="hold-2")
+    response = client.post("/phoneguest", data={"booking": other, "guest": token, "phones": ["0501111111"]})
+    assert response.status_code == 302
+    assert response.headers["Location"].startswith("/guest_details?booking=")
+    response = client.post("/submitorder", data={"booking": other, "guest": token})
+    assert response.headers["Location"].startswith("/guest_details?booking=")
+
+
+def test_submit_without_held_seats_goes_back_to_seat_choice(app, client):
+    response = client.post("/submitorder", data={"booking": booking(app, chosenecon=[])})
+    assert response.status_code == 302
+    assert response.headers["Location"].startswith("/search_order_flights/choosenumseat/chooseseats?booking=")
+
+
+def test_order_lookup_is_only_accepted_from_a_form(app, client):
+    assert client.get("/cancel_order").headers["Location"] == "/guestorder"
+    with app.app.app_context():
+        token = dump_token(OrderLookup(order_id=1, email="dana@example.com"))
+    assert client.get(f"/cancel_order?lookup={token}").headers["Location"] == "/guestorder"
+    assert client.post("/cancel_order", data={"lookup": token + "x"}).headers["Location"] == "/guestorder"
+
+
+def test_order_lookup_expires(app, monkeypatch, client):
+    monkeypatch.setattr(app, "ORDER_LOOKUP_TTL", -1)
+    with app.app.app_context():
+        token = dump_token(OrderLookup(order_id=1, email="dana@example.com"))
+    assert client.post("/cancel_order", data={"lookup": token}).headers["Location"] == "/guestorder"
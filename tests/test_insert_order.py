@@ -0,0 +1,23 @@
+import pytest
+
+import utils
+from utils import SeatHoldError, insert_order_and_tickets
+
+
+@pytest.fixture(autouse=True)
+def no_database(monkeypatch):
+    def db_cursor(*args, **kwargs):
+        raise AssertionError("must not reach the database")
+
+    monkeypatch.setattr(utils, "db_cursor", db_cursor)
+
+
+@pytest.mark.parametrize("econ, busi, hold_token", [
+    (["12-1"], [], None),
+    ([], [], "abc"),
+    (None, None, "abc"),
+])
+def test_order_requires_held_seats(econ, busi, hold_token):
+    with pytest.raises(SeatHoldError):
+        insert_order_and_tickets("a@b.com", "A1", "2026-11-01", "08:00:00", econ, busi, 100, None, 100,
+                                 hold_token=hold_token)
@@ -0,0 +1,68 @@
+import pytest
+
+from bench import dataset
+from bench.maintenance_scaling import measure
+from utils import rebuild_report_rollups, update_flights_status, update_orders_status_when_flight_completed
+
+AIRCRAFT = 40
+HISTORY = (20, 80)
+LANDED = (10, 40)
+LATE = 5
+RUNS = 3
+# מנות קטנות כדי שכל ריצה תעבור כמה טרנזקציות נפרדות
+BATCH = 10
+
+
+def flights_status(checkpoint):
+    update_flights_status()
+
+
+def orders_completed(checkpoint):
+    update_orders_status_when_flight_completed(batch_size=BATCH, checkpoint=checkpoint)
+
+
+# מודד את שני שלבי התחזוקה לכל גודל היסטוריה ולכל מספר טיסות שנחתו
+@pytest.fixture(scope="module")
+def results(scratch_db):
+    import db_pool
+
+    mp = pytest.MonkeyPatch()
+    mp.setenv("DB_POOL_SIZE", "1")
+    mp.setattr(db_pool, "_pool", None)
+    out = {}
+    try:
+        for size in HISTORY:
+            dataset.drop()
+            dataset.build(AIRCRAFT, size, orders_per_flight=2, seed=1)
+            for landed in LANDED:
+                out[size, landed] = {
+                    "flights": measure(flights_status, landed, LATE, RUNS),
+                    "orders": measure(orders_completed, landed, LATE, RUNS, prepare=update_flights_status),
+                }
+            rebuild_report_rollups()
+    finally:
+        dataset.drop()
+        mp.undo()
+    return out
+
+
+@pytest.mark.parametrize("step", ["flights", "orders"])
+def test_rows_read_do_not_grow_with_history(results, step):
+    small, large = HISTORY
+    for landed in LANDED:
+        assert results[large, landed][step]["rows_read_max"] <= 1.5 * results[small, landed][step]["rows_read_max"] + 200
+
+
+@pytest.mark.parametrize("step", ["flights", "orders"])
+def test_rows_read_grow_with_landed_flights(results, step):
+    few, many = LANDED
+    for size in HISTORY:
+        assert results[size, many][step]["rows_read_mean"] >= 2 * results[size, few][step]["rows_read_mean"]
+
+
+# כל מנה של ההזמנות היא טרנזקציה נפרדת בגודל קבוע, לכן הנעילה הארוכה ביותר לא תלויה בהיסטוריה
+# או במספר הטיסות שנחתו (הסף רחב כדי לא להיכשל על רעש תזמון)
+def test_batch_transaction_time_is_flat(results):
+    baseline = results[HISTORY[0], LANDED[0]]["orders"]["batch_ms_max"]
+    for key, step in results.items():
+        assert step["orders"]["batch_ms_max"] <= 3 * baseline + 20, key
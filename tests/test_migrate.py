@@ -0,0 +1,52 @@
+import pytest
+
+from migrate import MIGRATIONS_DIR, load_migrations, split_statements
+
+
+def test_splits_on_semicolon_at_end_of_line():
+    sql = """
+-- adds a column
+ALTER TABLE flight
+  ADD COLUMN Dep_TS DATETIME;
+
+CREATE INDEX flight_dep_ts ON flight (Dep_TS);
+"""
+    assert split_statements(sql) == [
+        "ALTER TABLE flight\n  ADD COLUMN Dep_TS DATETIME",
+        "CREATE INDEX flight_dep_ts ON flight (Dep_TS)",
+    ]
+
+
+def test_semicolon_inside_a_line_does_not_split():
+    sql = "INSERT INTO t (Note) VALUES ('a;b');\nSELECT 1;\n"
+    assert split_statements(sql) == ["INSERT INTO t (Note) VALUES ('a;b')", "SELECT 1"]
+
+
+def test_comments_inside_a_statement_are_kept():
+    sql = "CREATE TABLE t (\n  -- primary key\n  ID INT\n);\n"
+    assert split_statements(sql) == ["CREATE TABLE t (\n  -- primary key\n  ID INT\n)"]
+
+
+def test_trailing_statement_without_semicolon():
+    assert split_statements("SELECT 1;\nSELECT 2") == ["SELECT 1", "SELECT 2"]
+
+
+def test_only_comments():
+    assert split_statements("-- nothing here\n\n   \n") == []
+
+
+def test_repo_migrations_are_numbered_and_split():
+    migrations = load_migrations(MIGRATIONS_DIR)
+    versions = [version for version, _, _ in migrations]
+    assert versions == sorted(versions)
+    for _, _, path in migrations:
+        with open(path, encoding="utf-8") as f:
+            assert split_statements(f.read())
+
+
+def test_duplicate_versions_are_rejected(tmp_path):
+    (tmp_path / "0001_first.sql").write_text("SELECT 1;\n")
+    (tmp_path / "01_again.sql").write_text("SELECT 2;\n")
+    (tmp_path / "notes.txt").write_text("ignored")
+    with pytest.raises(ValueError):
+        load_migrations(str(tmp_path))
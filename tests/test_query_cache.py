@@ -0,0 +1,139 @@
+import time
+
+import pytest
+
+import query_cache
+from query_cache import QueryCache, cached, deferred_invalidation, invalidate_tables, invalidates
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setenv("QUERY_CACHE_ENABLED", "1")
+    monkeypatch.setattr(query_cache, "_cache", QueryCache(max_entries=16, default_ttl=60))
+    return query_cache._cache
+
+
+# פונקציית קריאה שסופרת קריאות למסד; מפתח המטמון כולל את שם הפונקציה, לכן לכל אחת שם משלה
+def counting(*tables):
+    calls = []
+
+    def read(key):
+        calls.append(key)
+        return [key, len(calls)]
+
+    read.__qualname__ = "read_" + "_".join(tables)
+    return cached(*tables)(read), calls
+
+
+def test_repeated_read_hits_the_cache():
+    read, calls = counting("flight")
+    assert read(1) == [1, 1]
+    assert read(1) == [1, 1]
+    assert calls == [1]
+
+
+def test_callers_get_copies():
+    read, _ = counting("flight")
+    read(1).append("changed")
+    assert read(1) == [1, 1]
+
+
+def test_writer_invalidates_only_its_tables():
+    read_flight, flight_calls = counting("flight")
+    read_route, route_calls = counting("route")
+
+    @invalidates("flight")
+    def write():
+        pass
+
+    read_flight(1)
+    read_route(1)
+    write()
+    read_flight(1)
+    read_route(1)
+    assert flight_calls == [1, 1]
+    assert route_calls == [1]
+
+
+def test_writer_invalidates_even_when_it_fails():
+    read, calls = counting("flight")
+
+    @invalidates("flight")
+    def write():
+        raise RuntimeError("boom")
+
+    read(1)
+    with pytest.raises(RuntimeError):
+        write()
+    read(1)
+    assert len(calls) == 2
+
+
+def test_invalidation_is_deferred_until_the_unit_of_work_ends():
+    read, calls = counting("flight")
+    read(1)
+    with deferred_invalidation():
+        invalidate_tables("flight")
+        # בתוך היחידה שכתבה לטבלה קוראים מהמסד ולא שומרים במטמון
+        read(1)
+        read(1)
+        assert len(calls) == 3
+    # המטמון עדיין היה תקף לקוראים אחרים עד סוף היחידה, ועכשיו נפסל
+    read(1)
+    read(1)
+    assert len(calls) == 4
+
+
+def test_nested_units_invalidate_once_at_the_outer_end():
+    seen = []
+    query_cache.on_invalidate(seen.append)
+    with deferred_invalidation():
+        with deferred_invalidation():
+            invalidate_tables("flight")
+        assert seen == []
+    assert seen == [("flight",)]
+
+
+def test_disabled_cache_always_calls_through(monkeypatch):
+    monkeypatch.setenv("QUERY_CACHE_ENABLED", "0")
+    read, calls = counting("flight")
+    read(1)
+    read(1)
+    assert calls == [1, 1]
+
+
+def test_unhashable_arguments_bypass_the_cache():
+    calls = []
+
+    @cached("flight")
+    def read(keys):
+        calls.append(keys)
+        return len(calls)
+
+    read([1, 2])
+    read([1, 2])
+    assert len(calls) == 2
+
+
+def test_lru_eviction_and_ttl():
+    cache = QueryCache(max_entries=2, default_ttl=60)
+    cache.set("a", 1, ("t",))
+    cache.set("b", 2, ("t",))
+    cache.get("a")
+    cache.set("c", 3, ("t",))
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    cache.set("d", 4, ("t",), ttl=0)
+    time.sleep(0.001)
+    assert cache.get("d") == (False, None)
+    stats = cache.stats()
+    assert stats["evictions"] == 2
+    assert stats["expirations"] == 1
+
+
+def test_invalidate_cleans_the_tag_index():
+    cache = QueryCache()
+    cache.set("a", 1, ("flight", "route"))
+    cache.invalidate("flight")
+    assert cache.get("a") == (False, None)
+    assert cache._tags == {}
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from bench import dataset
+from bench.common import load_context
+from bench.plan_check import DEFAULT_LIMITS, SCENARIOS, analyze_tables, check_scenario, check_statement
+
+AIRCRAFT = 60
+FLIGHTS_PER_AIRCRAFT = 40
+
+
+# cursor מדומה שמחזיר תוכנית EXPLAIN קבועה
+class PlanCursor:
+    def __init__(self, plan):
+        self.plan = plan
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def fetchone(self):
+        return (json.dumps(self.plan),)
+
+
+def nested_loop(*tables, **flags):
+    return {"query_block": {"ordering_operation": {**flags, "nested_loop": [{"table": t} for t in tables]}}}
+
+
+def test_indexed_lookup_passes():
+    cursor = PlanCursor(nested_loop({"table_name": "flight", "access_type": "ref", "key": "PRIMARY",
+                                     "rows_examined_per_scan": 3}))
+    _, flags, violations = check_statement(cursor, "SELECT 1 FROM flight", (), DEFAULT_LIMITS)
+    assert violations == [] and flags == []
+    assert cursor.executed[0][0] == "EXPLAIN FORMAT=JSON SELECT 1 FROM flight"
+
+
+def test_full_scan_and_filesort_are_reported():
+    cursor = PlanCursor(nested_loop(
+        {"table_name": "tickets", "access_type": "ALL", "rows_examined_per_scan": 10},
+        {"table_name": "route", "access_type": "ALL", "rows_examined_per_scan": 10},
+        using_filesort=True,
+    ))
+    _, flags, violations = check_statement(cursor, "SELECT 1", (), DEFAULT_LIMITS)
+    assert flags == ["filesort"]
+    assert violations == ["full scan of tickets (ALL)", "uses filesort"]
+
+
+def test_exemptions():
+    cursor = PlanCursor(nested_loop(
+        {"table_name": "report_order_daily", "access_type": "index", "rows_examined_per_scan": 5000},
+        {"table_name": "report_crew_daily", "access_type": "range", "key": "PRIMARY", "rows_examined_per_scan": 5000},
+        using_filesort=True,
+    ))
+    limits = dict(DEFAULT_LIMITS, max_rows=None, filesort=True, scans={"report_order_daily"})
+    assert check_statement(cursor, "SELECT 1", (), limits)[2] == []
+    violations = check_statement(cursor, "SELECT 1", (), DEFAULT_LIMITS)[2]
+    assert violations == [
+        "full scan of report_order_daily (index)",
+        "report_crew_daily examines 5000 rows per scan via PRIMARY",
+        "uses filesort",
+    ]
+
+
+# נתונים סינתטיים קטנים מספיק כדי שסריקה מלאה של טבלת היסטוריה תופיע בתוכנית
+@pytest.fixture(scope="module")
+def plan_context(scratch_db):
+    mp = pytest.MonkeyPatch()
+    # כל שאילתה צריכה להגיע למסד כדי שנוכל להקליט אותה
+    mp.setenv("QUERY_CACHE_ENABLED", "0")
+    try:
+        dataset.drop()
+        dataset.build(AIRCRAFT, FLIGHTS_PER_AIRCRAFT, seed=1)
+        analyze_tables()
+        yield load_context()
+    finally:
+        dataset.drop()
+        mp.undo()
+
+
+@pytest.mark.parametrize("func, overrides", [s[1:] for s in SCENARIOS], ids=[s[0] for s in SCENARIOS])
+def test_scenario_plans(plan_context, func, overrides):
+    checked = check_scenario(plan_context, func, overrides)
+    violations = [f"{v}: {s['sql']}" for s in checked for v in s["violations"]]
+    assert violations == []
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+from rostering import AIRBORNE, CrewMember, Roster, RosterFlight
+
+DAY = datetime(2026, 11, 1)
+
+
+def flight(name, dep_hour, hours, origin="TLV", dest="LHR"):
+    dep = DAY + timedelta(hours=dep_hour)
+    return RosterFlight((name, DAY.date(), dep.time()), dep, dep + timedelta(hours=hours), origin, dest, hours, "Small")
+
+
+def crew(pilots, attendants=6):
+    members = [
+        CrewMember(f"P{i}", "Pilot", trained, load, "TLV", DAY - timedelta(days=1))
+        for i, (trained, load) in enumerate(pilots, 1)
+    ]
+    members += [
+        CrewMember(f"F{i}", "Flight_Attendant", True, i, "TLV", DAY - timedelta(days=1))
+        for i in range(1, attendants + 1)
+    ]
+    return members
+
+
+def team(roster, name, role="Pilot"):
+    return sorted(emp_id for f, emp_id, r in roster.assignments() if f.key[0] == name and r == role)
+
+
+def test_least_loaded_crew_is_chosen():
+    roster = Roster(crew([(True, 5), (True, 1), (True, 3)]))
+    staffed, unstaffed = roster.run([flight("G", 8, 2)])
+    assert len(staffed) == 1 and not unstaffed
+    assert team(roster, "G") == ["P2", "P3"]
+    assert team(roster, "G", "Flight_Attendant") == ["F1", "F2", "F3"]
+    assert roster.repairs == 0
+
+
+def test_repair_moves_trained_pilots_to_the_long_flight():
+    # הטיסה הקצרה לוקחת את שני הטייסים המוכשרים (הכי מעט שעות), והטיסה הארוכה שאחריה
+    # מקבלת אותם בתיקון כשהטייסים הלא מוכשרים מחליפים אותם בטיסה הקצרה
+    roster = Roster(crew([(True, 0), (True, 1), (False, 5), (False, 6)]))
+    staffed, unstaffed = roster.run([flight("G", 8, 2), flight("F", 9, 7)])
+    assert not unstaffed and len(staffed) == 2
+    assert roster.repairs == 2
+    assert team(roster, "G") == ["P3", "P4"]
+    assert team(roster, "F") == ["P1", "P2"]
+    loads = {m.id: m.load for m in roster.crew.values()}
+    assert loads["P1"] == 0 + 7 and loads["P2"] == 1 + 7
+    assert loads["P3"] == 5 + 2 and loads["P4"] == 6 + 2
+
+
+def test_flight_without_repair_is_released():
+    roster = Roster(crew([(True, 0), (True, 1)]))
+    staffed, unstaffed = roster.run([flight("G", 8, 2), flight("F", 9, 7)])
+    assert [f.key[0] for f in staffed] == ["G"]
+    assert [f.key[0] for f in unstaffed] == ["F"]
+    assert roster.repairs == 0
+    assert team(roster, "F", "Flight_Attendant") == []
+    # הדיילים ששובצו זמנית לטיסה שנכשלה חוזרים לעומס ולמיקום הקודמים
+    for member in roster.crew.values():
+        if member.id in ("F4", "F5", "F6"):
+            assert member.load == int(member.id[1:])
+            assert member.location == "TLV"
+
+
+def test_existing_assignment_blocks_a_conflicting_flight():
+    members = crew([(True, 0), (True, 1), (True, 2)])
+    # ל-P1 כבר יש במסד טיסה מ-TLV ב-12:00, לכן אסור לשלוח אותו ל-LHR ב-08:00
+    legs = [("P1", DAY + timedelta(hours=12), DAY + timedelta(hours=14), "TLV", "ATH")]
+    roster = Roster(members, legs)
+    roster.run([flight("G", 8, 2)])
+    assert team(roster, "G") == ["P2", "P3"]
+    assert roster.crew["P1"].load == 2
+
+
+def test_crew_landing_later_is_not_available_before():
+    members = crew([(True, 0), (True, 1), (True, 2), (True, 3)])
+    members[0].location = AIRBORNE
+    members[0].since = None
+    legs = [("P1", DAY, DAY + timedelta(hours=9), "ATH", "TLV")]
+    roster = Roster(members, legs)
+    roster.run([flight("G", 8, 2), flight("H", 10, 2)])
+    assert team(roster, "G") == ["P2", "P3"]
+    assert team(roster, "H") == ["P1", "P4"]
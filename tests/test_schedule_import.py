@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from schedule_import import find_location_gaps, find_overlaps
+
+
+def at(hour):
+    return datetime(2026, 11, 1, hour)
+
+
+def test_rows_overlapping_each_other():
+    intervals = {("aircraft_location", "A1"): [(at(8), at(12), 1, "TLV", "LHR"), (at(10), at(14), 2, "LHR", "TLV")]}
+    errors = {}
+    find_overlaps(intervals, errors)
+    assert errors == {2: ["aircraft A1 overlaps row 1"]}
+
+
+def test_row_overlapping_an_existing_flight():
+    intervals = {
+        ("crew_location", 7): [(at(9), at(11), 3, "TLV", "ATH"), (at(8), at(12), None, "TLV", "LHR")],
+    }
+    errors = {}
+    find_overlaps(intervals, errors)
+    assert errors == {3: ["employee 7 overlaps an existing flight"]}
+
+
+def test_long_flight_overlaps_every_later_row():
+    intervals = {
+        ("aircraft_location", "A1"): [
+            (at(1), at(20), None, "TLV", "JFK"),
+            (at(5), at(6), 1, "TLV", "ATH"),
+            (at(10), at(11), 2, "ATH", "TLV"),
+        ],
+    }
+    errors = {}
+    find_overlaps(intervals, errors)
+    assert set(errors) == {1, 2}
+
+
+def test_existing_flights_are_not_reported_and_touching_spans_do_not_overlap():
+    intervals = {
+        ("aircraft_location", "A1"): [
+            (at(8), at(12), None, "TLV", "LHR"),
+            (at(9), at(13), None, "TLV", "LHR"),
+            (at(13), at(15), 1, "LHR", "TLV"),
+        ],
+    }
+    errors = {}
+    find_overlaps(intervals, errors)
+    assert errors == {}
+
+
+def test_row_must_depart_from_the_last_landing():
+    intervals = {
+        ("aircraft_location", "A1"): [
+            (at(8), at(10), None, "TLV", "LHR"),
+            (at(12), at(14), 1, "TLV", "ATH"),
+            (at(16), at(18), 2, "ATH", "TLV"),
+        ],
+    }
+    errors = {}
+    find_location_gaps(intervals, errors)
+    assert errors == {1: ["aircraft A1 is at LHR after an existing flight, not at TLV"]}
+
+
+def test_gap_after_an_earlier_row_and_first_departure_is_free():
+    intervals = {
+        ("crew_location", 7): [
+            (at(12), at(14), 2, "LHR", "ATH"),
+            (at(6), at(8), 1, "TLV", "JFK"),
+        ],
+    }
+    errors = {}
+    find_location_gaps(intervals, errors)
+    assert errors == {2: ["employee 7 is at JFK after row 1, not at LHR"]}
@@ -0,0 +1,70 @@
+from seatmap import CABIN_BUSINESS, CABIN_ECONOMY, SeatOccupancy
+
+
+def test_economy_rows_follow_business():
+    seats = SeatOccupancy((10, 6), (3, 4))
+    assert (seats.business_rows, seats.business_cols) == (3, 4)
+    assert seats.economy_start_row == 4
+    assert seats.economy_end_row == 13
+    assert seats.economy_cols == 6
+    assert seats.capacity(CABIN_BUSINESS) == 12
+    assert seats.capacity(CABIN_ECONOMY) == 60
+
+
+def test_small_aircraft_has_no_business_cabin():
+    seats = SeatOccupancy((5, 4))
+    assert seats.capacity(CABIN_BUSINESS) == 0
+    assert seats.economy_start_row == 1
+    seats.occupy(1, 1)
+    assert seats.taken(CABIN_ECONOMY) == 1
+    assert seats.taken(CABIN_BUSINESS) == 0
+
+
+def test_occupy_sets_only_that_seat():
+    seats = SeatOccupancy((10, 6), (3, 4))
+    seats.occupy(2, 3)
+    seats.occupy("4", "6")
+    assert seats.is_taken(2, 3)
+    assert seats.is_taken(4, 6)
+    assert not seats.is_taken(2, 4)
+    assert not seats.is_taken(3, 3)
+    assert not seats.is_taken(5, 6)
+    assert seats.taken(CABIN_BUSINESS) == 1
+    assert seats.free(CABIN_ECONOMY) == 59
+
+
+def test_occupy_is_idempotent():
+    seats = SeatOccupancy((10, 6), (3, 4))
+    seats.occupy(5, 2)
+    seats.occupy(5, 2)
+    assert seats.taken(CABIN_ECONOMY) == 1
+
+
+def test_seats_outside_the_map_are_ignored():
+    seats = SeatOccupancy((10, 6), (3, 4))
+    # עמודה 5 קיימת רק ב-Economy, ושורה 14 אחרי סוף המטוס
+    for row, col in ((1, 5), (14, 1), (0, 1), (4, 0), (4, 7)):
+        seats.occupy(row, col)
+        assert not seats.is_taken(row, col)
+    assert seats.taken(CABIN_BUSINESS) == 0
+    assert seats.taken(CABIN_ECONOMY) == 0
+
+
+def test_full_cabin():
+    seats = SeatOccupancy((10, 6), (3, 4))
+    for row in range(1, 4):
+        for col in range(1, 5):
+            seats.occupy(row, col)
+    assert seats.free(CABIN_BUSINESS) == 0
+    assert seats.free(CABIN_ECONOMY) == 60
+
+
+def test_copy_is_independent():
+    seats = SeatOccupancy((10, 6), (3, 4))
+    seats.occupy(1, 1)
+    clone = seats.copy()
+    clone.occupy(4, 1)
+    assert clone.is_taken(1, 1)
+    assert clone.is_taken(4, 1)
+    assert not seats.is_taken(4, 1)
+    assert clone.economy_start_row == seats.economy_start_row
@@ -0,0 +1,112 @@
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+import threading
+
+import msgspec
+import pytest
+from flask import Flask
+
+from session_store import (
+    EXT_DATE,
+    SQLiteSessionBackend,
+    StoreSessionInterface,
+    decode_session,
+    encode_session,
+)
+
+SID = "a" * 43
+
+
+def test_round_trip_keeps_types():
+    data = {
+        "user": "a@b.com",
+        "count": 3,
+        "flags": [True, None],
+        "day": date(2026, 11, 1),
+        "at": datetime(2026, 11, 1, 8, 30, 15, 120),
+        "aware": datetime(2026, 11, 1, 8, 30, tzinfo=timezone.utc),
+        "hour": time(8, 30),
+        "duration": timedelta(hours=5, microseconds=7),
+        "negative": timedelta(minutes=-90),
+        "price": Decimal("450.10"),
+        "nested": {"seats": [{"row": 12, "price": Decimal("0.00")}]},
+    }
+    assert decode_session(encode_session(data)) == data
+    decoded = decode_session(encode_session(data))
+    assert type(decoded["day"]) is date
+    assert type(decoded["at"]) is datetime
+    assert str(decoded["price"]) == "450.10"
+
+
+def test_tuples_come_back_as_lists():
+    assert decode_session(encode_session({"key": ("A1", 2)})) == {"key": ["A1", 2]}
+
+
+def test_unknown_extension_is_kept_as_is():
+    blob = msgspec.msgpack.encode({"x": msgspec.msgpack.Ext(42, b"raw")})
+    assert decode_session(blob) == {"x": msgspec.msgpack.Ext(42, b"raw")}
+
+
+def test_corrupt_blob_raises_decode_error():
+    with pytest.raises(msgspec.DecodeError):
+        decode_session(b"\xc1")
+
+
+class OneSessionBackend:
+    def __init__(self, blob):
+        self.blob = blob
+
+    def load(self, sid):
+        return (self.blob, 600) if sid == SID else None
+
+
+@pytest.mark.parametrize("blob", [
+    b"\xc1",
+    msgspec.msgpack.encode({"day": msgspec.msgpack.Ext(EXT_DATE, b"not-a-date")}),
+    msgspec.msgpack.encode({"day": msgspec.msgpack.Ext(EXT_DATE, b"\xff")}),
+])
+def test_unreadable_session_starts_a_new_one(blob):
+    app = Flask(__name__)
+    interface = StoreSessionInterface(OneSessionBackend(blob))
+    with app.test_request_context(headers={"Cookie": f"session={SID}"}) as ctx:
+        session = interface.open_session(app, ctx.request)
+    assert session.new
+    assert session.sid != SID
+
+
+def test_readable_session_is_loaded():
+    app = Flask(__name__)
+    interface = StoreSessionInterface(OneSessionBackend(encode_session({"mail": "a@b.com"})))
+    with app.test_request_context(headers={"Cookie": f"session={SID}"}) as ctx:
+        session = interface.open_session(app, ctx.request)
+    assert not session.new
+    assert dict(session) == {"mail": "a@b.com"}
+
+
+def test_sqlite_backend_round_trip_and_purge(tmp_path):
+    backend = SQLiteSessionBackend(str(tmp_path), shards=2)
+    now = datetime.now(timezone.utc)
+    backend.save(SID, b"data", now + timedelta(minutes=5))
+    backend.save("b" * 43, b"old", now - timedelta(seconds=1))
+    blob, ttl = backend.load(SID)
+    assert blob == b"data" and 0 < ttl <= 300
+    assert backend.load("b" * 43) is None
+    assert backend.purge_expired() == 1
+    assert backend.stats.snapshot()["purged"] == 1
+
+
+def test_concurrent_saves_are_all_counted(tmp_path):
+    backend = SQLiteSessionBackend(str(tmp_path), shards=2, purge_every=10**9)
+    expires = datetime.now(timezone.utc) + timedelta(minutes=5)
+
+    def save(n):
+        for i in range(50):
+            backend.save(f"{n:02d}{i:041d}", b"x", expires)
+
+    threads = [threading.Thread(target=save, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend._saves == 200
@@ -1,13 +1,15 @@
 import os
 from contextlib import contextmanager
+from contextvars import ContextVar
 import mysql.connector
+from db_pool import get_pool, request_connection, PooledConnection, pool_stats
+from query_cache import cached, invalidates, cache_stats, deferred_invalidation, on_invalidate
+from reference_data import ReferenceRegistry, registry_max_age
+from seatmap import SeatOccupancy
+from sql_trace import wrap_cursor
 from dotenv import load_dotenv
 from datetime import datetime, timedelta, date, time
 from decimal import Decimal, ROUND_HALF_UP
-import matplotlib
-
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
 
 load_dotenv()
 
@@ -22,6 +24,105 @@ ORDER_STATUS_COMPLETED = "Completed"
 ORDER_STATUS_CUSTOMER_CANCELED = "Customer_Canceled"
 ORDER_STATUS_SYSTEM_CANCELED = "System_Canceled"
 
+# ====== SEAT CLASSES ======
+# מושבי Business הם השורות הראשונות במטוס, ואחריהן שורות ה-Economy
+# (ביטוי SQL לכרטיס t, בצירוף aircraft_class b של מחלקת Business)
+TICKET_CLASS_SQL = "CASE WHEN t.Chosen_Row_Num <= COALESCE(b.Row_Num, 0) THEN 'Business' ELSE 'Economy' END"
+TICKET_CLASS_JOIN = "LEFT JOIN aircraft_class b ON b.Air_Craft_ID = t.Air_Craft_ID AND b.Class = 'Business'"
+
+# ====== SEAT HOLDS ======
+# כמה שניות מושב שנבחר נשמר למשתמש לפני שהוא משתחרר אוטומטית
+SEAT_HOLD_TTL = int(os.getenv("SEAT_HOLD_TTL", 600))
+SEAT_HOLD_PURGE_BATCH = 5000
+MYSQL_ERR_DEADLOCK = 1213
+
+# ====== CREW RULES ======
+# טיסה ארוכה מ-6 שעות דורשת צוות עם הכשרה לטיסות ארוכות
+LONG_FLIGHT_HOURS = 6.0
+
+
+# שגיאה כשמושבים שנבחרו כבר לא שמורים למשתמש (נתפסו או שפג תוקף השמירה)
+class SeatHoldError(ValueError):
+    def __init__(self, message, seats=()):
+        super().__init__(message)
+        self.seats = list(seats)
+
+
+# ====== ORDER HISTORY ======
+CUSTORDERS_PAGE_SIZE = 20
+CUSTORDER_FIELDS = ("Order_ID", "Email", "Order_Date", "Order_status", "Total_Paid", "First_Dep")
+CUSTORDER_TICKET_FIELDS = (
+    "Order_ID", "Air_Craft_ID", "Dep_Date", "Dep_Hour", "Chosen_Row_Num", "Chosen_Col_Num", "Price_Paid",
+    "Flight_Status", "Arrival_Date", "Arrival_Time", "Origin", "Destination",
+)
+
+# ====== MAINTENANCE WATERMARKS (maintenance_state.Name) ======
+WATERMARK_FLIGHTS_LANDED = "flights_landed"
+
+# מספר הטיסות (אירועי השלמה) שההזמנות שלהן מסומנות כהושלמו בכל טרנזקציה
+ORDER_COMPLETION_BATCH = 200
+# כמה טיסות שנחתו לפני סימן המים ועדיין לא הושלמו נאספות בכל ריצה של update_flights_status
+FLIGHT_CATCHUP_BATCH = 1000
+
+# סיכומי דוחות יומיים של טיסות: {where} הוא פסוקית WHERE על טיסות (f) ו-{sign} הוא 1 או -1, כך שאותה שאילתה
+# מוסיפה או מחסירה קבוצת טיסות מהסיכום. בסיכום הסטטוסים {status} הוא f.Status או %s לסטטוס שמועבר כפרמטר
+REPORT_FLIGHT_ROLLUP_SQL = """
+    INSERT INTO report_flight_daily (Day, Status, Flights)
+    SELECT f.Dep_Date, {status}, {sign} * COUNT(*)
+    FROM flight f
+    {where}
+    GROUP BY f.Dep_Date, f.Status
+    ON DUPLICATE KEY UPDATE Flights = Flights + VALUES(Flights)
+"""
+REPORT_ROUTE_ROLLUP_SQL = """
+    INSERT INTO report_route_daily (Day, Route_ID, Completed_Flights, Tickets_Sold, Revenue, Hours)
+    SELECT f.Dep_Date, f.Route_ID,
+           {sign} * COUNT(DISTINCT f.Air_Craft_ID, f.Dep_Hour),
+           {sign} * COUNT(t.Order_ID),
+           {sign} * COALESCE(SUM(t.Price_Paid), 0),
+           {sign} * COUNT(DISTINCT f.Air_Craft_ID, f.Dep_Hour) * MAX(r.Duration)
+    FROM flight f
+    JOIN route r ON r.Route_ID = f.Route_ID
+    LEFT JOIN tickets t
+      ON t.Air_Craft_ID = f.Air_Craft_ID
+     AND t.Dep_Date     = f.Dep_Date
+     AND t.Dep_Hour     = f.Dep_Hour
+    {where}
+    GROUP BY f.Dep_Date, f.Route_ID
+    ON DUPLICATE KEY UPDATE
+        Completed_Flights = Completed_Flights + VALUES(Completed_Flights),
+        Tickets_Sold      = Tickets_Sold + VALUES(Tickets_Sold),
+        Revenue           = Revenue + VALUES(Revenue),
+        Hours             = Hours + VALUES(Hours)
+"""
+REPORT_CREW_ROLLUP_SQL = f"""
+    INSERT INTO report_crew_daily (Day, ID, Flights, Long_Hours, Short_Hours)
+    SELECT f.Dep_Date, fc.ID, {{sign}} * COUNT(*),
+           {{sign}} * SUM(CASE WHEN r.Duration > {LONG_FLIGHT_HOURS} THEN r.Duration ELSE 0 END),
+           {{sign}} * SUM(CASE WHEN r.Duration <= {LONG_FLIGHT_HOURS} THEN r.Duration ELSE 0 END)
+    FROM flight f
+    JOIN flight_crew fc
+      ON fc.Air_Craft_ID = f.Air_Craft_ID
+     AND fc.Dep_Date     = f.Dep_Date
+     AND fc.Dep_Hour     = f.Dep_Hour
+    JOIN route r ON r.Route_ID = f.Route_ID
+    {{where}}
+    GROUP BY f.Dep_Date, fc.ID
+    ON DUPLICATE KEY UPDATE
+        Flights     = Flights + VALUES(Flights),
+        Long_Hours  = Long_Hours + VALUES(Long_Hours),
+        Short_Hours = Short_Hours + VALUES(Short_Hours)
+"""
+# סיכום ההזמנות היומי לבנייה מחדש: {where} הוא תנאי על הזמנות (o)
+REPORT_ORDER_ROLLUP_SQL = """
+    INSERT INTO report_order_daily (Day, Order_status, Orders)
+    SELECT o.Order_Date, o.Order_status, COUNT(*)
+    FROM flight_order o
+    WHERE {where}
+    GROUP BY o.Order_Date, o.Order_status
+"""
+REPORT_FLIGHT_TABLES = ("report_flight_daily", "report_route_daily", "report_crew_daily")
+
 
 def normalize_flight_status(s: str) -> str:
     """
@@ -48,31 +149,86 @@ def normalize_flight_status(s: str) -> str:
     return mapping.get(low, FLIGHT_STATUS_SCHEDULED)
 
 
+# מחזיר חיבור למסד מתוך מאגר החיבורים; סגירת החיבור מחזירה אותו למאגר
 def get_db():
-    return mysql.connector.connect(
-        host=os.getenv("DB_HOST"),
-        port=int(os.getenv("DB_PORT", 3306)),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        database=os.getenv("DB_NAME"),
-        autocommit=True,
-        connection_timeout=5,
-    )
+    return PooledConnection(get_pool(), get_pool().acquire())
+
+
+# החיבור של יחידת העבודה הפעילה (אם יש) בהקשר הנוכחי
+_uow_connection = ContextVar("uow_connection", default=None)
+
+
+# יחידת עבודה: כל הכתיבות בתוכה (כולל פונקציות עזר שנקראות מתוכה) רצות על חיבור אחד
+# בטרנזקציה אחת, שנשמרת פעם אחת בסוף או מבוטלת כולה בשגיאה. יחידה מקוננת מצטרפת לחיצונית
+@contextmanager
+def unit_of_work():
+    if _uow_connection.get() is not None:
+        yield
+        return
+    db = request_connection()
+    pooled = db is None
+    if pooled:
+        db = get_db()
+    owns_txn = not db.in_transaction
+    if owns_txn:
+        db.start_transaction()
+    token = _uow_connection.set(db)
+    try:
+        # פסילות המטמון של הכתיבות ביחידה מתבצעות רק אחרי ה-COMMIT (או ה-ROLLBACK)
+        with deferred_invalidation():
+            try:
+                yield
+                if owns_txn:
+                    db.commit()
+            except Exception:
+                if owns_txn:
+                    db.rollback()
+                raise
+    finally:
+        _uow_connection.reset(token)
+        if pooled:
+            db.close()
 
 
 # מנהל הקשר שמספק מצביע למסד נתונים ומבצע שמירה וסגירה אוטומטית של החיבור
+# בתוך בקשת Flask משתמשים בחיבור אחד לכל הבקשה, שמוחזר למאגר בסיומה
+# transaction=True מריץ את כל הפקודות ביחידת עבודה אחת (ראו unit_of_work)
 @contextmanager
-def db_cursor(dictionary: bool = False):
-    db = get_db()
-    cur = db.cursor(dictionary=dictionary)
+def db_cursor(dictionary: bool = False, transaction: bool = False):
+    if transaction:
+        with unit_of_work():
+            with db_cursor(dictionary=dictionary) as cur:
+                yield cur
+        return
+    db = _uow_connection.get() or request_connection()
+    pooled = db is None
+    if pooled:
+        db = get_db()
+    cur = wrap_cursor(db.cursor(dictionary=dictionary))
     try:
         yield cur
-        db.commit()
     finally:
         try:
             cur.close()
         finally:
-            db.close()
+            if pooled:
+                db.close()
+
+
+# טוען את טבלאות הייחוס (נתיבים, מטוסים ותצורת מחלקות) עבור מאגר הייחוס בזיכרון
+def load_reference_rows():
+    with db_cursor() as cursor:
+        cursor.execute("SELECT Route_ID, Origin, Destination, Duration FROM route ORDER BY Route_ID")
+        routes = cursor.fetchall()
+        cursor.execute("SELECT Air_Craft_ID, Manufacturer, Size FROM air_craft")
+        aircraft = cursor.fetchall()
+        cursor.execute("SELECT Air_Craft_ID, Class, Row_Num, Col_Num FROM aircraft_class")
+        layouts = cursor.fetchall()
+    return routes, aircraft, layouts
+
+
+reference_registry = ReferenceRegistry(load_reference_rows, max_age=registry_max_age())
+on_invalidate(reference_registry.invalidate)
 
 
 # time to timedelta
@@ -94,8 +250,9 @@ def mysql_time_to_time(t):
 
 
 # יוצר משתמש חדש ומוסיף את המידע שלו לטבלאות הלקוח והטלפונים
+@invalidates("customer", "registered_customer", "phone_numbers")
 def new_user(fullname, email, password, passport, dob, signup_date, phones):
-    with db_cursor() as cursor:
+    with db_cursor(transaction=True) as cursor:
         cursor.execute(
             "INSERT INTO customer(Email, Full_Name_Eng) VALUES (%s, %s)",
             (email, fullname),
@@ -105,19 +262,18 @@ def new_user(fullname, email, password, passport, dob, signup_date, phones):
             "VALUES (%s, %s, %s, %s, %s)",
             (email, passport, dob, signup_date, password),
         )
-        for phone in phones:
-            cursor.execute(
+        if phones:
+            cursor.executemany(
                 "INSERT INTO phone_numbers(Cust_Email, Phone_num) VALUES(%s, %s)",
-                (email, phone),
+                [(email, phone) for phone in phones],
             )
 
 
 # בודק אם כתובת מייל כבר קיימת במסד
 def mailexists(mail):
     with db_cursor() as cursor:
-        cursor.execute("SELECT Email FROM customer")
-        allmails = [row[0] for row in cursor.fetchall()]
-        return str(mail) in allmails
+        cursor.execute("SELECT 1 FROM customer WHERE Email = %s", (str(mail),))
+        return cursor.fetchone() is not None
 
 
 # בודק אם לקוח עם מייל וסיסמה קיימים במסד
@@ -165,6 +321,7 @@ def is_hebrew_name(name):
 
 
 # מחזיר את כל הטיסות עם אפשרות לסינון לפי תאריך, מקור, יעד או סטטוס
+@cached("flight", "route", "flight_inventory")
 def get_allflights_filtered(date=None, origin=None, destination=None, status=None):
     query = """
         SELECT
@@ -177,15 +334,22 @@ def get_allflights_filtered(date=None, origin=None, destination=None, status=Non
             f.Arrival_Time,
             f.Economy_Price,
             f.Business_Price,
-            f.Status
+            f.Status,
+            (
+                SELECT SUM(i.Capacity - i.Sold)
+                FROM flight_inventory i
+                WHERE i.Air_Craft_ID = f.Air_Craft_ID
+                  AND i.Dep_Date = f.Dep_Date
+                  AND i.Dep_Hour = f.Dep_Hour
+            ) AS Seats_Left
         FROM flight f
         JOIN route r ON f.Route_ID = r.Route_ID
         WHERE 1=1
     """
     params = []
     if date:
-        query += " AND f.Dep_Date = %s"
-        params.append(date)
+        query += " AND f.Dep_TS >= %s AND f.Dep_TS < DATE_ADD(%s, INTERVAL 1 DAY)"
+        params += [date, date]
     if origin:
         query += " AND r.Origin LIKE %s"
         params.append(f"%{origin}%")
@@ -195,7 +359,7 @@ def get_allflights_filtered(date=None, origin=None, destination=None, status=Non
     if status:
         query += " AND f.Status = %s"
         params.append(normalize_flight_status(status))
-    query += " ORDER BY TIMESTAMP(f.Dep_Date, f.Dep_Hour) ASC"
+    query += " ORDER BY f.Dep_TS ASC"
 
     with db_cursor() as cursor:
         cursor.execute(query, tuple(params))
@@ -203,8 +367,9 @@ def get_allflights_filtered(date=None, origin=None, destination=None, status=Non
 
 
 # הוספת עובדים למערכת
+@invalidates("employee", "pilot", "flight_attendent", "address")
 def add_employee(id, fullname, phone, startdate, role, istrained, city, street, housenum):
-    with db_cursor() as cursor:
+    with db_cursor(transaction=True) as cursor:
         cursor.execute("SELECT 1 FROM employee WHERE ID = %s", (id,))
         if cursor.fetchone():
             return False
@@ -239,9 +404,7 @@ def add_employee(id, fullname, phone, startdate, role, istrained, city, street,
 
 # בודק אם מטוס עם מזהה נתון קיים במסד
 def check_aircraft(id):
-    with db_cursor() as cursor:
-        cursor.execute("SELECT 1 FROM air_craft WHERE Air_Craft_ID = %s LIMIT 1", (id,))
-        return cursor.fetchone() is not None
+    return reference_registry.lookup(lambda data: data.aircraft.get(id)) is not None
 
 
 # בודק אם מספר שורות וטורים תקינים במסגרת המקסימום
@@ -261,35 +424,30 @@ def validate_seats(rows, cols, max_rows, max_cols):
 
 
 # הוספת מטוס לבסיס הנתונים
+@invalidates("air_craft", "aircraft_class")
 def add_aircraft(aircraft, econrow, econcol, buiscol=None, buisrow=None):
-    with db_cursor() as cursor:
+    classes = [(aircraft[0], "Economy", econrow, econcol)]
+    if buiscol is not None:
+        classes.append((aircraft[0], "Business", buisrow, buiscol))
+    with db_cursor(transaction=True) as cursor:
         cursor.execute(
             "INSERT INTO air_craft (Air_Craft_ID, Purchase_Date, Manufacturer, Size) VALUES(%s, %s, %s, %s)",
             (aircraft[0], aircraft[2], aircraft[1], aircraft[3]),
         )
-        cursor.execute(
+        cursor.executemany(
             "INSERT INTO aircraft_class (Air_Craft_ID, Class, Row_Num, Col_Num) VALUES(%s, %s, %s, %s)",
-            (aircraft[0], "Economy", econrow, econcol),
+            classes,
         )
-        if buiscol is not None:
-            cursor.execute(
-                "INSERT INTO aircraft_class (Air_Craft_ID, Class, Row_Num, Col_Num) VALUES(%s, %s, %s, %s)",
-                (aircraft[0], "Business", buisrow, buiscol),
-            )
 
 
 # מחזיר את כל שדות המוצא השונים מהטבלה
 def get_origins():
-    with db_cursor() as cursor:
-        cursor.execute("SELECT DISTINCT Origin FROM route")
-        return [row[0] for row in cursor.fetchall()]
+    return list(reference_registry.get().origins)
 
 
 # מחזיר את כל היעדים השונים מהטבלה
 def get_dest():
-    with db_cursor() as cursor:
-        cursor.execute("SELECT DISTINCT Destination FROM route")
-        return [row[0] for row in cursor.fetchall()]
+    return list(reference_registry.get().dests)
 
 
 # חישוב זמן הגעה לפי משך טיסה זמן המראה תאריך המראה
@@ -299,12 +457,7 @@ def calculate_arrival_datetime(dep_date, dep_hour, duration):
 
 # מחזיר את הנתיב והמשך הטיסה לפי מקור ויעד
 def get_route_by_origin_dest(origin, destination):
-    with db_cursor() as cursor:
-        cursor.execute(
-            "SELECT Route_ID, Duration FROM route WHERE Origin=%s AND Destination=%s",
-            (origin, destination),
-        )
-        return cursor.fetchone()
+    return reference_registry.lookup(lambda data: data.routes_by_od.get((origin, destination)))
 
 
 # מחזיר מטוסים זמינים לטיסה מסוימת לפי מקור, יעד, תאריך ושעה
@@ -321,47 +474,94 @@ def get_specific_aricrafts(origin, dest, depdate, deptime):
 
     duration = float(route[1])
     dep_dt = datetime.combine(depdate, deptime)
+    arr_dt = dep_dt + timedelta(hours=duration)
     size_filter = " AND ac.Size = 'Large' " if duration > 6.0 else ""
 
+    # מטוס מתאים אם אין לו טיסות, או שהטיסה האחרונה שנחתה עד ההמראה נחתה בשדה המוצא,
+    # ובנוסף אין לו טיסה שבאוויר או ממריאה לפני שהטיסה החדשה נוחתת
     with db_cursor() as cursor:
         cursor.execute(
             f"""
-            SELECT DISTINCT ac.Air_Craft_ID, ac.Manufacturer, ac.Size
+            SELECT ac.Air_Craft_ID, ac.Manufacturer, ac.Size
             FROM air_craft ac
-            LEFT JOIN flight f
-              ON f.Air_Craft_ID = ac.Air_Craft_ID
-            LEFT JOIN route r
-              ON r.Route_ID = f.Route_ID
             WHERE
               (
-                f.Air_Craft_ID IS NULL
-                OR (
-                  TIMESTAMP(f.Arrival_Date, f.Arrival_Time) = (
-                      SELECT MAX(TIMESTAMP(f2.Arrival_Date, f2.Arrival_Time))
-                      FROM flight f2
-                      WHERE f2.Air_Craft_ID = ac.Air_Craft_ID
-                        AND TIMESTAMP(f2.Arrival_Date, f2.Arrival_Time) <= %s
-                  )
-                  AND r.Destination = %s
+                NOT EXISTS (
+                  SELECT 1
+                  FROM aircraft_location a0
+                  WHERE a0.Air_Craft_ID = ac.Air_Craft_ID
+                )
+                OR %s = (
+                  SELECT a1.Destination
+                  FROM aircraft_location a1
+                  WHERE a1.Air_Craft_ID = ac.Air_Craft_ID
+                    AND a1.Arr_TS <= %s
+                  ORDER BY a1.Arr_TS DESC
+                  LIMIT 1
                 )
               )
+              AND COALESCE((
+                  SELECT MIN(a2.Dep_TS)
+                  FROM aircraft_location a2
+                  WHERE a2.Air_Craft_ID = ac.Air_Craft_ID
+                    AND a2.Arr_TS > %s
+              ), %s) >= %s
               {size_filter}
             ORDER BY ac.Air_Craft_ID
             """,
-            (dep_dt, origin),
+            (origin, dep_dt, dep_dt, arr_dt, arr_dt),
         )
         return cursor.fetchall()
 
 
+# מוסיף טיסות לציר הזמן של המטוסים; legs היא רשימת (מטוס, תאריך, שעה, זמן המראה, זמן נחיתה, מוצא, יעד)
+def index_aircraft_locations(cursor, legs):
+    if legs:
+        cursor.executemany(
+            """
+            INSERT INTO aircraft_location (Air_Craft_ID, Dep_Date, Dep_Hour, Dep_TS, Arr_TS, Origin, Destination)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """,
+            legs,
+        )
+
+
+# מוחק טיסה מציר הזמן של המטוס (למשל כשהיא מבוטלת)
+def unindex_aircraft_location(cursor, aircraft_id, dep_date, dep_hour):
+    cursor.execute(
+        "DELETE FROM aircraft_location WHERE Air_Craft_ID = %s AND Dep_Date = %s AND Dep_Hour = %s",
+        (aircraft_id, dep_date, dep_hour),
+    )
+
+
+# בונה מחדש את ציר הזמן של המטוסים מכל הטיסות שלא בוטלו
+@invalidates("aircraft_location")
+def rebuild_aircraft_locations():
+    with db_cursor(transaction=True) as cursor:
+        cursor.execute("DELETE FROM aircraft_location")
+        cursor.execute(
+            f"""
+            INSERT INTO aircraft_location (Air_Craft_ID, Dep_Date, Dep_Hour, Dep_TS, Arr_TS, Origin, Destination)
+            SELECT f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour,
+                   f.Dep_TS, f.Arr_TS,
+                   r.Origin, r.Destination
+            FROM flight f
+            JOIN route r ON r.Route_ID = f.Route_ID
+            WHERE f.Status <> '{FLIGHT_STATUS_CANCELED}'
+            """
+        )
+
+
 # מחזיר יצרן וגודל של מטוס לפי מזהה
 def getaircraft_byid(id):
-    with db_cursor() as cursor:
-        cursor.execute("SELECT Manufacturer, Size FROM air_craft WHERE Air_Craft_ID = %s", (id,))
-        return cursor.fetchone()
+    return reference_registry.lookup(lambda data: data.aircraft.get(id))
 
 
-# מחזיר טייסים זמינים לטיסה לפי תאריך, שעה ומרחק הטיסה
-def get_available_pilots(origin, depdate, deptime, is_long_flight):
+# מחזיר אנשי צוות זמינים (מטבלת תפקיד: pilot או flight_attendent) לפי מיקומם באינדקס crew_location:
+# עובד זמין אם אין לו שיבוצים, או שהטיסה האחרונה שלו שנחתה עד זמן ההמראה נחתה בשדה המוצא
+def get_available_crew(role_table, origin, depdate, deptime, is_long_flight):
+    if role_table not in ("pilot", "flight_attendent"):
+        raise ValueError(f"Unknown crew table {role_table}")
     if isinstance(depdate, str):
         depdate = datetime.strptime(depdate, "%Y-%m-%d").date()
     if isinstance(deptime, str):
@@ -371,101 +571,89 @@ def get_available_pilots(origin, depdate, deptime, is_long_flight):
 
     with db_cursor() as cursor:
         cursor.execute(
-            """
+            f"""
             SELECT e.ID, e.Full_Name_Heb
             FROM employee e
-            JOIN pilot p ON p.ID = e.ID
+            JOIN {role_table} rt ON rt.ID = e.ID
             WHERE
-              (%s = 0 OR p.Long_Dist_Training = 1)
+              (%s = 0 OR rt.Long_Dist_Training = 1)
               AND (
                 NOT EXISTS (
                   SELECT 1
-                  FROM flight_crew fc0
-                  WHERE fc0.ID = e.ID
+                  FROM crew_location c0
+                  WHERE c0.ID = e.ID
                 )
-                OR
-                EXISTS (
-                  SELECT 1
-                  FROM flight_crew fc1
-                  JOIN flight f1
-                    ON f1.Air_Craft_ID = fc1.Air_Craft_ID
-                   AND f1.Dep_Date    = fc1.Dep_Date
-                   AND f1.Dep_Hour    = fc1.Dep_Hour
-                  JOIN route r1
-                    ON r1.Route_ID = f1.Route_ID
-                  WHERE fc1.ID = e.ID
-                    AND TIMESTAMP(f1.Arrival_Date, f1.Arrival_Time) = (
-                      SELECT MAX(TIMESTAMP(f2.Arrival_Date, f2.Arrival_Time))
-                      FROM flight_crew fc2
-                      JOIN flight f2
-                        ON f2.Air_Craft_ID = fc2.Air_Craft_ID
-                       AND f2.Dep_Date    = fc2.Dep_Date
-                       AND f2.Dep_Hour    = fc2.Dep_Hour
-                      WHERE fc2.ID = e.ID
-                        AND TIMESTAMP(f2.Arrival_Date, f2.Arrival_Time) <= %s
-                    )
-                    AND r1.Destination = %s
+                OR %s = (
+                  SELECT c1.Destination
+                  FROM crew_location c1
+                  WHERE c1.ID = e.ID
+                    AND c1.Arr_TS <= %s
+                  ORDER BY c1.Arr_TS DESC
+                  LIMIT 1
                 )
               )
             ORDER BY e.Full_Name_Heb
             """,
-            (1 if is_long_flight else 0, dep_dt, origin),
+            (1 if is_long_flight else 0, origin, dep_dt),
         )
         return cursor.fetchall()
 
 
+# מספר אנשי הצוות הנדרש לפי גודל המטוס (טייסים, דיילים), כמו באשף הוספת הטיסה
+def required_crew(size):
+    return (3, 6) if size == "Large" else (2, 3)
+
+
+# מחזיר טייסים זמינים לטיסה לפי תאריך, שעה ומרחק הטיסה
+def get_available_pilots(origin, depdate, deptime, is_long_flight):
+    return get_available_crew("pilot", origin, depdate, deptime, is_long_flight)
+
+
 # מחזיר דיילים זמינים לטיסה לפי תאריך, שעה ומרחק הטיסה
 def get_available_attendants(origin, depdate, deptime, is_long_flight):
-    if isinstance(depdate, str):
-        depdate = datetime.strptime(depdate, "%Y-%m-%d").date()
-    if isinstance(deptime, str):
-        fmt = "%H:%M:%S" if len(deptime) == 8 else "%H:%M"
-        deptime = datetime.strptime(deptime, fmt).time()
-    dep_dt = datetime.combine(depdate, deptime)
+    return get_available_crew("flight_attendent", origin, depdate, deptime, is_long_flight)
 
-    with db_cursor() as cursor:
-        cursor.execute(
+
+# מוסיף שיבוצים לאינדקס מיקום הצוות; rows היא רשימת (עובד, מטוס, תאריך, שעה, זמן המראה, זמן נחיתה, מוצא, יעד)
+def index_crew_locations(cursor, rows):
+    if rows:
+        cursor.executemany(
             """
-            SELECT e.ID, e.Full_Name_Heb
-            FROM employee e
-            JOIN flight_attendent fa ON fa.ID = e.ID
-            WHERE
-              (%s = 0 OR fa.Long_Dist_Training = 1)
-              AND (
-                NOT EXISTS (
-                  SELECT 1
-                  FROM flight_crew fc0
-                  WHERE fc0.ID = e.ID
-                )
-                OR
-                EXISTS (
-                  SELECT 1
-                  FROM flight_crew fc1
-                  JOIN flight f1
-                    ON f1.Air_Craft_ID = fc1.Air_Craft_ID
-                   AND f1.Dep_Date    = fc1.Dep_Date
-                   AND f1.Dep_Hour    = fc1.Dep_Hour
-                  JOIN route r1
-                    ON r1.Route_ID = f1.Route_ID
-                  WHERE fc1.ID = e.ID
-                    AND TIMESTAMP(f1.Arrival_Date, f1.Arrival_Time) = (
-                      SELECT MAX(TIMESTAMP(f2.Arrival_Date, f2.Arrival_Time))
-                      FROM flight_crew fc2
-                      JOIN flight f2
-                        ON f2.Air_Craft_ID = fc2.Air_Craft_ID
-                       AND f2.Dep_Date    = fc2.Dep_Date
-                       AND f2.Dep_Hour    = fc2.Dep_Hour
-                      WHERE fc2.ID = e.ID
-                        AND TIMESTAMP(f2.Arrival_Date, f2.Arrival_Time) <= %s
-                    )
-                    AND r1.Destination = %s
-                )
-              )
-            ORDER BY e.Full_Name_Heb
+            INSERT INTO crew_location (ID, Air_Craft_ID, Dep_Date, Dep_Hour, Dep_TS, Arr_TS, Origin, Destination)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             """,
-            (1 if is_long_flight else 0, dep_dt, origin),
+            rows,
+        )
+
+
+# מוחק מאינדקס מיקום הצוות את השיבוצים של טיסה (למשל כשהיא מבוטלת)
+def unindex_crew_locations(cursor, aircraft_id, dep_date, dep_hour):
+    cursor.execute(
+        "DELETE FROM crew_location WHERE Air_Craft_ID = %s AND Dep_Date = %s AND Dep_Hour = %s",
+        (aircraft_id, dep_date, dep_hour),
+    )
+
+
+# בונה מחדש את אינדקס מיקום הצוות מכל השיבוצים בטיסות שלא בוטלו
+@invalidates("crew_location")
+def rebuild_crew_locations():
+    with db_cursor(transaction=True) as cursor:
+        cursor.execute("DELETE FROM crew_location")
+        cursor.execute(
+            f"""
+            INSERT INTO crew_location (ID, Air_Craft_ID, Dep_Date, Dep_Hour, Dep_TS, Arr_TS, Origin, Destination)
+            SELECT fc.ID, f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour,
+                   f.Dep_TS, f.Arr_TS,
+                   r.Origin, r.Destination
+            FROM flight_crew fc
+            JOIN flight f
+              ON f.Air_Craft_ID = fc.Air_Craft_ID
+             AND f.Dep_Date     = fc.Dep_Date
+             AND f.Dep_Hour     = fc.Dep_Hour
+            JOIN route r ON r.Route_ID = f.Route_ID
+            WHERE f.Status <> '{FLIGHT_STATUS_CANCELED}'
+            """
         )
-        return cursor.fetchall()
 
 
 # מחזיר שמות עובדים לפי רשימת מזהים
@@ -484,6 +672,7 @@ def get_employee_names_by_ids(ids):
 
 
 # יוצר טיסה ומקצה לה צוות טייסים ודיילים
+@invalidates("flight", "flight_inventory", "flight_crew", "crew_location", "aircraft_location")
 def create_flight_and_assign_crew(
     aircraft_id,
     origin,
@@ -521,62 +710,83 @@ def create_flight_and_assign_crew(
     arrival_date = arr_dt.date()
     arrival_time = arr_dt.time().replace(second=0, microsecond=0)
 
-    with db_cursor() as cursor:
-        cursor.execute(
+    flight = (aircraft_id, dep_date, dep_time, route_id, arrival_date, arrival_time,
+              economy_price, business_price, status)
+    crew = [(pid, aircraft_id, dep_date, dep_time, "Pilot") for pid in pilot_ids]
+    crew += [(aid, aircraft_id, dep_date, dep_time, "Flight_Attendant") for aid in attendant_ids]
+    with db_cursor(transaction=True) as cursor:
+        insert_flights_batch(cursor, [flight], crew)
+    return True
+
+
+# מכניס קבוצת טיסות חדשות והצוות שלהן בפקודות מרובות שורות, ופותח את המלאי, מוסיף לצירי הזמן של
+# המטוסים והצוות ומרענן את סיכומי הדוחות של ימי ההמראה. flights היא רשימת (מטוס, תאריך, שעה, מסלול,
+# תאריך נחיתה, שעת נחיתה, מחיר Economy, מחיר Business, סטטוס) ו-crew רשימת (עובד, מטוס, תאריך, שעה, תפקיד).
+# לא פותח טרנזקציה בעצמו: הקורא מחליט על גודל הטרנזקציה
+def insert_flights_batch(cursor, flights, crew=()):
+    if not flights:
+        return
+    data = reference_registry.get()
+    if any(f[0] not in data.aircraft or f[3] not in data.routes_by_id for f in flights):
+        data = reference_registry.reload()
+    cabins = {}
+    for (aircraft_id, seat_class), (rows, cols) in data.layouts.items():
+        cabins.setdefault(aircraft_id, []).append((seat_class, rows * cols))
+
+    inventory, legs, timeline = [], [], {}
+    for aircraft_id, dep_date, dep_hour, route_id, arr_date, arr_time, _, _, status in flights:
+        key = (aircraft_id, dep_date, dep_hour)
+        inventory += [key + cabin for cabin in cabins.get(aircraft_id, [])]
+        if status != FLIGHT_STATUS_CANCELED:
+            origin, dest, _ = data.routes_by_id[route_id]
+            timeline[key] = (datetime.combine(dep_date, dep_hour), datetime.combine(arr_date, arr_time), origin, dest)
+            legs.append(key + timeline[key])
+
+    cursor.executemany(
+        """
+        INSERT INTO flight
+        (Air_Craft_ID, Dep_Date, Dep_Hour, Route_ID,
+         Arrival_Date, Arrival_Time,
+         Economy_Price, Business_Price, Status)
+        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+        """,
+        flights,
+    )
+    open_flight_inventory(cursor, inventory)
+    index_aircraft_locations(cursor, legs)
+    if crew:
+        cursor.executemany(
             """
-            INSERT INTO flight
-            (Air_Craft_ID, Dep_Date, Dep_Hour, Route_ID,
-             Arrival_Date, Arrival_Time,
-             Economy_Price, Business_Price, Status)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+            INSERT INTO flight_crew
+            (ID, Air_Craft_ID, Dep_Date, Dep_Hour, Role)
+            VALUES (%s,%s,%s,%s,%s)
             """,
-            (
-                aircraft_id,
-                dep_date,
-                dep_time,
-                route_id,
-                arrival_date,
-                arrival_time,
-                economy_price,
-                business_price,
-                status,
-            ),
+            crew,
+        )
+        located = []
+        for emp_id, aircraft_id, dep_date, dep_hour, _ in crew:
+            key = (aircraft_id, dep_date, dep_hour)
+            if key in timeline:
+                located.append((emp_id,) + key + timeline[key])
+        index_crew_locations(cursor, located)
+    if flights:
+        placeholders = ",".join(["(%s, %s, %s)"] * len(flights))
+        add_flights_to_rollups(
+            cursor,
+            f"WHERE (f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour) IN ({placeholders})",
+            [x for f in flights for x in f[:3]],
         )
-
-        for pid in pilot_ids:
-            cursor.execute(
-                """
-                INSERT INTO flight_crew
-                (ID, Air_Craft_ID, Dep_Date, Dep_Hour, Role)
-                VALUES (%s,%s,%s,%s,%s)
-                """,
-                (pid, aircraft_id, dep_date, dep_time, "Pilot"),
-            )
-        for aid in attendant_ids:
-            cursor.execute(
-                """
-                INSERT INTO flight_crew
-                (ID, Air_Craft_ID, Dep_Date, Dep_Hour, Role)
-                VALUES (%s,%s,%s,%s,%s)
-                """,
-                (aid, aircraft_id, dep_date, dep_time, "Flight_Attendant"),
-            )
-    return True
 
 
 # ביטול טיסה במסגרת הגבלות כולל בדיקות
+@invalidates("flight", "flight_order", "flight_inventory", "crew_location", "aircraft_location")
 def cancel_flight_if_allowed(aircraft_id: str, dep_date: date, dep_time: time, origin: str, destination: str):
-    db = get_db()
-    cur = db.cursor()
-    try:
-        cur.execute(
-            "SELECT Route_ID FROM route WHERE Origin=%s AND Destination=%s",
-            (origin, destination),
-        )
-        r = cur.fetchone()
-        if not r:
-            return False, "הנתיב לא נמצא"
-        route_id = r[0]
+    r = get_route_by_origin_dest(origin, destination)
+    if not r:
+        return False, "הנתיב לא נמצא"
+    route_id = r[0]
+
+    with db_cursor(transaction=True) as cur:
 
         cur.execute(
             """
@@ -586,6 +796,7 @@ def cancel_flight_if_allowed(aircraft_id: str, dep_date: date, dep_time: time, o
               AND Dep_Date=%s
               AND Dep_Hour=%s
               AND Route_ID=%s
+            FOR UPDATE
             """,
             (aircraft_id, dep_date, dep_time, route_id),
         )
@@ -604,6 +815,12 @@ def cancel_flight_if_allowed(aircraft_id: str, dep_date: date, dep_time: time, o
         if dep_dt - datetime.now() <= timedelta(hours=72):
             return False, "לא ניתן לבטל טיסה פחות מ־72 שעות לפני ההמראה"
 
+        move_flights_in_rollups(
+            cur,
+            "WHERE f.Air_Craft_ID = %s AND f.Dep_Date = %s AND f.Dep_Hour = %s",
+            (aircraft_id, db_dep_date, db_dep_time),
+            FLIGHT_STATUS_CANCELED,
+        )
         cur.execute(
             """
             UPDATE flight
@@ -615,20 +832,35 @@ def cancel_flight_if_allowed(aircraft_id: str, dep_date: date, dep_time: time, o
             """,
             (FLIGHT_STATUS_CANCELED, aircraft_id, dep_date, dep_time, route_id),
         )
+        unindex_crew_locations(cur, aircraft_id, dep_date, dep_time)
+        unindex_aircraft_location(cur, aircraft_id, dep_date, dep_time)
 
         cur.execute(
             """
-            SELECT DISTINCT Order_ID
-            FROM tickets
-            WHERE Air_Craft_ID=%s
-              AND Dep_Date=%s
-              AND Dep_Hour=%s
+            SELECT DISTINCT t.Order_ID, fo.Order_status
+            FROM tickets t
+            JOIN flight_order fo ON fo.Order_ID = t.Order_ID
+            WHERE t.Air_Craft_ID=%s
+              AND t.Dep_Date=%s
+              AND t.Dep_Hour=%s
             """,
             (aircraft_id, dep_date, dep_time),
         )
-        orders = [row[0] for row in cur.fetchall()]
+        rows = cur.fetchall()
+        orders = [row[0] for row in rows]
         if orders:
+            release_inventory_for_orders(cur, [row[0] for row in rows if row[1] == ORDER_STATUS_ACTIVE])
             format_strings = ",".join(["%s"] * len(orders))
+            cur.execute(
+                f"""
+                SELECT Order_Date, Order_status, COUNT(*)
+                FROM flight_order
+                WHERE Order_ID IN ({format_strings})
+                GROUP BY Order_Date, Order_status
+                """,
+                tuple(orders),
+            )
+            move_orders_in_rollup(cur, cur.fetchall(), ORDER_STATUS_SYSTEM_CANCELED)
             cur.execute(
                 f"""
                 UPDATE flight_order
@@ -638,216 +870,553 @@ def cancel_flight_if_allowed(aircraft_id: str, dep_date: date, dep_time: time, o
                 tuple([ORDER_STATUS_SYSTEM_CANCELED] + orders),
             )
 
-        db.commit()
         return True, "הטיסה בוטלה בהצלחה"
-    finally:
-        cur.close()
-        db.close()
 
 
 # מחזיר את מספר השורות והטורים של מחלקת מושבים במטוס
 def get_class_layout(aircraft_id, seat_class):
-    with db_cursor() as cursor:
-        cursor.execute(
-            """
-            SELECT Row_Num, Col_Num
-            FROM aircraft_class
-            WHERE Air_Craft_ID = %s AND Class = %s
-            """,
-            (aircraft_id, seat_class),
-        )
-        row = cursor.fetchone()
-    if row is None:
+    layout = reference_registry.lookup(lambda data: data.layouts.get((aircraft_id, seat_class)))
+    if layout is None:
         raise ValueError(f"No layout found for aircraft {aircraft_id} and class {seat_class}")
-    return int(row[0]), int(row[1])
+    return layout
 
 
-# מחזיר את כל המושבים שכבר תפוסים בטיסה מסוימת
-def get_taken_seat_for_flight(aircraft_id, dep_date, dep_hour):
+# מחזיר את השורה והטור של כל המושבים שיש להם כרטיס בטיסה מסוימת. כל מושב עם כרטיס נחשב תפוס,
+# גם של הזמנה שבוטלה: המפתח של tickets לא מאפשר למכור אותו שוב
+def get_ticketed_seat_rows(aircraft_id, dep_date, dep_hour):
     with db_cursor() as cursor:
         cursor.execute(
             """
-            SELECT t.Chosen_Row_Num, t.Chosen_Col_Num
-            FROM tickets t
-            JOIN flight_order fo
-              ON fo.Order_ID = t.Order_ID
-            WHERE t.Air_Craft_ID = %s
-              AND t.Dep_Date = DATE(%s)
-              AND t.Dep_Hour = TIME(%s)
-              AND fo.Order_status = %s
+            SELECT Chosen_Row_Num, Chosen_Col_Num
+            FROM tickets
+            WHERE Air_Craft_ID = %s
+              AND Dep_Date = DATE(%s)
+              AND Dep_Hour = TIME(%s)
             """,
-            (aircraft_id, dep_date, dep_hour, ORDER_STATUS_ACTIVE),
+            (aircraft_id, dep_date, dep_hour),
         )
-        rows = cursor.fetchall()
-    return {f"{int(r)}:{int(c)}" for (r, c) in rows}
+        return cursor.fetchall()
 
 
-# מחזיר את כל הטיסות שלא בוטלו עם פרטי הטיסה
-def get_all_flights_not_cancelled():
+# מחזיר את המושבים השמורים כרגע בטיסה למשתמשים אחרים (כל שמירה בתוקף שאינה של hold_token)
+def get_held_seat_rows(aircraft_id, dep_date, dep_hour, hold_token=None):
     with db_cursor() as cursor:
         cursor.execute(
             """
-            SELECT
-                f.Air_Craft_ID,
-                f.Route_ID,
-                f.Dep_Date,
-                f.Dep_Hour,
-                r.Duration,
-                f.Status
-            FROM flight f
-            JOIN route r ON r.Route_ID = f.Route_ID
-            WHERE f.Status <> %s
+            SELECT Row_Num, Col_Num
+            FROM seat_hold
+            WHERE Air_Craft_ID = %s
+              AND Dep_Date = DATE(%s)
+              AND Dep_Hour = TIME(%s)
+              AND Expires_At > NOW()
+              AND Hold_Token <> %s
             """,
-            (FLIGHT_STATUS_CANCELED,),
+            (aircraft_id, dep_date, dep_hour, hold_token or ""),
         )
-        rows = cursor.fetchall()
+        return cursor.fetchall()
 
-    flights = []
-    for air, route_id, dep_date, dep_hour, duration, status in rows:
-        flights.append(
-            {
-                "aircraft": air,
-                "route_id": route_id,
-                "dep_date": dep_date,
-                "dep_time": mysql_time_to_time(dep_hour),
-                "duration": float(duration),
-                "status": normalize_flight_status(status),
-            }
-        )
-    return flights
+
+# מחזיר את השורה והטור של כל המושבים שכבר תפוסים בטיסה מסוימת, כולל שמירות של משתמשים אחרים
+def get_taken_seat_rows(aircraft_id, dep_date, dep_hour, hold_token=None):
+    return (get_ticketed_seat_rows(aircraft_id, dep_date, dep_hour)
+            + get_held_seat_rows(aircraft_id, dep_date, dep_hour, hold_token))
 
 
-# פונקציית עזר לפונקציית ()update_flight_status שמקבלת פרטי טיסה ספציפית ומעדכנת אותם
-def update_flight_status(aircraft, route_id, dep_date, dep_time, new_status):
-    new_status = normalize_flight_status(new_status)
+# מחזיר את כל המושבים שכבר תפוסים בטיסה מסוימת
+def get_taken_seat_for_flight(aircraft_id, dep_date, dep_hour):
+    return {f"{int(r)}:{int(c)}" for (r, c) in get_taken_seat_rows(aircraft_id, dep_date, dep_hour)}
+
+
+# מפת הביטים של המושבים שיש להם כרטיס; לא תלויה במשתמש ולכן משותפת במטמון לכל הקוראים
+@cached("tickets")
+def _ticketed_seat_occupancy(aircraft_id, dep_date, dep_hour, has_business):
+    business_layout = get_class_layout(aircraft_id, "Business") if has_business else None
+    seats = SeatOccupancy(get_class_layout(aircraft_id, "Economy"), business_layout)
+    for r, c in get_ticketed_seat_rows(aircraft_id, dep_date, dep_hour):
+        seats.occupy(r, c)
+    return seats
+
+
+# בונה מפת ביטים של תפוסת המושבים בטיסה לפי תצורת המחלקות של המטוס: עותק של מפת הכרטיסים
+# מהמטמון, ועליה השמירות בתוקף של משתמשים אחרים שנקראות בכל בקשה (שמירה שפגה לא נספרת)
+def get_seat_occupancy(aircraft_id, dep_date, dep_hour, has_business=True, hold_token=None):
+    seats = _ticketed_seat_occupancy(aircraft_id, dep_date, dep_hour, has_business).copy()
+    for r, c in get_held_seat_rows(aircraft_id, dep_date, dep_hour, hold_token):
+        seats.occupy(r, c)
+    return seats
+
+
+# ממיר רשימת מושבים בפורמט "שורה-טור" לזוגות מספרים ממוינים
+def parse_seats(seats):
+    return sorted({tuple(int(x) for x in seat.split("-")) for seat in seats or []})
+
+
+# שומר מושבים למשתמש (hold_token) ל-ttl שניות. שמירה קודמת של אותו משתמש בטיסה משתחררת.
+# מושב שכבר נמכר או שמור למשתמש אחר גורם לכישלון, ובמקרה כזה אף מושב לא נשמר
+@invalidates("seat_hold")
+def hold_seats(hold_token, aircraft_id, dep_date, dep_hour, seats, ttl=SEAT_HOLD_TTL):
+    pairs = parse_seats(seats)
+    if not pairs:
+        return True, []
+    placeholders = ",".join(["(%s, %s)"] * len(pairs))
+    flat = [x for pair in pairs for x in pair]
+    try:
+        with db_cursor(transaction=True) as cursor:
+            cursor.execute(
+                "DELETE FROM seat_hold WHERE Hold_Token = %s AND Air_Craft_ID = %s AND Dep_Date = %s AND Dep_Hour = %s",
+                (hold_token, aircraft_id, dep_date, dep_hour),
+            )
+            cursor.execute(
+                f"""
+                SELECT Chosen_Row_Num, Chosen_Col_Num
+                FROM tickets
+                WHERE Air_Craft_ID = %s AND Dep_Date = %s AND Dep_Hour = %s
+                  AND (Chosen_Row_Num, Chosen_Col_Num) IN ({placeholders})
+                """,
+                tuple([aircraft_id, dep_date, dep_hour] + flat),
+            )
+            sold = cursor.fetchall()
+            if sold:
+                raise SeatHoldError("seats already sold", [f"{r}-{c}" for r, c in sold])
+            cursor.executemany(
+                """
+                INSERT INTO seat_hold (Air_Craft_ID, Dep_Date, Dep_Hour, Row_Num, Col_Num, Hold_Token, Expires_At)
+                VALUES (%s, %s, %s, %s, %s, %s, NOW() + INTERVAL %s SECOND)
+                ON DUPLICATE KEY UPDATE
+                  Hold_Token = IF(Expires_At <= NOW(), VALUES(Hold_Token), Hold_Token),
+                  Expires_At = IF(Hold_Token = VALUES(Hold_Token), VALUES(Expires_At), Expires_At)
+                """,
+                [(aircraft_id, dep_date, dep_hour, r, c, hold_token, int(ttl)) for r, c in pairs],
+            )
+            cursor.execute(
+                f"""
+                SELECT Row_Num, Col_Num
+                FROM seat_hold
+                WHERE Air_Craft_ID = %s AND Dep_Date = %s AND Dep_Hour = %s
+                  AND (Row_Num, Col_Num) IN ({placeholders})
+                  AND Hold_Token <> %s
+                """,
+                tuple([aircraft_id, dep_date, dep_hour] + flat + [hold_token]),
+            )
+            lost = cursor.fetchall()
+            if lost:
+                raise SeatHoldError("seats held by another customer", [f"{r}-{c}" for r, c in lost])
+    except SeatHoldError as e:
+        return False, e.seats
+    except mysql.connector.Error as e:
+        if e.errno == MYSQL_ERR_DEADLOCK:
+            return False, []
+        raise
+    return True, []
+
+
+# משחרר את כל המושבים השמורים של משתמש
+@invalidates("seat_hold")
+def release_seat_holds(hold_token):
     with db_cursor() as cursor:
+        cursor.execute("DELETE FROM seat_hold WHERE Hold_Token = %s", (hold_token,))
+
+
+# מוחק במנות את כל השמירות שפג תוקפן; checkpoint (אם הועבר) נקרא לפני כל מנה
+@invalidates("seat_hold")
+def purge_expired_seat_holds(batch_size=SEAT_HOLD_PURGE_BATCH, checkpoint=None):
+    purged = 0
+    while True:
+        if checkpoint is not None:
+            checkpoint()
+        with db_cursor() as cursor:
+            cursor.execute("DELETE FROM seat_hold WHERE Expires_At <= NOW() LIMIT %s", (batch_size,))
+            purged += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return purged
+
+
+# בודק בתוך טרנזקציה שכל המושבים עדיין שמורים למשתמש ונועל אותם, ומוחק את השמירות (הפיכה להזמנה)
+def consume_seat_holds(cursor, hold_token, aircraft_id, dep_date, dep_hour, pairs):
+    if not pairs:
+        return
+    placeholders = ",".join(["(%s, %s)"] * len(pairs))
+    flat = [x for pair in pairs for x in pair]
+    cursor.execute(
+        f"""
+        SELECT Row_Num, Col_Num
+        FROM seat_hold
+        WHERE Air_Craft_ID = %s AND Dep_Date = %s AND Dep_Hour = %s
+          AND (Row_Num, Col_Num) IN ({placeholders})
+          AND Hold_Token = %s
+          AND Expires_At > NOW()
+        FOR UPDATE
+        """,
+        tuple([aircraft_id, dep_date, dep_hour] + flat + [hold_token]),
+    )
+    held = {(int(r), int(c)) for r, c in cursor.fetchall()}
+    missing = [f"{r}-{c}" for r, c in pairs if (r, c) not in held]
+    if missing:
+        raise SeatHoldError("seat hold expired or lost", missing)
+    cursor.execute(
+        "DELETE FROM seat_hold WHERE Hold_Token = %s AND Air_Craft_ID = %s AND Dep_Date = %s AND Dep_Hour = %s",
+        (hold_token, aircraft_id, dep_date, dep_hour),
+    )
+
+
+# קורא את סימן המים (הזמן האחרון שעובד) של תהליך תחזוקה
+def get_watermark(cursor, name):
+    cursor.execute("SELECT Watermark FROM maintenance_state WHERE Name = %s", (name,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+# שומר סימן מים חדש של תהליך תחזוקה
+def set_watermark(cursor, name, value):
+    cursor.execute(
+        """
+        INSERT INTO maintenance_state (Name, Watermark) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE Watermark = VALUES(Watermark)
+        """,
+        (name, value),
+    )
+
+
+# עדכון סטטוס טיסה: מסמן כהושלמו בפקודה אחת את כל הטיסות שנחתו מאז הריצה הקודמת
+# full=True מתעלם מסימן המים ועובר על כל הטיסות (לתיקון נתונים)
+@invalidates("flight")
+def update_flights_status(full=False, catchup_batch=FLIGHT_CATCHUP_BATCH):
+    now = datetime.now().replace(microsecond=0)
+    with db_cursor(transaction=True) as cursor:
+        since = None if full else get_watermark(cursor, WATERMARK_FLIGHTS_LANDED)
+        where = f"""
+            WHERE f.Status IN ('{FLIGHT_STATUS_SCHEDULED}', '{FLIGHT_STATUS_FULLY_BOOKED}')
+              AND f.Arr_TS <= %s
+        """
+        params = [now]
+        if since is not None:
+            where += " AND f.Arr_TS > %s"
+            params.append(since)
+        cursor.execute("SELECT COUNT(*) FROM flight f " + where + " FOR UPDATE", tuple(params))
+        completed = cursor.fetchone()[0]
+        record_flight_completions(cursor, where, params)
+        move_flights_in_rollups(cursor, where, params, FLIGHT_STATUS_COMPLETED)
+        cursor.execute(f"UPDATE flight f SET f.Status = '{FLIGHT_STATUS_COMPLETED}' " + where, tuple(params))
+        if since is not None:
+            completed += len(complete_late_flights(cursor, since, catchup_batch))
+        set_watermark(cursor, WATERMARK_FLIGHTS_LANDED, now)
+    return completed
+
+
+# רושם אירוע השלמה לכל טיסה שעומדת לעבור ל-COMPLETED (where הוא פסוקית WHERE על flight f), באותה טרנזקציה
+# של העדכון. update_orders_status_when_flight_completed צורך את האירועים, כך שההזמנות מושלמות
+# לכל טיסה שהושלמה, לא משנה איזה כותב השלים אותה ומתי היא נחתה
+def record_flight_completions(cursor, where, params):
+    cursor.execute(
+        f"""
+        INSERT INTO flight_completion (Air_Craft_ID, Dep_Date, Dep_Hour)
+        SELECT f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour
+        FROM flight f
+        {where} AND f.Status <> '{FLIGHT_STATUS_COMPLETED}'
+        """,
+        tuple(params),
+    )
+
+
+# השלמה של טיסות שנחתו כבר לפני סימן המים אבל לא הושלמו: טיסות עבר שנטענו או הוזנו באיחור.
+# האינדקס Status_Arrival מגביל את הסריקה לטיסות כאלה בלבד, ו-limit מגביל את העבודה בכל ריצה
+def complete_late_flights(cursor, since, limit):
+    cursor.execute(
+        f"""
+        SELECT Air_Craft_ID, Dep_Date, Dep_Hour
+        FROM flight
+        WHERE Status IN ('{FLIGHT_STATUS_SCHEDULED}', '{FLIGHT_STATUS_FULLY_BOOKED}')
+          AND Arr_TS <= %s
+        ORDER BY Arr_TS
+        LIMIT %s
+        FOR UPDATE
+        """,
+        (since, limit),
+    )
+    late = cursor.fetchall()
+    if late:
+        placeholders = ",".join(["(%s, %s, %s)"] * len(late))
+        where = f"WHERE (f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour) IN ({placeholders})"
+        keys = [x for key in late for x in key]
+        record_flight_completions(cursor, where, keys)
+        move_flights_in_rollups(cursor, where, keys, FLIGHT_STATUS_COMPLETED)
         cursor.execute(
-            """
-            UPDATE flight
-            SET Status = %s
-            WHERE Air_Craft_ID = %s
-              AND Route_ID = %s
-              AND Dep_Date = %s
-              AND Dep_Hour = %s
+            f"""
+            UPDATE flight SET Status = '{FLIGHT_STATUS_COMPLETED}'
+            WHERE (Air_Craft_ID, Dep_Date, Dep_Hour) IN ({placeholders})
             """,
-            (new_status, aircraft, route_id, dep_date, dep_time),
+            tuple(keys),
         )
-
-
-# עדכון סטטוס טיסה
-def update_flights_status():
-    now = datetime.now()
-    flights = get_all_flights_not_cancelled()
-    for f in flights:
-        if f["status"] == FLIGHT_STATUS_CANCELED:
-            continue
-        dep_dt = datetime.combine(f["dep_date"], f["dep_time"])
-        landing_dt = dep_dt + timedelta(hours=f["duration"])
-        if now >= landing_dt and f["status"] != FLIGHT_STATUS_COMPLETED:
-            update_flight_status(
-                f["aircraft"],
-                f["route_id"],
-                f["dep_date"],
-                f["dep_time"],
-                FLIGHT_STATUS_COMPLETED,
-            )
+    return late
 
 
 # מוסיף אורח לבסיס נתונים
+@invalidates("customer", "phone_numbers")
 def new_guest(email, fullname, phones):
-    with db_cursor() as cursor:
+    with db_cursor(transaction=True) as cursor:
         cursor.execute(
             "INSERT INTO customer(Email, Full_Name_Eng) VALUES (%s, %s)",
             (email, fullname),
         )
-        for phone in phones:
-            cursor.execute(
+        if phones:
+            cursor.executemany(
                 "INSERT INTO phone_numbers(Cust_Email, Phone_num) VALUES(%s, %s)",
-                (email, phone),
+                [(email, phone) for phone in phones],
             )
 
 
 # יוצר הזמנה ומכניס את כרטיסי הנוסעים עם מחירים מתאימים
-def insert_order_and_tickets(email, aircraft_id, dep_date, dep_hour, econ_seats, busi_seats, econ_price, busi_price, total_paid):
-    with db_cursor() as cursor:
+# ההזמנה נוצרת רק אם יש מושבים וכולם עדיין שמורים ל-hold_token (אחרת SeatHoldError ושום דבר לא נכתב)
+@invalidates("flight_order", "tickets", "flight_inventory", "flight", "seat_hold")
+def insert_order_and_tickets(email, aircraft_id, dep_date, dep_hour, econ_seats, busi_seats, econ_price, busi_price, total_paid, hold_token):
+    econ_seats = econ_seats or []
+    busi_seats = busi_seats or []
+    if hold_token is None or not (econ_seats or busi_seats):
+        raise SeatHoldError("order without held seats")
+    with db_cursor(transaction=True) as cursor:
+        consume_seat_holds(cursor, hold_token, aircraft_id, dep_date, dep_hour, parse_seats(econ_seats + busi_seats))
+        today = date.today()
         cursor.execute(
-            "INSERT INTO flight_order (Email, Order_Date, Order_status, Total_Paid) VALUES (%s, CURDATE(), %s, %s)",
-            (email, ORDER_STATUS_ACTIVE, total_paid),
+            "INSERT INTO flight_order (Email, Order_Date, Order_status, Total_Paid) VALUES (%s, %s, %s, %s)",
+            (email, today, ORDER_STATUS_ACTIVE, total_paid),
         )
         order_id = cursor.lastrowid
-
-        for seat in econ_seats:
-            row, col = seat.split("-")
-            cursor.execute(
-                """
-                INSERT INTO tickets
-                (Order_ID, Air_Craft_ID, Dep_Date, Dep_Hour, Chosen_Row_Num, Chosen_Col_Num, Price_Paid)
-                VALUES (%s,%s,%s,%s,%s,%s,%s)
-                """,
-                (order_id, aircraft_id, dep_date, dep_hour, int(row), int(col), econ_price),
-            )
-
-        for seat in busi_seats:
-            row, col = seat.split("-")
-            cursor.execute(
+        bump_order_rollup(cursor, [(today, ORDER_STATUS_ACTIVE, 1)])
+
+        tickets = []
+        for seats, price in ((econ_seats, econ_price), (busi_seats, busi_price)):
+            for seat in seats:
+                row, col = seat.split("-")
+                tickets.append((order_id, aircraft_id, dep_date, dep_hour, int(row), int(col), price))
+        if tickets:
+            cursor.executemany(
                 """
                 INSERT INTO tickets
                 (Order_ID, Air_Craft_ID, Dep_Date, Dep_Hour, Chosen_Row_Num, Chosen_Col_Num, Price_Paid)
                 VALUES (%s,%s,%s,%s,%s,%s,%s)
                 """,
-                (order_id, aircraft_id, dep_date, dep_hour, int(row), int(col), busi_price),
+                tickets,
             )
 
+        for seat_class, seats in (("Economy", econ_seats), ("Business", busi_seats)):
+            if seats:
+                cursor.execute(
+                    """
+                    UPDATE flight_inventory
+                    SET Sold = Sold + %s, Active = Active + %s
+                    WHERE Air_Craft_ID = %s AND Dep_Date = %s AND Dep_Hour = %s AND Class = %s
+                    """,
+                    (len(seats), len(seats), aircraft_id, dep_date, dep_hour, seat_class),
+                )
+        mark_fully_booked_if_full(cursor, aircraft_id, dep_date, dep_hour)
         return order_id
 
 
-# שינוי סטטוס לתפוסה מלאה
+# פותח מלאי מושבים לטיסות חדשות; rows היא רשימת (מטוס, תאריך, שעה, מחלקה, קיבולת)
+def open_flight_inventory(cursor, rows):
+    if rows:
+        cursor.executemany(
+            """
+            INSERT INTO flight_inventory (Air_Craft_ID, Dep_Date, Dep_Hour, Class, Capacity, Sold, Active)
+            VALUES (%s, %s, %s, %s, %s, 0, 0)
+            """,
+            rows,
+        )
+
+
+# מוריד את מונה הכרטיסים הפעילים במלאי עבור הזמנות שבוטלו (לפי טיסה ומחלקה)
+def release_inventory_for_orders(cursor, order_ids):
+    if not order_ids:
+        return
+    placeholders = ",".join(["%s"] * len(order_ids))
+    cursor.execute(
+        f"""
+        UPDATE flight_inventory inv
+        JOIN (
+            SELECT t.Air_Craft_ID, t.Dep_Date, t.Dep_Hour, {TICKET_CLASS_SQL} AS Class, COUNT(*) AS n
+            FROM tickets t
+            {TICKET_CLASS_JOIN}
+            WHERE t.Order_ID IN ({placeholders})
+            GROUP BY t.Air_Craft_ID, t.Dep_Date, t.Dep_Hour, Class
+        ) x
+          ON x.Air_Craft_ID = inv.Air_Craft_ID
+         AND x.Dep_Date     = inv.Dep_Date
+         AND x.Dep_Hour     = inv.Dep_Hour
+         AND x.Class        = inv.Class
+        SET inv.Active = inv.Active - x.n
+        """,
+        tuple(order_ids),
+    )
+
+
+# בדיקת O(1) על מוני המלאי של טיסה אחת: מסמן תפוסה מלאה אם כל המושבים נמכרו וכולם פעילים
+def mark_fully_booked_if_full(cursor, aircraft_id, dep_date, dep_hour):
+    cursor.execute(
+        f"""
+        UPDATE flight f
+        JOIN (
+            SELECT SUM(Capacity) AS capacity, SUM(Sold) AS sold, SUM(Active) AS active
+            FROM flight_inventory
+            WHERE Air_Craft_ID = %s AND Dep_Date = %s AND Dep_Hour = %s
+        ) x
+        SET f.Status = '{FLIGHT_STATUS_FULLY_BOOKED}'
+        WHERE f.Air_Craft_ID = %s AND f.Dep_Date = %s AND f.Dep_Hour = %s
+          AND f.Status = '{FLIGHT_STATUS_SCHEDULED}'
+          AND x.capacity > 0
+          AND x.sold = x.capacity
+          AND x.active = x.sold
+        """,
+        (aircraft_id, dep_date, dep_hour, aircraft_id, dep_date, dep_hour),
+    )
+    if cursor.rowcount:
+        bump_flight_status_rollup(
+            cursor, [(dep_date, FLIGHT_STATUS_SCHEDULED, -1), (dep_date, FLIGHT_STATUS_FULLY_BOOKED, 1)]
+        )
+
+
+# מחזיר את מספר המושבים הפנויים בכל מחלקה בטיסה לפי מוני המלאי; מושב של הזמנה שבוטלה
+# נשאר עם כרטיס ולא ניתן למכור אותו שוב, לכן הפנויים הם הקיבולת פחות כל הכרטיסים שנמכרו
+# (אותה הגדרה כמו Seats_Left בחיפוש הטיסות)
+@cached("flight_inventory")
+def get_flight_seats_left(aircraft_id, dep_date, dep_hour):
+    with db_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT Class, Capacity - Sold
+            FROM flight_inventory
+            WHERE Air_Craft_ID = %s
+              AND Dep_Date = DATE(%s)
+              AND Dep_Hour = TIME(%s)
+            """,
+            (aircraft_id, dep_date, dep_hour),
+        )
+        return {seat_class: int(left) for seat_class, left in cursor.fetchall()}
+
+
+# בונה מחדש את טבלת המלאי מתוך הכרטיסים הקיימים (למילוי ראשוני או תיקון נתונים)
+@invalidates("flight_inventory")
+def rebuild_flight_inventory():
+    with db_cursor(transaction=True) as cursor:
+        cursor.execute("DELETE FROM flight_inventory")
+        cursor.execute(
+            f"""
+            INSERT INTO flight_inventory (Air_Craft_ID, Dep_Date, Dep_Hour, Class, Capacity, Sold, Active)
+            SELECT f.Air_Craft_ID, f.Dep_Date, f.Dep_Hour, ac.Class, ac.Row_Num * ac.Col_Num,
+                   COALESCE(x.sold, 0), COALESCE(x.active, 0)
+            FROM flight f
+            JOIN aircraft_class ac ON ac.Air_Craft_ID = f.Air_Craft_ID
+            LEFT JOIN (
+                SELECT t.Air_Craft_ID, t.Dep_Date, t.Dep_Hour, {TICKET_CLASS_SQL} AS Class,
+                       COUNT(*) AS sold,
+                       SUM(fo.Order_status = '{ORDER_STATUS_ACTIVE}') AS active
+                FROM tickets t
+                JOIN flight_order fo ON fo.Order_ID = t.Order_ID
+                {TICKET_CLASS_JOIN}
+                GROUP BY t.Air_Craft_ID, t.Dep_Date, t.Dep_Hour, Class
+            ) x
+              ON x.Air_Craft_ID = f.Air_Craft_ID
+             AND x.Dep_Date     = f.Dep_Date
+             AND x.Dep_Hour     = f.Dep_Hour
+             AND x.Class        = ac.Class
+            """
+        )
+
+
+# שינוי סטטוס לתפוסה מלאה לכל הטיסות הפתוחות לפי מוני המלאי (לתיקון נתונים בלבד;
+# בזמן ריצה הבדיקה נעשית על הטיסה שנכתבה, ב-mark_fully_booked_if_full). אינו מעדכן את סיכומי הדוחות,
+# ולכן יש להריץ אחריו את rebuild_report_rollups
+@invalidates("flight")
 def update_flights_fully_booked():
     with db_cursor() as cursor:
         cursor.execute(
             f"""
             UPDATE flight f
             JOIN (
-                SELECT
-                    f2.Air_Craft_ID,
-                    f2.Dep_Date,
-                    f2.Dep_Hour,
-                    (
-                        SELECT COALESCE(SUM(acc.Row_Num * acc.Col_Num), 0)
-                        FROM aircraft_class acc
-                        WHERE acc.Air_Craft_ID = f2.Air_Craft_ID
-                    ) AS capacity,
-                    (
-                        SELECT COUNT(*)
-                        FROM tickets t
-                        WHERE t.Air_Craft_ID = f2.Air_Craft_ID
-                          AND t.Dep_Date    = f2.Dep_Date
-                          AND t.Dep_Hour    = f2.Dep_Hour
-                    ) AS total_tickets,
-                    (
-                        SELECT COUNT(*)
-                        FROM tickets t
-                        JOIN flight_order fo ON fo.Order_ID = t.Order_ID
-                        WHERE t.Air_Craft_ID = f2.Air_Craft_ID
-                          AND t.Dep_Date    = f2.Dep_Date
-                          AND t.Dep_Hour    = f2.Dep_Hour
-                          AND fo.Order_status = '{ORDER_STATUS_ACTIVE}'
-                    ) AS active_tickets
-                FROM flight f2
-                WHERE f2.Status NOT IN ('{FLIGHT_STATUS_CANCELED}', '{FLIGHT_STATUS_COMPLETED}', '{FLIGHT_STATUS_FULLY_BOOKED}')
+                SELECT Air_Craft_ID, Dep_Date, Dep_Hour,
+                       SUM(Capacity) AS capacity, SUM(Sold) AS sold, SUM(Active) AS active
+                FROM flight_inventory
+                GROUP BY Air_Craft_ID, Dep_Date, Dep_Hour
             ) x
               ON x.Air_Craft_ID = f.Air_Craft_ID
              AND x.Dep_Date     = f.Dep_Date
              AND x.Dep_Hour     = f.Dep_Hour
             SET f.Status = '{FLIGHT_STATUS_FULLY_BOOKED}'
-            WHERE x.capacity > 0
-              AND x.total_tickets = x.capacity
-              AND x.active_tickets = x.total_tickets
-              AND f.Status NOT IN ('{FLIGHT_STATUS_CANCELED}', '{FLIGHT_STATUS_COMPLETED}', '{FLIGHT_STATUS_FULLY_BOOKED}')
+            WHERE f.Status = '{FLIGHT_STATUS_SCHEDULED}'
+              AND x.capacity > 0
+              AND x.sold = x.capacity
+              AND x.active = x.sold
             """
         )
 
 
+# מוסיף (sign=1) או מחסיר (sign=-1) מסיכומי הדוחות את הטיסות שעונות על where (פסוקית WHERE על flight f)
+# לפי הסטטוס הנוכחי שלהן; טיסה שהושלמה נספרת גם בסיכומי המסלולים והצוות
+def add_flights_to_rollups(cursor, where, params, sign=1):
+    params = tuple(params)
+    cursor.execute(REPORT_FLIGHT_ROLLUP_SQL.format(status="f.Status", sign=sign, where=where), params)
+    completed = f"{where} AND f.Status = '{FLIGHT_STATUS_COMPLETED}'"
+    for sql in (REPORT_ROUTE_ROLLUP_SQL, REPORT_CREW_ROLLUP_SQL):
+        cursor.execute(sql.format(sign=sign, where=completed), params)
+
+
+# מעביר בסיכומי הדוחות את הטיסות שעונות על where ועדיין אינן ב-to_status אל to_status. נקרא לפני ה-UPDATE
+# ובאותו תנאי, ומעדכן רק את השורות של הטיסות שמשתנות במקום לחשב מחדש ימים שלמים
+def move_flights_in_rollups(cursor, where, params, to_status):
+    where = f"{where} AND f.Status <> %s"
+    params = tuple(params) + (to_status,)
+    add_flights_to_rollups(cursor, where, params, sign=-1)
+    cursor.execute(REPORT_FLIGHT_ROLLUP_SQL.format(status="%s", sign=1, where=where), (to_status,) + params)
+    if to_status == FLIGHT_STATUS_COMPLETED:
+        for sql in (REPORT_ROUTE_ROLLUP_SQL, REPORT_CREW_ROLLUP_SQL):
+            cursor.execute(sql.format(sign=1, where=where), params)
+
+
+# מעדכן את סיכום הטיסות לפי סטטוס לפי רשימת (יום המראה, סטטוס, שינוי במספר הטיסות)
+def bump_flight_status_rollup(cursor, deltas):
+    deltas = [(day, status, n) for day, status, n in deltas if n]
+    if deltas:
+        cursor.executemany(
+            """
+            INSERT INTO report_flight_daily (Day, Status, Flights)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE Flights = Flights + VALUES(Flights)
+            """,
+            deltas,
+        )
+
+
+# מעדכן את סיכום ההזמנות היומי לפי רשימת (יום הזמנה, סטטוס, שינוי במספר ההזמנות)
+def bump_order_rollup(cursor, deltas):
+    deltas = [(day, status, n) for day, status, n in deltas if n]
+    if deltas:
+        cursor.executemany(
+            """
+            INSERT INTO report_order_daily (Day, Order_status, Orders)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE Orders = Orders + VALUES(Orders)
+            """,
+            deltas,
+        )
+
+
+# מעביר בסיכום ההזמנות קבוצת הזמנות לסטטוס חדש; counts היא רשימת (יום הזמנה, סטטוס נוכחי, מספר)
+def move_orders_in_rollup(cursor, counts, to_status):
+    deltas = []
+    for day, status, n in counts:
+        if status != to_status:
+            deltas += [(day, status, -n), (day, to_status, n)]
+    bump_order_rollup(cursor, deltas)
+
+
+# בונה מחדש את כל טבלאות סיכומי הדוחות מההיסטוריה המלאה (למילוי ראשוני או תיקון נתונים)
+def rebuild_report_rollups():
+    with db_cursor(transaction=True) as cursor:
+        for table in REPORT_FLIGHT_TABLES + ("report_order_daily",):
+            cursor.execute(f"DELETE FROM {table}")
+        add_flights_to_rollups(cursor, "WHERE 1 = 1", ())
+        cursor.execute(REPORT_ORDER_ROLLUP_SQL.format(where="1 = 1"))
+
+
 # מחזיר הזמנה עם כל הכרטיסים והפרטים שלהם לפי מזהה מייל והזמנה
 def get_order_with_tickets(order_id: int, email: str):
     with db_cursor(dictionary=True) as cursor:
@@ -914,13 +1483,15 @@ def order_exists_for_email(order_id: int, email: str):
 
 
 # ביטול טיסה לפי פרמטרים
+@invalidates("flight_order", "flight_inventory")
 def cancel_order_by_policy(order_id: int, email: str):
-    with db_cursor(dictionary=True) as cursor:
+    with db_cursor(dictionary=True, transaction=True) as cursor:
         cursor.execute(
             """
-            SELECT Order_ID, Email, Order_status, Total_Paid
+            SELECT Order_ID, Email, Order_Date, Order_status, Total_Paid
             FROM flight_order
             WHERE Order_ID=%s AND Email=%s
+            FOR UPDATE
             """,
             (order_id, email),
         )
@@ -932,7 +1503,7 @@ def cancel_order_by_policy(order_id: int, email: str):
 
         cursor.execute(
             """
-            SELECT MIN(TIMESTAMP(t.Dep_Date, t.Dep_Hour)) AS nearest_dep
+            SELECT MIN(t.Dep_TS) AS nearest_dep
             FROM tickets t
             WHERE t.Order_ID = %s
             """,
@@ -960,208 +1531,138 @@ def cancel_order_by_policy(order_id: int, email: str):
             """,
             (ORDER_STATUS_CUSTOMER_CANCELED, str(new_total), order_id, email),
         )
+        release_inventory_for_orders(cursor, [order_id])
+        move_orders_in_rollup(cursor, [(order["Order_Date"], ORDER_STATUS_ACTIVE, 1)], ORDER_STATUS_CUSTOMER_CANCELED)
         return True, f"ההזמנה בוטלה בהצלחה. נגבתה עמלה של 5% והסכום עודכן ל-₪{new_total}."
 
 
-# מחזיר את כל ההזמנות של לקוח רשום
-def get_custorders(email: str, status_filter=None):
+# מחזיר עמוד של הזמנות לקוח רשום עם הכרטיסים שלהן בשאילתה אחת, ממוין לפי זמן ההמראה הראשון בהזמנה.
+# after הוא הסמן שהוחזר מהעמוד הקודם (עימוד keyset); מחזיר (הזמנות, סמן לעמוד הבא או None)
+def get_custorders(email: str, status_filter=None, after=None, limit=CUSTORDERS_PAGE_SIZE):
+    where = "o.Email = %s"
+    params = [email]
+    if status_filter:
+        where += " AND o.Order_status = %s"
+        params.append(status_filter)
+    having = ""
+    parsed = parse_custorders_cursor(after) if after else None
+    if parsed is not None:
+        after_dep, after_id = parsed
+        having = "HAVING First_Dep > %s OR (First_Dep = %s AND o.Order_ID > %s)"
+        params += [after_dep, after_dep, after_id]
+    params.append(limit + 1)
+
     with db_cursor(dictionary=True) as cursor:
-        if status_filter:
-            cursor.execute(
-                """
-                SELECT o.Order_ID, o.Email, o.Order_Date, o.Order_status, o.Total_Paid
+        cursor.execute(
+            f"""
+            SELECT
+                p.Order_ID, p.Email, p.Order_Date, p.Order_status, p.Total_Paid, p.First_Dep,
+                t.Air_Craft_ID, t.Dep_Date, t.Dep_Hour,
+                t.Chosen_Row_Num, t.Chosen_Col_Num, t.Price_Paid,
+                f.Status AS Flight_Status, f.Arrival_Date, f.Arrival_Time,
+                r.Origin, r.Destination
+            FROM (
+                SELECT o.Order_ID, o.Email, o.Order_Date, o.Order_status, o.Total_Paid,
+                       MIN(t0.Dep_TS) AS First_Dep
                 FROM flight_order o
-                JOIN tickets t ON t.Order_ID = o.Order_ID
-                WHERE o.Email = %s AND o.Order_status = %s
-                ORDER BY t.Dep_Date ASC, t.Dep_Hour ASC
-                """,
-                (email, status_filter),
+                JOIN tickets t0 ON t0.Order_ID = o.Order_ID
+                WHERE {where}
+                GROUP BY o.Order_ID
+                {having}
+                ORDER BY First_Dep, o.Order_ID
+                LIMIT %s
+            ) p
+            JOIN tickets t ON t.Order_ID = p.Order_ID
+            JOIN flight f
+              ON t.Air_Craft_ID = f.Air_Craft_ID
+             AND t.Dep_Date = f.Dep_Date
+             AND t.Dep_Hour = f.Dep_Hour
+            JOIN route r
+              ON f.Route_ID = r.Route_ID
+            ORDER BY p.First_Dep, p.Order_ID, t.Dep_Date, t.Dep_Hour, t.Chosen_Row_Num, t.Chosen_Col_Num
+            """,
+            tuple(params),
+        )
+        rows = cursor.fetchall()
+
+    orders = []
+    for row in rows:
+        if not orders or orders[-1]["Order_ID"] != row["Order_ID"]:
+            orders.append({key: row[key] for key in CUSTORDER_FIELDS})
+            orders[-1]["tickets"] = []
+        orders[-1]["tickets"].append({key: row[key] for key in CUSTORDER_TICKET_FIELDS})
+
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        last = orders[-1]
+        next_cursor = f"{last['First_Dep'].isoformat()}_{last['Order_ID']}"
+    return orders, next_cursor
+
+
+# מפרק סמן עימוד של היסטוריית ההזמנות לזמן המראה ומזהה הזמנה; סמן פגום (למשל כתובת שנערכה ידנית)
+# מחזיר None ומוצג העמוד הראשון
+def parse_custorders_cursor(cursor_value):
+    try:
+        dep, order_id = str(cursor_value).rsplit("_", 1)
+        return datetime.fromisoformat(dep), int(order_id)
+    except ValueError:
+        return None
+
+
+# מעדכן סטטוס הזמנות לטיסות שהושלמו: צורך את אירועי flight_completion במנות של batch_size טיסות.
+# כל מנה מעדכנת רק את ההזמנות של הטיסות שלה ומוחקת את האירועים שלה באותה טרנזקציה,
+# כך שהעבודה (והנעילות) פרופורציונליות למנה וריצה שנקטעה ממשיכה מהמקום שעצרה
+@invalidates("flight_order")
+def update_orders_status_when_flight_completed(batch_size=ORDER_COMPLETION_BATCH, checkpoint=None):
+    completed = 0
+    while True:
+        if checkpoint is not None:
+            checkpoint()
+        with db_cursor(transaction=True) as cursor:
+            cursor.execute(
+                "SELECT Seq FROM flight_completion ORDER BY Seq LIMIT %s FOR UPDATE",
+                (batch_size,),
             )
-        else:
+            seqs = [row[0] for row in cursor.fetchall()]
+            if not seqs:
+                return completed
+            placeholders = ",".join(["%s"] * len(seqs))
+            batch_orders = f"""
+                JOIN (
+                    SELECT DISTINCT t.Order_ID
+                    FROM flight_completion e
+                    JOIN tickets t
+                      ON t.Air_Craft_ID = e.Air_Craft_ID
+                     AND t.Dep_Date     = e.Dep_Date
+                     AND t.Dep_Hour     = e.Dep_Hour
+                    WHERE e.Seq IN ({placeholders})
+                ) x ON x.Order_ID = fo.Order_ID
+            """
             cursor.execute(
-                """
-                SELECT o.Order_ID, o.Email, o.Order_Date, o.Order_status, o.Total_Paid
-                FROM flight_order o
-                JOIN tickets t ON t.Order_ID = o.Order_ID
-                WHERE o.Email = %s
-                ORDER BY t.Dep_Date ASC, t.Dep_Hour ASC
+                f"""
+                SELECT fo.Order_Date, fo.Order_status, COUNT(*)
+                FROM flight_order fo
+                {batch_orders}
+                WHERE fo.Order_status = '{ORDER_STATUS_ACTIVE}'
+                GROUP BY fo.Order_Date, fo.Order_status
                 """,
-                (email,),
+                tuple(seqs),
             )
-        orders = cursor.fetchall()
-
-        for order in orders:
+            move_orders_in_rollup(cursor, cursor.fetchall(), ORDER_STATUS_COMPLETED)
             cursor.execute(
-                """
-                SELECT
-                    t.Order_ID, t.Air_Craft_ID, t.Dep_Date, t.Dep_Hour,
-                    t.Chosen_Row_Num, t.Chosen_Col_Num, t.Price_Paid,
-                    f.Status AS Flight_Status, f.Arrival_Date, f.Arrival_Time,
-                    r.Origin, r.Destination
-                FROM tickets t
-                JOIN flight f
-                  ON t.Air_Craft_ID = f.Air_Craft_ID
-                 AND t.Dep_Date = f.Dep_Date
-                 AND t.Dep_Hour = f.Dep_Hour
-                JOIN route r
-                  ON f.Route_ID = r.Route_ID
-                WHERE t.Order_ID = %s
-                ORDER BY t.Dep_Date, t.Dep_Hour, t.Chosen_Row_Num, t.Chosen_Col_Num
+                f"""
+                UPDATE flight_order fo
+                {batch_orders}
+                SET fo.Order_status = '{ORDER_STATUS_COMPLETED}'
+                WHERE fo.Order_status = '{ORDER_STATUS_ACTIVE}'
                 """,
-                (order["Order_ID"],),
+                tuple(seqs),
             )
-            order["tickets"] = cursor.fetchall()
-        return orders
-
-
-# מוודא שקיימת תיקיית דוחות ומחזיר את הנתיב שלה
-def ensure_reports_dir(app) -> str:
-    reports_dir = os.path.join(app.static_folder, "reports")
-    os.makedirs(reports_dir, exist_ok=True)
-    return reports_dir
-
-
-# יוצר גרף קצב ביטולים לפי חודש ושומר אותו כקובץ
-def make_cancel_rate_chart(rows, out_path: str):
-    labels = [f"{r['y']}-{int(r['m']):02d}" for r in rows]
-    values = [float(r["cancel_rate"]) for r in rows]
-    plt.figure(figsize=(9, 3.2))
-    plt.plot(labels, values, marker="o")
-    plt.title("Cancel Rate by Month (%)")
-    plt.xlabel("Month")
-    plt.ylabel("Cancel Rate (%)")
-    plt.xticks(rotation=30, ha="right")
-    plt.tight_layout()
-    plt.savefig(out_path, dpi=160)
-    plt.close()
-
-
-# יוצר גרף עמודות של המסלולים עם ההכנסות הגבוהות ביותר
-def make_revenue_routes_chart(rows, out_path: str):
-    labels = [f"{r['Origin']} - {r['Destination']}" for r in rows]
-    values = [float(r["revenue"]) for r in rows]
-    plt.figure(figsize=(9, 3.6))
-    plt.bar(labels, values)
-    plt.title("Top Revenue Routes (Last 90 Days)")
-    plt.xlabel("Route")
-    plt.ylabel("Revenue")
-    plt.xticks(rotation=25, ha="right")
-    plt.tight_layout()
-    plt.savefig(out_path, dpi=160)
-    plt.close()
-
-
-# החזרה של דוחות מנהלים
-def get_manager_reports(app):
-    queries = {
-        "kpis": f"""
-            SELECT
-                SUM(CASE WHEN f.Dep_Date >= DATE_FORMAT(CURDATE(), '%Y-%m-01')
-                          AND f.Dep_Date < DATE_ADD(DATE_FORMAT(CURDATE(), '%Y-%m-01'), INTERVAL 1 MONTH)
-                          AND f.Status = '{FLIGHT_STATUS_SCHEDULED}' THEN 1 ELSE 0 END) AS scheduled_cnt,
-                SUM(CASE WHEN f.Dep_Date >= DATE_FORMAT(CURDATE(), '%Y-%m-01')
-                          AND f.Dep_Date < DATE_ADD(DATE_FORMAT(CURDATE(), '%Y-%m-01'), INTERVAL 1 MONTH)
-                          AND f.Status = '{FLIGHT_STATUS_FULLY_BOOKED}' THEN 1 ELSE 0 END) AS full_cnt,
-                SUM(CASE WHEN f.Dep_Date >= DATE_FORMAT(CURDATE(), '%Y-%m-01')
-                          AND f.Dep_Date < DATE_ADD(DATE_FORMAT(CURDATE(), '%Y-%m-01'), INTERVAL 1 MONTH)
-                          AND f.Status = '{FLIGHT_STATUS_COMPLETED}' THEN 1 ELSE 0 END) AS completed_cnt,
-                SUM(CASE WHEN f.Dep_Date >= DATE_FORMAT(CURDATE(), '%Y-%m-01')
-                          AND f.Dep_Date < DATE_ADD(DATE_FORMAT(CURDATE(), '%Y-%m-01'), INTERVAL 1 MONTH)
-                          AND f.Status = '{FLIGHT_STATUS_CANCELED}' THEN 1 ELSE 0 END) AS cancelled_cnt
-            FROM flight f;
-        """,
-        "cancel_rate": """
-            SELECT YEAR(Order_Date) AS y, MONTH(Order_Date) AS m,
-                   ROUND((SUM(CASE WHEN Order_status = 'Customer_Canceled' THEN 1 ELSE 0 END) / COUNT(*)) * 100, 2) AS cancel_rate
-            FROM flight_order
-            GROUP BY YEAR(Order_Date), MONTH(Order_Date)
-            ORDER BY y, m;
-        """,
-        "top_routes": f"""
-            SELECT r.Origin, r.Destination, COUNT(*) AS completed_flights
-            FROM flight f
-            JOIN route r ON r.Route_ID = f.Route_ID
-            WHERE f.Status = '{FLIGHT_STATUS_COMPLETED}'
-              AND f.Dep_Date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-            GROUP BY r.Origin, r.Destination
-            ORDER BY completed_flights DESC
-            LIMIT 10;
-        """,
-        "crew_load": f"""
-            SELECT fc.ID AS employee_id,
-                   SUM(CASE WHEN r.Duration > 6 THEN r.Duration ELSE 0 END) AS long_hours,
-                   SUM(CASE WHEN r.Duration <= 6 THEN r.Duration ELSE 0 END) AS short_hours,
-                   ROUND(SUM(r.Duration), 2) AS total_hours
-            FROM flight_crew fc
-            JOIN flight f ON f.Air_Craft_ID = fc.Air_Craft_ID
-                          AND f.Dep_Date = fc.Dep_Date
-                          AND f.Dep_Hour = fc.Dep_Hour
-            JOIN route r ON r.Route_ID = f.Route_ID
-            WHERE f.Status = '{FLIGHT_STATUS_COMPLETED}'
-              AND f.Dep_Date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-            GROUP BY fc.ID
-            ORDER BY total_hours DESC
-            LIMIT 20;
-        """,
-        "revenue_routes": f"""
-            SELECT r.Origin, r.Destination,
-                   ROUND(SUM(COALESCE(t.Price_Paid, 0)), 2) AS revenue,
-                   COUNT(*) AS tickets_sold
-            FROM tickets t
-            JOIN flight f ON t.Air_Craft_ID = f.Air_Craft_ID
-                          AND t.Dep_Date = f.Dep_Date
-                          AND t.Dep_Hour = f.Dep_Hour
-            JOIN route r ON r.Route_ID = f.Route_ID
-            WHERE f.Status = '{FLIGHT_STATUS_COMPLETED}'
-              AND f.Dep_Date >= DATE_SUB(CURDATE(), INTERVAL 90 DAY)
-            GROUP BY r.Origin, r.Destination
-            ORDER BY revenue DESC
-            LIMIT 10;
-        """,
-    }
-
-    results = {}
-    with db_cursor() as cursor:
-        for key, query in queries.items():
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            if key == "kpis":
-                kpi_row = rows[0] if rows else (0, 0, 0, 0)
-                results[key] = {
-                    "scheduled_cnt": kpi_row[0] or 0,
-                    "full_cnt": kpi_row[1] or 0,
-                    "completed_cnt": kpi_row[2] or 0,
-                    "cancelled_cnt": kpi_row[3] or 0,
-                }
-            elif key == "cancel_rate":
-                results[key] = [{"y": r[0], "m": r[1], "cancel_rate": r[2]} for r in rows]
-            elif key == "top_routes":
-                results[key] = [{"Origin": r[0], "Destination": r[1], "completed_flights": r[2]} for r in rows]
-            elif key == "crew_load":
-                results[key] = [
-                    {"employee_id": r[0], "long_hours": r[1], "short_hours": r[2], "total_hours": r[3]} for r in rows
-                ]
-            elif key == "revenue_routes":
-                results[key] = [{"Origin": r[0], "Destination": r[1], "revenue": r[2], "tickets_sold": r[3]} for r in rows]
-    return results
-
-
-# מעדכן סטטוס טיסה
-def update_orders_status_when_flight_completed():
-    query = f"""
-        UPDATE flight_order fo
-        JOIN tickets t
-          ON t.Order_ID = fo.Order_ID
-        JOIN flight f
-          ON f.Air_Craft_ID = t.Air_Craft_ID
-         AND f.Dep_Date     = t.Dep_Date
-         AND f.Dep_Hour     = t.Dep_Hour
-        SET fo.Order_status = '{ORDER_STATUS_COMPLETED}'
-        WHERE f.Status = '{FLIGHT_STATUS_COMPLETED}'
-          AND fo.Order_status = '{ORDER_STATUS_ACTIVE}'
-    """
-    with db_cursor() as cur:
-        cur.execute(query)
+            completed += cursor.rowcount
+            cursor.execute(f"DELETE FROM flight_completion WHERE Seq IN ({placeholders})", tuple(seqs))
+        if len(seqs) < batch_size:
+            return completed
 
 
 # שליפת פרטים של לקוח רשום בסיכום הזמנה